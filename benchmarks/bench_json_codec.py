@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the JSON codecs on a bulk export.
+
+Builds a 500-question quiz and times, with each installed codec, the JSON work of
+exporting it: the indented .bquiz file, the question data embedded in the HTML
+quiz, the checkpoint lines and reading the questions back. Each codec is timed
+encoding the question objects directly and encoding the dictionaries of their
+to_dict method, which the package does because it is faster with orjson and the
+json module; only msgspec encodes the slotted question dataclasses natively.
+
+Usage:
+    python benchmarks/bench_json_codec.py [--questions N] [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quiz_generator.models.question_models import (
+    ClozeQuestion,
+    MultipleChoiceQuestion,
+    TrueFalseQuestion,
+    question_from_dict
+)
+from quiz_generator.utils.json_codec import JSONCodec, get_available_codecs
+
+CODE = "```python\ndef fib(n):\n    return n if n < 2 else fib(n - 1) + fib(n - 2)\n```"
+
+
+def make_questions(count: int) -> list:
+    """Build a quiz of multiple choice, true/false and cloze questions about code."""
+    questions = []
+    for number in range(count):
+        common = {
+            "explanation": f"Explanation {number}: the recursion stops at n < 2, so fib(1) is 1. Überprüfen Sie das.",
+            "topic": "Python",
+            "subtopic": "Recursion",
+            "focus": "code",
+            "language": "python",
+            "concept_phrase": f"recursive fibonacci base case {number}"
+        }
+        if number % 3 == 0:
+            options = [f"{label}. {CODE} returns {number + index}" for index, label in enumerate("ABCD")]
+            questions.append(MultipleChoiceQuestion(
+                question=f"What does fib({number % 20}) return?\n{CODE}", options=options,
+                correct_answer=options[1], **common
+            ))
+        elif number % 3 == 1:
+            questions.append(TrueFalseQuestion(
+                question=f"fib({number % 20}) makes an exponential number of calls.\n{CODE}",
+                correct_answer=True, **common
+            ))
+        else:
+            questions.append(ClozeQuestion(
+                question=f"def fib(n):\n    return n if n < ___ else fib(n - 1) + fib(n - 2)  # {number}",
+                correct_answer="2", **common
+            ))
+    return questions
+
+
+def export(codec: JSONCodec, questions: list, direct: bool = True) -> None:
+    """Do the JSON work of a bulk export with a codec."""
+    # Each file is written separately, so each one converts the questions again
+    convert = (lambda q: q) if direct else (lambda q: q.to_dict())
+    # The .bquiz file
+    codec.dumps({
+        "name": "Quiz on Python", "topic": "Python", "questions": [convert(q) for q in questions], "microcourse": "# Recursion"
+    }, True, False)
+    # The question data of the HTML quiz
+    codec.dumps([convert(q) for q in questions], False, False)
+    # The checkpoint lines, and reading them back
+    lines = [codec.dumps({"item": "question", "number": number, "data": convert(q)}, False, False)
+             for number, q in enumerate(questions, 1)]
+    for line in lines:
+        question_from_dict(codec.loads(line)["data"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--questions", type=int, default=500, help="number of questions in the export")
+    parser.add_argument("--repeat", type=int, default=20, help="number of times the export is run")
+    args = parser.parse_args()
+    
+    questions = make_questions(args.questions)
+    codecs = get_available_codecs()
+    baseline = None
+    print(f"{args.questions}-question export, best of {args.repeat} runs")
+    print(f"{'codec':<10}{'direct':>9}{'':7}{'to_dict':>9}")
+    for name, codec in reversed(list(codecs.items())):
+        row = ""
+        for direct in (True, False):
+            seconds = min(timeit.repeat(lambda: export(codec, questions, direct), number=1, repeat=args.repeat))
+            baseline = baseline or seconds
+            row += f"{seconds * 1e3:9.2f}ms {baseline / seconds:5.2f}x"
+        print(f"{name:<10}{row}")
+    missing = [name for name in ("orjson", "msgspec") if name not in codecs]
+    if missing:
+        print(f"Not installed: {', '.join(missing)}")
+
+
+if __name__ == "__main__":
+    main()
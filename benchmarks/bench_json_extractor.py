@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark for extracting the JSON from model responses.
+
+Runs extract_json over a corpus of messy responses, the way models actually return
+them (<think> blocks, code fences, prose before and after the JSON, code snippets
+with braces and fences inside strings, markdown instead of JSON), checks that each
+one is parsed, and compares the time with the previous approach of probing the
+response with json.loads, falling back to a greedy regex and decoding it again.
+The previous approach is reproduced without its markdown fallback, so it is
+marked BAD on the markdown response.
+
+Usage:
+    python benchmarks/bench_json_extractor.py [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quiz_generator.utils.json_extractor import extract_json
+
+QUESTION = {
+    "question": "What does the following code print?\n```python\nd = {'a': 1}\nprint(d.get('b', {}))\n```",
+    "options": ["A. {}", "B. None", "C. KeyError", "D. {'a': 1}"],
+    "correct_answer": "A",
+    "explanation": "dict.get returns the default, an empty dict {}, when the key is missing.",
+    "concept_phrase": "dict.get default",
+    "language": "python"
+}
+QUESTION_JSON = json.dumps(QUESTION, indent=2)
+BATCH_JSON = json.dumps([dict(QUESTION, question=f"Question {i}") for i in range(10)], indent=2)
+THINKING = "<think>\n" + "The user wants a question about {dicts}. Let me think. " * 200 + "\n</think>\n\n"
+
+# Each entry is (name, response, whether a batch is expected)
+CORPUS = [
+    ("plain", QUESTION_JSON, False),
+    ("fenced", f"```json\n{QUESTION_JSON}\n```", False),
+    ("bare fence", f"```\n{QUESTION_JSON}\n```", False),
+    ("prose around", f"Here is your question:\n\n{QUESTION_JSON}\n\nLet me know if you need more!", False),
+    ("stray braces", "Sure {of course}! Using a {placeholder} style:\n" + QUESTION_JSON, False),
+    ("think", THINKING + QUESTION_JSON, False),
+    ("think and fence", THINKING + f"```json\n{QUESTION_JSON}\n```", False),
+    ("unopened think", "Reasoning about the topic...\n</think>\n" + QUESTION_JSON, False),
+    ("markdown", (
+        "**Question:** Which keyword defines a function?\n"
+        "**Options:**\nA. func\nB. def\nC. function\nD. lambda\n"
+        "**Correct Answer:** B\n"
+        "**Concept Phrase:** def keyword\n"
+        "**Explanation:** Functions are defined with def."
+    ), False),
+    ("batch", BATCH_JSON, True),
+    ("batch fenced with note", f"[1] Generated below.\n```json\n{BATCH_JSON}\n```\nAll 10 questions.", True),
+    ("batch wrapped", json.dumps({"questions": json.loads(BATCH_JSON)}), True),
+]
+
+GREEDY_OBJECT_PATTERN = r'({[\s\S]*})'
+GREEDY_ARRAY_PATTERN = r'\[[\s\S]*\]'
+
+
+def previous_extract(response: str, batch: bool):
+    """The previous approach: probe with json.loads, fall back to greedy regexes, decode again."""
+    if "<think>" in response and "</think>" in response:
+        response = response.split("</think>")[1].strip()
+    if response.startswith("```json") and response.endswith("```"):
+        response = response[7:-3].strip()
+    elif response.startswith("```") and response.endswith("```"):
+        response = response[3:-3].strip()
+    candidates = []
+    try:
+        json.loads(response)
+        candidates.append(response)
+    except json.JSONDecodeError:
+        match = re.search(GREEDY_OBJECT_PATTERN, response)
+        candidates.append(match.group(1) if match else response)
+    if batch:
+        match = re.search(GREEDY_ARRAY_PATTERN, response)
+        if match:
+            candidates.append(match.group(0))
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    raise json.JSONDecodeError("No JSON object found in response", response, 0)
+
+
+def _parses(function, response: str, batch: bool) -> bool:
+    """Check whether a function finds the question (or questions) in a response."""
+    try:
+        data = function(response, batch)
+    except json.JSONDecodeError:
+        return False
+    if isinstance(data, dict) and isinstance(data.get("questions"), list):
+        data = data["questions"]
+    items = data if isinstance(data, list) else [data]
+    return bool(items) and all(isinstance(item, dict) and "correct_answer" in item for item in items)
+
+
+def _try(function, response: str, batch: bool) -> None:
+    """Run an extractor, ignoring responses it cannot parse."""
+    try:
+        function(response, batch)
+    except json.JSONDecodeError:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=2000, help="number of times each response is parsed")
+    args = parser.parse_args()
+    
+    current = lambda response, batch: extract_json(response, allow_array=batch)
+    print(f"{'response':<24}{'chars':>7}{'extract_json':>16}{'previous':>16}")
+    totals = [0.0, 0.0]
+    for name, response, batch in CORPUS:
+        row = []
+        for index, function in enumerate((current, previous_extract)):
+            seconds = timeit.timeit(lambda: _try(function, response, batch), number=args.repeat)
+            totals[index] += seconds
+            micros = seconds / args.repeat * 1e6
+            row.append(f"{micros:9.1f}us {'ok ' if _parses(function, response, batch) else 'BAD'}")
+        print(f"{name:<24}{len(response):>7}{row[0]:>16}{row[1]:>16}")
+    print(f"{'total':<31}{totals[0] * 1e3:>13.1f}ms{totals[1] * 1e3:>14.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,9 @@ This module contains classes for generating questions and quizzes.
 """
 
 from .question_generator import AnthropicQuestionGenerator
+from .quiz_pipeline import run_quiz_pipeline
 
 __all__ = [
-    'AnthropicQuestionGenerator'
+    'AnthropicQuestionGenerator',
+    'run_quiz_pipeline'
 ]
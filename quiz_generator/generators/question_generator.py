@@ -4,24 +4,126 @@ Question generator for the Quiz Generator package.
 This module contains the AnthropicQuestionGenerator class for generating questions.
 """
 
+import asyncio
 import json
 import logging
-from typing import Dict, Any, List, Optional, Union
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Tuple, Union
 
 from ..models.question_models import (
     BaseQuestion,
     MultipleChoiceQuestion,
     TrueFalseQuestion,
-    ClozeQuestion
+    ClozeQuestion,
+    QuestionValidationError,
+    get_question_schema,
+    validate_question_data
 )
 from ..prompts.multiple_choice_prompts import get_multiple_choice_prompt
 from ..prompts.true_false_prompts import get_true_false_prompt
 from ..prompts.cloze_prompts import get_cloze_prompt
-from ..utils.host_agent import get_host_agent_response, clean_json_response
+from ..prompts.batch_prompts import get_batch_prompt
+from ..prompts.repair_prompts import get_repair_prompt
+from ..utils.host_agent import (
+    BATCH_QUESTION_SYSTEM_PROMPT,
+    ProviderRoute,
+    TokenUsage,
+    get_host_agent_response,
+    get_host_agent_response_async,
+    get_platform_max_workers,
+    resolve_route
+)
+from ..utils.json_extractor import extract_json, strip_think_block
+from ..utils.progress import QuestionProgress
+from ..utils.rate_limiter import RequestLimiter
+from ..utils.stream_parser import ResponseStream, StreamEvent
 
 # Get the logger
 logger = logging.getLogger("quiz_generator")
 
+# Explanation given to the placeholder questions created when a response cannot be parsed
+PLACEHOLDER_EXPLANATION = "This is a placeholder explanation due to an error in question generation."
+
+# Output tokens allowed per question in a batch request, and the cap for a whole batch
+BATCH_TOKENS_PER_QUESTION = 1024
+MAX_BATCH_TOKENS = 8192
+
+# Number of follow-up requests for the questions missing from a batch response
+MAX_BATCH_RETRIES = 2
+
+# Number of requests to fix a single question that failed validation
+MAX_REPAIR_RETRIES = 1
+
+
+def is_placeholder_question(question: BaseQuestion) -> bool:
+    """
+    Check whether a question is a placeholder created for a failed generation.
+    
+    Args:
+        question: The question to check
+        
+    Returns:
+        True if the question is a placeholder rather than a generated question
+    """
+    return question.explanation == PLACEHOLDER_EXPLANATION
+
+
+def _extract_json_items(response: str) -> List[Any]:
+    """
+    Extract the list of question objects from a batch response.
+    
+    Args:
+        response: The response from the model
+        
+    Returns:
+        The items of the JSON array in the response, or an empty list if there is none
+    """
+    try:
+        data = extract_json(response, allow_array=True)
+    except json.JSONDecodeError:
+        return []
+    # Accept a bare array, an object wrapping the array, or a single question object
+    if isinstance(data, list):
+        return data
+    if isinstance(data.get("questions"), list):
+        return data["questions"]
+    return [data]
+
+
+def _get_request_units(
+    num_questions: int,
+    first_question_number: int,
+    batch_size: Optional[int],
+    question_numbers: Optional[List[int]]
+) -> List[Tuple[int, int]]:
+    """
+    Split the questions of a quiz into LLM requests.
+    
+    Args:
+        num_questions: Number of questions to generate
+        first_question_number: The number of the first question
+        batch_size: Optional number of questions per request
+        question_numbers: Optional numbers of the questions to generate. Takes precedence
+                          over num_questions and first_question_number.
+        
+    Returns:
+        A (first question number, number of questions) pair for each request, in order
+    """
+    if question_numbers is None:
+        question_numbers = list(range(first_question_number, first_question_number + num_questions))
+    if not (batch_size and batch_size > 1):
+        return [(number, 1) for number in sorted(question_numbers)]
+    
+    # A batch covers consecutive question numbers, so split at every gap first
+    units = []
+    for number in sorted(question_numbers):
+        if units and units[-1][0] + units[-1][1] == number and units[-1][1] < batch_size:
+            units[-1] = (units[-1][0], units[-1][1] + 1)
+        else:
+            units.append((number, 1))
+    return units
+
 
 class AnthropicQuestionGenerator:
     """
@@ -30,15 +132,107 @@ class AnthropicQuestionGenerator:
     This class creates prompts for the Anthropic model to generate questions based on the provided parameters.
     """
     
-    def __init__(self, client=None):
+    def __init__(
+        self,
+        client=None,
+        use_cache: Optional[bool] = None,
+        stream: bool = False,
+        on_progress: Optional[Callable[[StreamEvent], None]] = None,
+        on_question: Optional[Callable[[QuestionProgress], None]] = None,
+        request_limiter: Optional[RequestLimiter] = None,
+        deadline: Optional[float] = None
+    ):
         """
         Initialize the AnthropicQuestionGenerator.
         
         Args:
             client: An optional Anthropic client instance
+            use_cache: Whether to reuse cached LLM responses for identical question requests
+                       (default: the QUIZ_GENERATOR_RESPONSE_CACHE environment variable)
+            stream: Whether to stream responses, parsing questions as they arrive and stopping
+                    each response once it has its questions or its output goes wrong
+            on_progress: Optional callback for the progress events of streamed responses.
+                         It is called from worker threads when questions are generated concurrently.
+            on_question: Optional callback called with a QuestionProgress as each question (or
+                         batch of questions) finishes, also from worker threads
+            request_limiter: Optional RequestLimiter shared with other quizzes, which every
+                             request of the async methods waits for
+            deadline: Optional time.monotonic() value by which every request must have
+                      finished. Requests that are still running then time out, and
+                      requests that have not started are not sent.
         """
         # Store the client
         self.client = client
+        self.use_cache = use_cache
+        self.stream = stream
+        self.on_progress = on_progress
+        self.on_question = on_question
+        self.request_limiter = request_limiter
+        self.deadline = deadline
+    
+    def _report_questions(
+        self,
+        first_question_number: int,
+        questions: List[BaseQuestion],
+        started: float,
+        usage: TokenUsage
+    ) -> None:
+        """Send finished questions to the on_question callback, if there is one."""
+        if self.on_question is None:
+            return
+        try:
+            self.on_question(QuestionProgress(first_question_number, questions, time.monotonic() - started, usage))
+        except Exception as e:
+            logger.warning(f"Error in question progress callback: {str(e)}")
+    
+    def _is_valid_question_data(self, data: Any, question_type: Optional[str]) -> bool:
+        """
+        Check whether parsed JSON can be turned into a question of the given type.
+        
+        Args:
+            data: The parsed JSON
+            question_type: The expected question type, or None to only check for a question field
+            
+        Returns:
+            True if the data is a usable question
+        """
+        if not isinstance(data, dict) or "error" in data:
+            return False
+        if question_type is None:
+            return "question" in data
+        try:
+            validate_question_data(data, question_type)
+        except QuestionValidationError:
+            return False
+        return True
+    
+    def _create_response_stream(
+        self,
+        label: str,
+        question_type: Optional[str],
+        max_items: int
+    ) -> Optional[ResponseStream]:
+        """
+        Create the ResponseStream for a question request, if streaming is enabled.
+        
+        Args:
+            label: What the request is for, e.g. "question 3"
+            question_type: The type of question expected, used to validate the streamed items
+            max_items: The number of questions expected in the response
+            
+        Returns:
+            A ResponseStream, or None if streaming is disabled
+        """
+        if not self.stream:
+            return None
+        return ResponseStream(
+            label=label,
+            on_event=self.on_progress,
+            validate_item=lambda item: self._is_valid_question_data(item, question_type),
+            max_items=max_items,
+            # A single question is useless once it is invalid; a batch can re-request bad items
+            max_invalid_items=0 if max_items == 1 else None
+        )
     
     def generate_multiple_choice_question(
         self,
@@ -133,130 +327,905 @@ class AnthropicQuestionGenerator:
         
         return self._generate_question(prompt)
     
-    def _generate_question(self, prompt: str) -> str:
+    def _generate_question(
+        self,
+        prompt: str,
+        route: Optional[ProviderRoute] = None,
+        question_number: Optional[int] = None,
+        question_type: Optional[str] = None,
+        usage: Optional[TokenUsage] = None
+    ) -> str:
         """
         Generate a question using the Anthropic model.
         
         Args:
             prompt: The prompt to send to the model
+            route: Optional resolved platform and model (default: selected automatically)
+            question_number: Optional number of the question in the series. The prompts do
+                             not vary by question number, so it keeps cached responses apart.
+            question_type: Optional type of the question, used to validate streamed responses
+            usage: Optional TokenUsage to add the tokens used to
             
         Returns:
             The model's response as a string
         """
-        return get_host_agent_response(prompt, self.client)
+        return get_host_agent_response(
+            prompt, self.client, route=route, use_cache=self.use_cache,
+            cache_variant=None if question_number is None else str(question_number),
+            response_stream=self._create_response_stream(f"question {question_number or 1}", question_type, 1),
+            usage=usage, deadline=self.deadline
+        )
     
-    def parse_question_response(
+    def _generate_question_prompt(
         self,
-        response: str,
         question_type: str,
         topic: str,
         subtopic: Optional[str] = None,
-        focus: str = "text"
+        focus: str = "text",
+        difficulty: str = "challenging",
+        question_number: int = 1
+    ) -> str:
+        """
+        Get the prompt template for a question of the given type.
+        
+        Args:
+            question_type: The type of question (multiple_choice, true_false, cloze)
+            topic: The main topic for the question
+            subtopic: Optional subtopic for more specific questions
+            focus: Whether the question should focus on code or text
+            difficulty: The difficulty level of the question
+            question_number: The number of the question in the series
+            
+        Returns:
+            The prompt for the question type
+        """
+        if question_type == "multiple_choice":
+            prompt_function = get_multiple_choice_prompt
+        elif question_type == "true_false":
+            prompt_function = get_true_false_prompt
+        else:  # cloze
+            prompt_function = get_cloze_prompt
+        
+        return prompt_function(
+            topic=topic,
+            subtopic=subtopic,
+            focus=focus,
+            difficulty=difficulty,
+            question_number=question_number
+        )
+    
+    def generate_question(
+        self,
+        question_type: str,
+        topic: str,
+        subtopic: Optional[str] = None,
+        focus: str = "text",
+        difficulty: str = "challenging",
+        question_number: int = 1,
+        model: Optional[str] = None,
+        platform: Optional[str] = None,
+        route: Optional[ProviderRoute] = None
     ) -> Union[MultipleChoiceQuestion, TrueFalseQuestion, ClozeQuestion]:
         """
-        Parse the Anthropic model's response into a Question object.
+        Generate a single question and parse it into a Question object.
         
         Args:
-            response: The response from the model
-            question_type: The type of question to parse
-            topic: The main topic of the question
-            subtopic: Optional subtopic of the question
-            focus: Whether the question focuses on code or text
+            question_type: The type of question to generate (multiple_choice, true_false, cloze)
+            topic: The main topic for the question
+            subtopic: Optional subtopic for more specific questions
+            focus: Whether the question should focus on code or text
+            difficulty: The difficulty level of the question (e.g., "easy", "medium", "challenging", "hard")
+            question_number: The number of the question in the series
+            model: The model to send the question prompt to
+            platform: The platform to send the question prompt to
+            route: Optional resolved platform and model. Takes precedence over model and platform.
             
         Returns:
             A Question object
         """
-        try:
-            # Try to parse the JSON response
-            # First, clean up the response to handle potential formatting issues
-            response = clean_json_response(response)
-            logger.info(f"Attempting to parse JSON: {response}")
-            data = json.loads(response)
-            logger.info(f"Successfully parsed JSON: {data}")
+        route = route or resolve_route(platform, model)
+        started = time.monotonic()
+        usage = TokenUsage()
+        
+        prompt = self._generate_question_prompt(
+            question_type=question_type,
+            topic=topic,
+            subtopic=subtopic,
+            focus=focus,
+            difficulty=difficulty,
+            question_number=question_number
+        )
+        
+        # Generate the question from the prompt
+        prompt = self._generate_question(prompt, route, question_number, question_type, usage)
+        
+        # Send the prompt to the host agent
+        response = get_host_agent_response(
+            prompt, route=route, use_cache=self.use_cache, cache_variant=str(question_number),
+            response_stream=self._create_response_stream(f"question {question_number}", question_type, 1),
+            usage=usage, deadline=self.deadline, response_schema=get_question_schema(question_type)
+        )
+        
+        # Parse the response into a Question object, asking the model to fix an invalid question
+        question, error = self._parse_question(response, question_type, topic, subtopic, focus)
+        for _ in range(MAX_REPAIR_RETRIES):
+            if question is not None or error is None:
+                break
+            response = get_host_agent_response(
+                self._get_repair_request(response, error, question_type), route=route,
+                use_cache=self.use_cache, cache_variant=f"repair-{question_number}",
+                response_stream=self._create_response_stream(f"question {question_number}", question_type, 1),
+                usage=usage, deadline=self.deadline, response_schema=get_question_schema(question_type)
+            )
+            question, error = self._parse_question(response, question_type, topic, subtopic, focus)
+        if question is None:
+            if error is not None:
+                logger.error(f"Error parsing response: {error}\nResponse: {response}")
+            question = self._create_placeholder_question(question_type, topic, subtopic, focus)
+        self._report_questions(question_number, [question], started, usage)
+        return question
+    
+    def generate_questions(
+        self,
+        question_type: str,
+        topic: str,
+        subtopic: Optional[str] = None,
+        focus: str = "text",
+        difficulty: str = "challenging",
+        num_questions: int = 5,
+        model: Optional[str] = None,
+        platform: Optional[str] = None,
+        concurrent: bool = True,
+        max_workers: Optional[int] = None,
+        route: Optional[ProviderRoute] = None,
+        first_question_number: int = 1,
+        batch_size: Optional[int] = None,
+        question_numbers: Optional[List[int]] = None
+    ) -> List[BaseQuestion]:
+        """
+        Generate a list of questions, optionally sending all question prompts at once.
+        
+        In concurrent mode the questions are generated on a thread pool whose size is
+        limited by the per-platform worker limit (see get_platform_max_workers), so the
+        wall-clock time for a quiz is roughly one round-trip instead of one per question.
+        The questions are always returned in question order.
+        
+        With a batch_size above 1, each LLM call asks for a whole batch of questions
+        (see generate_question_batch), so the instructions are sent once per batch
+        instead of once per question. Batches run concurrently like single questions.
+        
+        Args:
+            question_type: The type of questions to generate (multiple_choice, true_false, cloze)
+            topic: The main topic for the questions
+            subtopic: Optional subtopic for more specific questions
+            focus: Whether the questions should focus on code or text
+            difficulty: The difficulty level of the questions
+            num_questions: Number of questions to generate
+            model: The model to send the question prompts to
+            platform: The platform to send the question prompts to
+            concurrent: Whether to generate the questions concurrently
+            max_workers: Optional limit on the number of concurrent requests
+            route: Optional resolved platform and model. Takes precedence over model and platform.
+            first_question_number: The number of the first question in the series, for
+                                   quizzes that are partly filled from elsewhere
+            batch_size: Optional number of questions to request per LLM call
+                        (default: one call per question)
+            question_numbers: Optional numbers of the questions to generate, for quizzes
+                              resumed from a checkpoint. Takes precedence over num_questions
+                              and first_question_number.
             
-            # Create the appropriate question object based on the question type
-            if question_type == "multiple_choice":
-                # Check if explanation is present, if not, provide a default explanation
-                explanation = data.get("explanation", f"This is a question about {data.get('concept_phrase', topic)}.")
-                return MultipleChoiceQuestion(
-                    question=data["question"],
-                    options=data["options"],
-                    correct_answer=data["correct_answer"],
-                    explanation=explanation,
-                    topic=topic,
-                    subtopic=subtopic,
-                    focus=focus,
-                    language=data.get("language"),
-                    concept_phrase=data.get("concept_phrase", "")
-                )
-            elif question_type == "true_false":
-                # Check if explanation is present, if not, provide a default explanation
-                explanation = data.get("explanation", f"This is a question about {data.get('concept_phrase', topic)}.")
-                return TrueFalseQuestion(
-                    question=data["question"],
-                    correct_answer=data["correct_answer"],
-                    explanation=explanation,
+        Returns:
+            A list of Question objects in question order
+        """
+        # Resolve the platform and model once for the whole list of questions
+        route = route or resolve_route(platform, model)
+        
+        if batch_size and batch_size > 1:
+            def generate(unit: Tuple[int, int]) -> List[BaseQuestion]:
+                return self.generate_question_batch(
+                    question_type=question_type,
                     topic=topic,
                     subtopic=subtopic,
                     focus=focus,
-                    language=data.get("language"),
-                    concept_phrase=data.get("concept_phrase", "")
+                    difficulty=difficulty,
+                    num_questions=unit[1],
+                    first_question_number=unit[0],
+                    route=route
                 )
-            else:  # cloze
-                logger.info(f"Creating cloze question with data: {data}")
-                # Check if explanation is present, if not, provide a default explanation
-                explanation = data.get("explanation", f"This is a question about {data.get('concept_phrase', topic)}.")
-                return ClozeQuestion(
-                    question=data["question"],
-                    correct_answer=data["correct_answer"],
-                    explanation=explanation,
+        else:
+            def generate(unit: Tuple[int, int]) -> List[BaseQuestion]:
+                return [self.generate_question(
+                    question_type=question_type,
                     topic=topic,
                     subtopic=subtopic,
                     focus=focus,
-                    language=data.get("language"),
-                    concept_phrase=data.get("concept_phrase", "")
-                )
-        except (json.JSONDecodeError, KeyError) as e:
-            # If there's an error parsing the response, create a default question
-            error_message = f"Error parsing response: {str(e)}\nResponse: {response}"
-            logger.error(error_message)
+                    difficulty=difficulty,
+                    question_number=unit[0],
+                    route=route
+                )]
+        
+        units = _get_request_units(num_questions, first_question_number, batch_size, question_numbers)
+        if not units:
+            return []
+        num_questions = sum(count for _, count in units)
+        
+        workers = min(get_platform_max_workers(route.platform, max_workers), len(units))
+        if not concurrent or workers == 1:
+            results = [generate(unit) for unit in units]
+        else:
+            logger.info(f"Generating {num_questions} questions in {len(units)} requests with {workers} concurrent workers on {route.platform}")
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quiz-question") as executor:
+                # map() yields results in submission order, so the quiz keeps its question order
+                results = list(executor.map(generate, units))
+        return [question for batch in results for question in batch]
+    
+    def _get_batch_request(
+        self,
+        question_type: str,
+        topic: str,
+        subtopic: Optional[str],
+        focus: str,
+        difficulty: str,
+        num_questions: int,
+        first_question_number: int,
+        existing_questions: List[BaseQuestion]
+    ) -> Tuple[str, int]:
+        """
+        Build the prompt for a batch of questions.
+        
+        Args:
+            question_type: The type of questions (multiple_choice, true_false, cloze)
+            topic: The main topic for the questions
+            subtopic: Optional subtopic for more specific questions
+            focus: Whether the questions should focus on code or text
+            difficulty: The difficulty level of the questions
+            num_questions: The number of questions still needed
+            first_question_number: The number of the first question in the batch
+            existing_questions: Questions of the batch that were already generated
             
-            if question_type == "multiple_choice":
-                return MultipleChoiceQuestion(
-                    question=f"Error generating question about {topic}. Please try again.",
-                    options=[
-                        "A. First option",
-                        "B. Second option",
-                        "C. Third option",
-                        "D. Fourth option"
-                    ],
-                    correct_answer="A",
-                    explanation="This is a placeholder explanation due to an error in question generation.",
-                    topic=topic,
-                    subtopic=subtopic,
-                    focus=focus,
-                    language=None,
-                    concept_phrase=f"Error in {topic}"
+        Returns:
+            A tuple of (prompt, maximum number of tokens to generate)
+        """
+        question_prompt = self._generate_question_prompt(
+            question_type=question_type,
+            topic=topic,
+            subtopic=subtopic,
+            focus=focus,
+            difficulty=difficulty,
+            question_number=first_question_number
+        )
+        prompt = get_batch_prompt(
+            question_prompt,
+            num_questions,
+            avoid_concepts=[q.concept_phrase for q in existing_questions if q.concept_phrase]
+        )
+        return prompt, min(BATCH_TOKENS_PER_QUESTION * num_questions, MAX_BATCH_TOKENS)
+    
+    def _get_batch_repair_request(self, question_type: str, invalid_items: List[Tuple[str, str]]) -> Tuple[str, int]:
+        """
+        Build the prompt asking the model to fix the invalid questions of a batch.
+        
+        Args:
+            question_type: The type of questions
+            invalid_items: A (JSON text, validation error) pair for each invalid question
+            
+        Returns:
+            A tuple of (prompt, maximum number of tokens to generate)
+        """
+        prompt = get_repair_prompt(question_type, invalid_items, batch=True)
+        return prompt, min(BATCH_TOKENS_PER_QUESTION * len(invalid_items), MAX_BATCH_TOKENS)
+    
+    def _get_batch_label(self, first_question_number: int, num_questions: int) -> str:
+        """Get the label used in progress events for a batch of questions."""
+        return f"questions {first_question_number}-{first_question_number + num_questions - 1}"
+    
+    def _add_batch_questions(
+        self,
+        questions: List[BaseQuestion],
+        response: str,
+        num_questions: int,
+        question_type: str,
+        topic: str,
+        subtopic: Optional[str],
+        focus: str
+    ) -> List[Tuple[str, str]]:
+        """
+        Parse a batch response and add its valid, new questions to a batch.
+        
+        Args:
+            questions: The questions of the batch so far, extended in place
+            response: The response from the model
+            num_questions: The total number of questions in the batch
+            question_type: The type of questions
+            topic: The main topic of the questions
+            subtopic: Optional subtopic of the questions
+            focus: Whether the questions focus on code or text
+            
+        Returns:
+            A (JSON text, validation error) pair for each invalid question that is still
+            needed, to ask the model to fix
+        """
+        seen = {q.question for q in questions}
+        parsed, invalid_items = self._parse_batch(response, question_type, topic, subtopic, focus)
+        for question in parsed:
+            if len(questions) >= num_questions:
+                break
+            if question.question not in seen:
+                seen.add(question.question)
+                questions.append(question)
+        return invalid_items[:num_questions - len(questions)]
+    
+    def _fill_batch(
+        self,
+        questions: List[BaseQuestion],
+        num_questions: int,
+        question_type: str,
+        topic: str,
+        subtopic: Optional[str],
+        focus: str
+    ) -> List[BaseQuestion]:
+        """Fill the questions still missing from a batch with placeholders."""
+        missing = num_questions - len(questions)
+        if missing > 0:
+            logger.error(f"{missing} of {num_questions} questions about {topic} could not be generated")
+            questions.extend(
+                self._create_placeholder_question(question_type, topic, subtopic, focus) for _ in range(missing)
+            )
+        return questions
+    
+    def generate_question_batch(
+        self,
+        question_type: str,
+        topic: str,
+        subtopic: Optional[str] = None,
+        focus: str = "text",
+        difficulty: str = "challenging",
+        num_questions: int = 5,
+        first_question_number: int = 1,
+        route: Optional[ProviderRoute] = None
+    ) -> List[BaseQuestion]:
+        """
+        Generate several questions with one LLM call.
+        
+        The model is asked for a JSON array of questions. Items that fail validation
+        are sent back to the model with their errors to be fixed, and items that are
+        missing are requested again in a smaller batch, up to MAX_BATCH_RETRIES follow-up
+        requests in all; questions that still could not be generated are replaced with
+        placeholders.
+        
+        Args:
+            question_type: The type of questions to generate (multiple_choice, true_false, cloze)
+            topic: The main topic for the questions
+            subtopic: Optional subtopic for more specific questions
+            focus: Whether the questions should focus on code or text
+            difficulty: The difficulty level of the questions
+            num_questions: Number of questions to generate
+            first_question_number: The number of the first question of the batch in the series
+            route: Optional resolved platform and model (default: selected automatically)
+            
+        Returns:
+            A list of num_questions Question objects
+        """
+        route = route or resolve_route()
+        started = time.monotonic()
+        usage = TokenUsage()
+        questions: List[BaseQuestion] = []
+        invalid_items: List[Tuple[str, str]] = []
+        
+        for attempt in range(MAX_BATCH_RETRIES + 1):
+            missing = num_questions - len(questions)
+            if missing <= 0:
+                break
+            if invalid_items:
+                # Ask the model to fix only the questions that failed validation
+                logger.warning(f"Requesting fixes for {len(invalid_items)} invalid questions of a batch of {num_questions}")
+                prompt, max_tokens = self._get_batch_repair_request(question_type, invalid_items)
+                cache_variant, expected = f"repair-{first_question_number}", len(invalid_items)
+            else:
+                if attempt:
+                    logger.warning(f"Requesting {missing} missing questions of a batch of {num_questions}")
+                prompt, max_tokens = self._get_batch_request(
+                    question_type, topic, subtopic, focus, difficulty, missing, first_question_number, questions
                 )
-            elif question_type == "true_false":
-                return TrueFalseQuestion(
-                    question=f"Error generating question about {topic}. Please try again.",
-                    correct_answer=True,
-                    explanation="This is a placeholder explanation due to an error in question generation.",
+                cache_variant, expected = f"batch-{first_question_number}", missing
+            
+            response = get_host_agent_response(
+                prompt, self.client, route=route, use_cache=self.use_cache,
+                cache_variant=cache_variant,
+                system_prompt=BATCH_QUESTION_SYSTEM_PROMPT, max_tokens=max_tokens,
+                response_stream=self._create_response_stream(
+                    self._get_batch_label(first_question_number, num_questions), question_type, expected
+                ),
+                usage=usage, deadline=self.deadline, response_schema=get_question_schema(question_type, batch=True)
+            )
+            invalid_items = self._add_batch_questions(
+                questions, response, num_questions, question_type, topic, subtopic, focus
+            )
+        
+        questions = self._fill_batch(questions, num_questions, question_type, topic, subtopic, focus)
+        self._report_questions(first_question_number, questions, started, usage)
+        return questions
+    
+    async def _generate_question_async(
+        self,
+        prompt: str,
+        route: Optional[ProviderRoute] = None,
+        question_number: Optional[int] = None,
+        question_type: Optional[str] = None,
+        usage: Optional[TokenUsage] = None
+    ) -> str:
+        """
+        Generate a question using the host agent without blocking the event loop.
+        
+        Args:
+            prompt: The prompt to send to the model
+            route: Optional resolved platform and model (default: selected automatically)
+            question_number: Optional number of the question in the series, used to keep
+                             cached responses apart
+            question_type: Optional type of the question, used to validate streamed responses
+            usage: Optional TokenUsage to add the tokens used to
+            
+        Returns:
+            The model's response as a string
+        """
+        return await get_host_agent_response_async(
+            prompt, route=route, use_cache=self.use_cache,
+            cache_variant=None if question_number is None else str(question_number),
+            response_stream=self._create_response_stream(f"question {question_number or 1}", question_type, 1),
+            usage=usage, request_limiter=self.request_limiter, deadline=self.deadline
+        )
+    
+    async def generate_question_async(
+        self,
+        question_type: str,
+        topic: str,
+        subtopic: Optional[str] = None,
+        focus: str = "text",
+        difficulty: str = "challenging",
+        question_number: int = 1,
+        model: Optional[str] = None,
+        platform: Optional[str] = None,
+        route: Optional[ProviderRoute] = None
+    ) -> Union[MultipleChoiceQuestion, TrueFalseQuestion, ClozeQuestion]:
+        """
+        Generate a single question without blocking the event loop.
+        
+        This is the asyncio counterpart of generate_question and takes the same arguments.
+        
+        Returns:
+            A Question object
+        """
+        route = route or resolve_route(platform, model)
+        started = time.monotonic()
+        usage = TokenUsage()
+        
+        prompt = self._generate_question_prompt(
+            question_type=question_type,
+            topic=topic,
+            subtopic=subtopic,
+            focus=focus,
+            difficulty=difficulty,
+            question_number=question_number
+        )
+        
+        # Generate the question from the prompt
+        prompt = await self._generate_question_async(prompt, route, question_number, question_type, usage)
+        
+        # Send the prompt to the host agent
+        response = await get_host_agent_response_async(
+            prompt, route=route, use_cache=self.use_cache, cache_variant=str(question_number),
+            response_stream=self._create_response_stream(f"question {question_number}", question_type, 1),
+            usage=usage, request_limiter=self.request_limiter, deadline=self.deadline,
+            response_schema=get_question_schema(question_type)
+        )
+        
+        # Parse the response into a Question object, asking the model to fix an invalid question
+        question, error = self._parse_question(response, question_type, topic, subtopic, focus)
+        for _ in range(MAX_REPAIR_RETRIES):
+            if question is not None or error is None:
+                break
+            response = await get_host_agent_response_async(
+                self._get_repair_request(response, error, question_type), route=route,
+                use_cache=self.use_cache, cache_variant=f"repair-{question_number}",
+                response_stream=self._create_response_stream(f"question {question_number}", question_type, 1),
+                usage=usage, request_limiter=self.request_limiter, deadline=self.deadline,
+                response_schema=get_question_schema(question_type)
+            )
+            question, error = self._parse_question(response, question_type, topic, subtopic, focus)
+        if question is None:
+            if error is not None:
+                logger.error(f"Error parsing response: {error}\nResponse: {response}")
+            question = self._create_placeholder_question(question_type, topic, subtopic, focus)
+        self._report_questions(question_number, [question], started, usage)
+        return question
+    
+    async def generate_questions_async(
+        self,
+        question_type: str,
+        topic: str,
+        subtopic: Optional[str] = None,
+        focus: str = "text",
+        difficulty: str = "challenging",
+        num_questions: int = 5,
+        model: Optional[str] = None,
+        platform: Optional[str] = None,
+        concurrent: bool = True,
+        max_workers: Optional[int] = None,
+        route: Optional[ProviderRoute] = None,
+        first_question_number: int = 1,
+        batch_size: Optional[int] = None,
+        question_numbers: Optional[List[int]] = None
+    ) -> List[BaseQuestion]:
+        """
+        Generate a list of questions without blocking the event loop.
+        
+        This is the asyncio counterpart of generate_questions and takes the same arguments.
+        In concurrent mode the number of requests (single questions or batches) in
+        flight is limited by a semaphore sized with the per-platform worker limit.
+        
+        Returns:
+            A list of Question objects in question order
+        """
+        units = _get_request_units(num_questions, first_question_number, batch_size, question_numbers)
+        if not units:
+            return []
+        num_questions = sum(count for _, count in units)
+        
+        # Resolve the platform and model once for the whole list of questions
+        route = route or resolve_route(platform, model)
+        
+        if batch_size and batch_size > 1:
+            async def generate_one(unit: Tuple[int, int]) -> List[BaseQuestion]:
+                return await self.generate_question_batch_async(
+                    question_type=question_type,
                     topic=topic,
                     subtopic=subtopic,
                     focus=focus,
-                    language=None,
-                    concept_phrase=f"Error in {topic}"
+                    difficulty=difficulty,
+                    num_questions=unit[1],
+                    first_question_number=unit[0],
+                    route=route
                 )
-            else:  # cloze
-                return ClozeQuestion(
-                    question=f"Error generating question about {topic}. Please fill in the ___.",
-                    correct_answer="blank",
-                    explanation="This is a placeholder explanation due to an error in question generation.",
+        else:
+            async def generate_one(unit: Tuple[int, int]) -> List[BaseQuestion]:
+                return [await self.generate_question_async(
+                    question_type=question_type,
                     topic=topic,
                     subtopic=subtopic,
                     focus=focus,
-                    language=None,
-                    concept_phrase=f"Error in {topic}"
+                    difficulty=difficulty,
+                    question_number=unit[0],
+                    route=route
+                )]
+        
+        workers = min(get_platform_max_workers(route.platform, max_workers), len(units))
+        if not concurrent:
+            workers = 1
+        semaphore = asyncio.Semaphore(workers)
+        
+        async def generate(unit: Tuple[int, int]) -> List[BaseQuestion]:
+            async with semaphore:
+                return await generate_one(unit)
+        
+        logger.info(f"Generating {num_questions} questions in {len(units)} requests with {workers} concurrent requests on {route.platform}")
+        # gather() returns results in the order of its arguments, so the quiz keeps its question order
+        results = await asyncio.gather(*(generate(unit) for unit in units))
+        return [question for batch in results for question in batch]
+    
+    async def generate_question_batch_async(
+        self,
+        question_type: str,
+        topic: str,
+        subtopic: Optional[str] = None,
+        focus: str = "text",
+        difficulty: str = "challenging",
+        num_questions: int = 5,
+        first_question_number: int = 1,
+        route: Optional[ProviderRoute] = None
+    ) -> List[BaseQuestion]:
+        """
+        Generate several questions with one LLM call without blocking the event loop.
+        
+        This is the asyncio counterpart of generate_question_batch and takes the same arguments.
+        
+        Returns:
+            A list of num_questions Question objects
+        """
+        route = route or resolve_route()
+        started = time.monotonic()
+        usage = TokenUsage()
+        questions: List[BaseQuestion] = []
+        invalid_items: List[Tuple[str, str]] = []
+        
+        for attempt in range(MAX_BATCH_RETRIES + 1):
+            missing = num_questions - len(questions)
+            if missing <= 0:
+                break
+            if invalid_items:
+                # Ask the model to fix only the questions that failed validation
+                logger.warning(f"Requesting fixes for {len(invalid_items)} invalid questions of a batch of {num_questions}")
+                prompt, max_tokens = self._get_batch_repair_request(question_type, invalid_items)
+                cache_variant, expected = f"repair-{first_question_number}", len(invalid_items)
+            else:
+                if attempt:
+                    logger.warning(f"Requesting {missing} missing questions of a batch of {num_questions}")
+                prompt, max_tokens = self._get_batch_request(
+                    question_type, topic, subtopic, focus, difficulty, missing, first_question_number, questions
                 )
+                cache_variant, expected = f"batch-{first_question_number}", missing
+            
+            response = await get_host_agent_response_async(
+                prompt, route=route, use_cache=self.use_cache,
+                cache_variant=cache_variant,
+                system_prompt=BATCH_QUESTION_SYSTEM_PROMPT, max_tokens=max_tokens,
+                response_stream=self._create_response_stream(
+                    self._get_batch_label(first_question_number, num_questions), question_type, expected
+                ),
+                usage=usage, request_limiter=self.request_limiter, deadline=self.deadline,
+                response_schema=get_question_schema(question_type, batch=True)
+            )
+            invalid_items = self._add_batch_questions(
+                questions, response, num_questions, question_type, topic, subtopic, focus
+            )
+        
+        questions = self._fill_batch(questions, num_questions, question_type, topic, subtopic, focus)
+        self._report_questions(first_question_number, questions, started, usage)
+        return questions
+    
+    def _build_question(
+        self,
+        data: Dict[str, Any],
+        question_type: str,
+        topic: str,
+        subtopic: Optional[str] = None,
+        focus: str = "text"
+    ) -> Union[MultipleChoiceQuestion, TrueFalseQuestion, ClozeQuestion]:
+        """
+        Create a Question object from the parsed JSON of a question.
+        
+        Args:
+            data: The question data returned by the model
+            question_type: The type of question to create
+            topic: The main topic of the question
+            subtopic: Optional subtopic of the question
+            focus: Whether the question focuses on code or text
+            
+        Returns:
+            A Question object
+            
+        Raises:
+            KeyError: If a required field is missing
+        """
+        # Check if explanation is present, if not, provide a default explanation
+        concept_phrase = data.get("concept_phrase") or ""
+        explanation = data.get("explanation") or f"This is a question about {concept_phrase or topic}."
+        
+        # Create the appropriate question object based on the question type
+        if question_type == "multiple_choice":
+            return MultipleChoiceQuestion(
+                question=data["question"],
+                options=data["options"],
+                correct_answer=data["correct_answer"],
+                explanation=explanation,
+                topic=topic,
+                subtopic=subtopic,
+                focus=focus,
+                language=data.get("language"),
+                concept_phrase=concept_phrase
+            )
+        elif question_type == "true_false":
+            return TrueFalseQuestion(
+                question=data["question"],
+                correct_answer=data["correct_answer"],
+                explanation=explanation,
+                topic=topic,
+                subtopic=subtopic,
+                focus=focus,
+                language=data.get("language"),
+                concept_phrase=concept_phrase
+            )
+        else:  # cloze
+            logger.info(f"Creating cloze question with data: {data}")
+            return ClozeQuestion(
+                question=data["question"],
+                correct_answer=data["correct_answer"],
+                explanation=explanation,
+                topic=topic,
+                subtopic=subtopic,
+                focus=focus,
+                language=data.get("language"),
+                concept_phrase=concept_phrase
+            )
+    
+    def _create_placeholder_question(
+        self,
+        question_type: str,
+        topic: str,
+        subtopic: Optional[str] = None,
+        focus: str = "text"
+    ) -> Union[MultipleChoiceQuestion, TrueFalseQuestion, ClozeQuestion]:
+        """
+        Create a placeholder question for a question that could not be generated.
+        
+        Args:
+            question_type: The type of question to create
+            topic: The main topic of the question
+            subtopic: Optional subtopic of the question
+            focus: Whether the question focuses on code or text
+            
+        Returns:
+            A placeholder Question object (see is_placeholder_question)
+        """
+        if question_type == "multiple_choice":
+            return MultipleChoiceQuestion(
+                question=f"Error generating question about {topic}. Please try again.",
+                options=[
+                    "A. First option",
+                    "B. Second option",
+                    "C. Third option",
+                    "D. Fourth option"
+                ],
+                correct_answer="A",
+                explanation=PLACEHOLDER_EXPLANATION,
+                topic=topic,
+                subtopic=subtopic,
+                focus=focus,
+                language=None,
+                concept_phrase=f"Error in {topic}"
+            )
+        elif question_type == "true_false":
+            return TrueFalseQuestion(
+                question=f"Error generating question about {topic}. Please try again.",
+                correct_answer=True,
+                explanation=PLACEHOLDER_EXPLANATION,
+                topic=topic,
+                subtopic=subtopic,
+                focus=focus,
+                language=None,
+                concept_phrase=f"Error in {topic}"
+            )
+        else:  # cloze
+            return ClozeQuestion(
+                question=f"Error generating question about {topic}. Please fill in the ___.",
+                correct_answer="blank",
+                explanation=PLACEHOLDER_EXPLANATION,
+                topic=topic,
+                subtopic=subtopic,
+                focus=focus,
+                language=None,
+                concept_phrase=f"Error in {topic}"
+            )
+    
+    def _parse_question(
+        self,
+        response: str,
+        question_type: str,
+        topic: str,
+        subtopic: Optional[str] = None,
+        focus: str = "text"
+    ) -> Tuple[Optional[BaseQuestion], Optional[str]]:
+        """
+        Parse a response into a Question object, validating it against the schema of its type.
+        
+        Args:
+            response: The response from the model
+            question_type: The type of question to parse
+            topic: The main topic of the question
+            subtopic: Optional subtopic of the question
+            focus: Whether the question focuses on code or text
+            
+        Returns:
+            A tuple of (question, None) for a valid question, or (None, the validation error).
+            The error is None as well if the response reports a failed request, since asking
+            the model to fix it would not help.
+        """
+        try:
+            data = extract_json(response)
+        except json.JSONDecodeError as e:
+            return None, f"the response is not valid JSON ({e.msg})"
+        if "error" in data:
+            logger.error(f"Question request failed: {data['error']}")
+            return None, None
+        try:
+            data = validate_question_data(data, question_type)
+        except QuestionValidationError as e:
+            return None, str(e)
+        logger.info(f"Successfully parsed JSON: {data}")
+        return self._build_question(data, question_type, topic, subtopic, focus), None
+    
+    def parse_question_response(
+        self,
+        response: str,
+        question_type: str,
+        topic: str,
+        subtopic: Optional[str] = None,
+        focus: str = "text"
+    ) -> Union[MultipleChoiceQuestion, TrueFalseQuestion, ClozeQuestion]:
+        """
+        Parse the Anthropic model's response into a Question object.
+        
+        Args:
+            response: The response from the model
+            question_type: The type of question to parse
+            topic: The main topic of the question
+            subtopic: Optional subtopic of the question
+            focus: Whether the question focuses on code or text
+            
+        Returns:
+            A Question object, or a placeholder question if the response is not a valid question
+        """
+        question, error = self._parse_question(response, question_type, topic, subtopic, focus)
+        if question is not None:
+            return question
+        if error is not None:
+            logger.error(f"Error parsing response: {error}\nResponse: {response}")
+        return self._create_placeholder_question(question_type, topic, subtopic, focus)
+    
+    def _get_repair_request(self, response: str, error: str, question_type: str) -> str:
+        """Build the prompt asking the model to fix a single question that failed validation."""
+        logger.warning(f"Invalid {question_type} question ({error}); asking the model to fix it")
+        return get_repair_prompt(question_type, [(strip_think_block(response).strip(), error)])
+    
+    def _parse_batch(
+        self,
+        response: str,
+        question_type: str,
+        topic: str,
+        subtopic: Optional[str] = None,
+        focus: str = "text"
+    ) -> Tuple[List[BaseQuestion], List[Tuple[str, str]]]:
+        """
+        Parse a batch response, validating each item against the schema of its type.
+        
+        Args:
+            response: The response from the model
+            question_type: The type of questions to parse
+            topic: The main topic of the questions
+            subtopic: Optional subtopic of the questions
+            focus: Whether the questions focus on code or text
+            
+        Returns:
+            A tuple of (the valid Question objects, a (JSON text, validation error) pair
+            for each invalid item)
+        """
+        questions = []
+        invalid_items = []
+        for item in _extract_json_items(response):
+            if isinstance(item, dict) and "error" in item:
+                logger.warning(f"Skipping failed item in batch response: {str(item)[:100]}")
+                continue
+            try:
+                data = validate_question_data(item, question_type)
+            except QuestionValidationError as e:
+                logger.warning(f"Invalid item in batch response ({str(e)}): {str(item)[:100]}")
+                invalid_items.append((json.dumps(item, ensure_ascii=False), str(e)))
+                continue
+            questions.append(self._build_question(data, question_type, topic, subtopic, focus))
+        
+        logger.info(f"Parsed {len(questions)} questions from batch response")
+        return questions, invalid_items
+    
+    def parse_batch_response(
+        self,
+        response: str,
+        question_type: str,
+        topic: str,
+        subtopic: Optional[str] = None,
+        focus: str = "text"
+    ) -> List[BaseQuestion]:
+        """
+        Parse a response containing a JSON array of questions into Question objects.
+        
+        Items that are not valid questions are skipped, so the caller can request them again.
+        
+        Args:
+            response: The response from the model
+            question_type: The type of questions to parse
+            topic: The main topic of the questions
+            subtopic: Optional subtopic of the questions
+            focus: Whether the questions focus on code or text
+            
+        Returns:
+            A list of the valid Question objects in the response
+        """
+        return self._parse_batch(response, question_type, topic, subtopic, focus)[0]
@@ -0,0 +1,255 @@
+"""
+Quiz pipeline for the Quiz Generator package.
+
+This module contains the coroutine that turns a resolved route and the quiz
+parameters into a quiz file. It is shared by the generate_quiz MCP tool and the
+bulk manifest runner, so both resume from checkpoints, fill from the question bank,
+honour a deadline and keep the finished work of a cancelled quiz in the same way.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from ..prompts.prompt_templates import get_microcourse_prompt
+from ..utils.checkpoint import open_checkpoint
+from ..utils.host_agent import HostAgentError, ProviderRoute, TokenUsage, get_microcourse_response_async
+from ..utils.output_utils import create_bootable_quiz, create_html_quiz
+from ..utils.progress import QuizProgress
+from ..utils.question_bank import get_question_bank, is_question_bank_enabled
+from ..utils.rate_limiter import RequestLimiter
+from .question_generator import AnthropicQuestionGenerator, is_placeholder_question
+
+# Get the logger
+logger = logging.getLogger("quiz_generator")
+
+
+async def run_quiz_pipeline(
+    route: ProviderRoute,
+    topic: str,
+    subtopic: Optional[str] = None,
+    question_focus: str = "text",
+    question_type: str = "multiple_choice",
+    difficulty: str = "challenging",
+    num_questions: int = 5,
+    output_format: str = "html",
+    concurrent: bool = True,
+    max_workers: Optional[int] = None,
+    use_cache: Optional[bool] = None,
+    use_question_bank: Optional[bool] = None,
+    batch_size: Optional[int] = None,
+    stream: bool = False,
+    deadline: Optional[float] = None,
+    request_limiter: Optional[RequestLimiter] = None,
+    notify: Optional[Callable[[float, Optional[float], Optional[str]], Awaitable[None]]] = None,
+    checkpoint_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Generate a quiz and its microcourse and write the quiz file.
+    
+    Finished items are resumed from and written to the request's checkpoint, the quiz
+    is filled from the question bank first, and the microcourse and the questions are
+    generated in parallel. If the deadline passes, the quiz is made from the items that
+    finished in time. If the quiz is cancelled, the finished questions are saved to a
+    partial quiz file and the question bank before the cancellation is re-raised.
+    
+    Args:
+        route: The route resolved by resolve_route
+        topic: The main topic of the quiz
+        subtopic: Optional subtopic for more specific questions
+        question_focus: Whether questions should focus on code or text
+        question_type: The type of questions to generate (multiple_choice, true_false, cloze)
+        difficulty: The difficulty level of the questions
+        num_questions: Number of questions in the quiz
+        output_format: "bquiz" for a MagicTutor bootable quiz, anything else for HTML
+        concurrent: Whether to send all question prompts at once instead of one after another
+        max_workers: Optional limit on concurrent requests (default: a per-platform limit)
+        use_cache: Whether to reuse cached LLM responses (default: QUIZ_GENERATOR_RESPONSE_CACHE)
+        use_question_bank: Whether to fill the quiz from the question bank first
+                           (default: QUIZ_GENERATOR_QUESTION_BANK)
+        batch_size: Number of questions to request per LLM call (default: one call per question)
+        stream: Whether to stream responses, checking questions as they arrive
+        deadline: Optional number of seconds the whole quiz may take
+        request_limiter: Optional RequestLimiter shared with other quizzes, e.g. of a bulk run
+        notify: Optional async callback taking (progress, total, message), called as each item finishes
+        checkpoint_id: Optional ID keeping the checkpoint of this run apart from those of
+                       other runs of the same request, e.g. a bulk row key or a job ID
+    
+    Returns:
+        The result of the quiz: its file path, format, number of questions (and of failed
+        ones), topic, subtopic, tokens used, retries, elapsed seconds, whether the deadline
+        expired and the model (or models) used
+    
+    Raises:
+        HostAgentError: If no model is available
+    """
+    if route.platform == "no_model_available":
+        raise HostAgentError(
+            "No model available",
+            "Set an API key for Anthropic, OpenAI, GROQ or OpenRouter, or install Ollama with at least one model."
+        )
+    output_format = "bquiz" if output_format == "bquiz" else "html"
+    create_quiz = create_bootable_quiz if output_format == "bquiz" else create_html_quiz
+    
+    # Track the questions and the microcourse as they finish, and report progress
+    progress = QuizProgress(num_questions + 1, notify)
+    
+    # The deadline covers the whole quiz; every LLM call is cut to the time left before it
+    deadline_at = time.monotonic() + deadline if deadline else None
+    deadline_expired = False
+    
+    # Resume from the checkpoint of an earlier run of the same request, if there is one
+    checkpoint_request = {
+        "topic": topic,
+        "subtopic": subtopic,
+        "question_focus": question_focus,
+        "question_type": question_type,
+        "difficulty": difficulty,
+        "num_questions": num_questions,
+        "platform": route.platform,
+        "model": route.model
+    }
+    if checkpoint_id is not None:
+        checkpoint_request["checkpoint_id"] = checkpoint_id
+    checkpoint = await asyncio.to_thread(open_checkpoint, checkpoint_request)
+    missing_numbers = list(range(1, num_questions + 1))
+    if checkpoint:
+        for number, question in sorted(checkpoint.questions.items()):
+            progress.add_questions(number, [question], status="from checkpoint")
+        missing_numbers = checkpoint.get_missing_question_numbers(num_questions)
+    
+    # Fill the quiz from the question bank first, so only the shortfall is generated
+    question_bank = get_question_bank() if is_question_bank_enabled(use_question_bank) else None
+    if question_bank and missing_numbers:
+        banked_questions = await asyncio.to_thread(
+            question_bank.find_questions, topic, subtopic, question_type, question_focus, difficulty, len(missing_numbers)
+        )
+        for number, question in zip(missing_numbers, banked_questions):
+            progress.add_questions(number, [question], status="from question bank")
+            if checkpoint:
+                await asyncio.to_thread(checkpoint.add_questions, number, [question])
+        missing_numbers = missing_numbers[len(banked_questions):]
+    
+    # The checkpoint writes of finished questions, which run off the event loop
+    checkpoint_writes: Set[asyncio.Future] = set()
+    
+    def on_question(report):
+        progress.on_question(report)
+        if checkpoint:
+            write = asyncio.ensure_future(asyncio.to_thread(checkpoint.on_question, report))
+            checkpoint_writes.add(write)
+            write.add_done_callback(checkpoint_writes.discard)
+    
+    question_generator = AnthropicQuestionGenerator(
+        use_cache=use_cache, stream=stream, on_question=on_question,
+        request_limiter=request_limiter, deadline=deadline_at
+    )
+    
+    async def generate_microcourse():
+        if checkpoint and checkpoint.microcourse is not None:
+            progress.add_microcourse(checkpoint.microcourse, 0.0)
+            return checkpoint.microcourse
+        started = time.monotonic()
+        usage = TokenUsage()
+        content, _ = await get_microcourse_response_async(
+            get_microcourse_prompt(topic, subtopic or topic), route, use_cache, usage, request_limiter,
+            deadline=deadline_at
+        )
+        progress.add_microcourse(content, time.monotonic() - started, usage)
+        if checkpoint:
+            await asyncio.to_thread(checkpoint.add_microcourse, content)
+        return content
+    
+    # Generate the microcourse and the questions in parallel, since they do not depend
+    # on each other. Everything runs on the caller's event loop, so other work keeps
+    # being served while the quiz is generated. Once the deadline has passed, the
+    # items that are still running are stopped.
+    try:
+        microcourse_content, _ = await asyncio.wait_for(asyncio.gather(
+            generate_microcourse(),
+            question_generator.generate_questions_async(
+                question_type=question_type,
+                topic=topic,
+                subtopic=subtopic,
+                focus=question_focus,
+                difficulty=difficulty,
+                concurrent=concurrent,
+                max_workers=max_workers,
+                route=route,
+                batch_size=batch_size,
+                question_numbers=missing_numbers
+            )
+        ), None if deadline_at is None else max(0.0, deadline_at - time.monotonic()))
+    except asyncio.TimeoutError:
+        # Make the quiz from the items that finished in time
+        deadline_expired = True
+        microcourse_content = progress.microcourse
+        logger.warning(
+            f"Deadline of {deadline}s passed after {len(progress.get_questions())} of {num_questions} questions; "
+            "creating the quiz from the finished items"
+        )
+    except asyncio.CancelledError:
+        # The quiz was cancelled. Keep the questions that were finished, so the work
+        # is not lost: save them to a partial quiz file and the question bank. The file
+        # and database writes run off the event loop, shielded from the cancellation,
+        # so they finish without stalling other work on the loop.
+        finished_questions = progress.get_questions()
+        if finished_questions:
+            partial_path = await asyncio.shield(asyncio.to_thread(
+                create_quiz, finished_questions, topic, subtopic, progress.microcourse
+            ))
+            logger.warning(f"Quiz cancelled after {len(finished_questions)} of {num_questions} questions; partial quiz saved to {partial_path}")
+            if checkpoint:
+                logger.info(f"Run the same request again to resume from checkpoint {checkpoint.path}")
+            if question_bank:
+                await asyncio.shield(asyncio.to_thread(
+                    question_bank.add_questions,
+                    [q for q in finished_questions if not is_placeholder_question(q)],
+                    difficulty
+                ))
+        if checkpoint_writes:
+            # Let the pending checkpoint writes finish, so a rerun resumes from them
+            await asyncio.shield(asyncio.gather(*checkpoint_writes))
+        raise
+    # Every question, whether from the checkpoint, the question bank or the LLM, in question order
+    questions = progress.get_questions()
+    
+    # Keep the generated questions for later quizzes. The bank skips questions it already
+    # has, so questions that were banked or stored by an earlier run are not duplicated.
+    if question_bank:
+        await asyncio.to_thread(
+            question_bank.add_questions,
+            [q for q in questions if not is_placeholder_question(q)],
+            difficulty
+        )
+    
+    # File output is blocking, so run it off the event loop
+    file_path = await asyncio.to_thread(create_quiz, questions, topic, subtopic, microcourse_content)
+    
+    # The quiz is written, so it no longer needs to be resumed, unless the deadline cut it short.
+    # The pending checkpoint writes finish first, so none of them recreates the file.
+    if checkpoint_writes:
+        await asyncio.gather(*checkpoint_writes)
+    if checkpoint and not deadline_expired:
+        await asyncio.to_thread(checkpoint.remove)
+    
+    # Make sure the caller has every progress update before the result
+    await progress.flush()
+    
+    # The models that actually served the quiz. This is the route's model unless requests
+    # failed over to another provider; the model of each question is in the progress items.
+    models_used = progress.get_models_used()
+    return {
+        "file_path": file_path,
+        "format": output_format,
+        "num_questions": len(questions),
+        "failed_questions": sum(1 for q in questions if is_placeholder_question(q)),
+        "topic": topic,
+        "subtopic": subtopic,
+        "tokens_used": progress.usage.total_tokens,
+        "retries": progress.usage.retries,
+        "elapsed_seconds": round(progress.elapsed, 2),
+        "deadline_expired": deadline_expired,
+        "model_used": ", ".join(models_used) if models_used else route.model
+    }
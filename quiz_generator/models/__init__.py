@@ -8,12 +8,20 @@ from .question_models import (
     BaseQuestion,
     MultipleChoiceQuestion,
     TrueFalseQuestion,
-    ClozeQuestion
+    ClozeQuestion,
+    QuestionValidationError,
+    get_question_schema,
+    question_from_dict,
+    validate_question_data
 )
 
 __all__ = [
     'BaseQuestion',
     'MultipleChoiceQuestion',
     'TrueFalseQuestion',
-    'ClozeQuestion'
+    'ClozeQuestion',
+    'QuestionValidationError',
+    'get_question_schema',
+    'question_from_dict',
+    'validate_question_data'
 ]
@@ -2,11 +2,29 @@
 Question model classes for the Quiz Generator package.
 
 This module contains the base question class and specific question type classes.
+
+The questions are slotted dataclasses: a question bank can hold tens of thousands of
+them, so they carry no per-instance __dict__. The JSON codec encodes them directly
+(see utils.json_codec), the field types are checked when a question is created, and
+questions compare and hash by value, so duplicates can be dropped with a set.
 """
 
-from typing import Dict, Any, List, Optional
+import re
+from dataclasses import dataclass
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
+
+# Pattern for the label at the start of an option, e.g. "B." or "B)"
+OPTION_LABEL_PATTERN = re.compile(r'\s*([A-Za-z])[.)]\s*(.*)', re.DOTALL)
+
+# The blank of a cloze question
+CLOZE_BLANK = "___"
 
 
+class QuestionValidationError(ValueError):
+    """Error raised when the data of a question does not match the schema of its question type."""
+
+
+@dataclass(init=False, eq=False)
 class BaseQuestion:
     """
     Base class for all question types.
@@ -22,6 +40,29 @@ class BaseQuestion:
         concept_phrase: A short phrase describing what the question is about
     """
     
+    __slots__ = ("question", "type", "explanation", "topic", "subtopic", "focus", "language", "concept_phrase")
+    
+    question: str
+    type: str
+    explanation: str
+    topic: str
+    subtopic: Optional[str]
+    focus: str
+    language: Optional[str]
+    concept_phrase: str
+    
+    # Type (or types) each field must hold, checked by _check_types
+    _field_types: ClassVar[Dict[str, Any]] = {
+        "question": str,
+        "type": str,
+        "explanation": str,
+        "topic": str,
+        "subtopic": (str, type(None)),
+        "focus": str,
+        "language": (str, type(None)),
+        "concept_phrase": str
+    }
+    
     def __init__(self, question: str, type: str, explanation: str, topic: str, 
                  subtopic: Optional[str] = None, focus: str = "text", 
                  language: Optional[str] = None, concept_phrase: str = ""):
@@ -34,6 +75,53 @@ class BaseQuestion:
         self.language = language
         self.concept_phrase = concept_phrase
     
+    def _check_types(self) -> None:
+        """
+        Check that each field holds a value of its type. Called at the end of the
+        __init__ of each question type, once all of its fields are set.
+        
+        Raises:
+            QuestionValidationError: If a field holds a value of another type
+        """
+        for field, expected in self._field_types.items():
+            value = getattr(self, field)
+            if not isinstance(value, expected):
+                names = " or ".join(t.__name__ for t in expected) if isinstance(expected, tuple) else expected.__name__
+                raise QuestionValidationError(
+                    f'{self.__class__.__name__}.{field} must be {names}, got {value.__class__.__name__}'
+                )
+    
+    def _key(self) -> Tuple[Any, ...]:
+        """Get the values of the fields, in a tuple that compares by value."""
+        return (self.question, self.type, self.explanation, self.topic, self.subtopic,
+                self.focus, self.language, self.concept_phrase)
+    
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._key() == other._key()
+    
+    def __hash__(self) -> int:
+        # Equal questions have the same type and text, so hashing those two is enough
+        return hash((self.type, self.question))
+    
+    def to_json_bytes(self, indent: bool = False) -> bytes:
+        """
+        Encode the question as UTF-8 JSON, the same object as to_dict produces.
+        
+        With msgspec installed the question is encoded without building the
+        dictionary first.
+        
+        Args:
+            indent: Whether to indent the JSON by two spaces
+            
+        Returns:
+            The JSON of the question
+        """
+        # Imported here, since the utils package imports this module
+        from ..utils import json_codec
+        return json_codec.dumps_bytes(self, indent)
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert the question to a dictionary."""
         return {
@@ -46,8 +134,68 @@ class BaseQuestion:
             "language": self.language,
             "concept_phrase": self.concept_phrase
         }
+    
+    @classmethod
+    def validate_data(cls, data: Any) -> Dict[str, Any]:
+        """
+        Check the question data returned by a model against the schema of the question type.
+        
+        Args:
+            data: The parsed JSON of the question
+            
+        Returns:
+            A copy of the data, with the answer normalized where that is unambiguous
+            
+        Raises:
+            QuestionValidationError: If the data does not match the schema
+        """
+        if not isinstance(data, dict):
+            raise QuestionValidationError(f"expected a JSON object, got {type(data).__name__}")
+        if not isinstance(data.get("question"), str) or not data["question"].strip():
+            raise QuestionValidationError('"question" must be a non-empty string')
+        for field in ("explanation", "concept_phrase", "language"):
+            if data.get(field) is not None and not isinstance(data[field], str):
+                raise QuestionValidationError(f'"{field}" must be a string')
+        return dict(data)
+    
+    @classmethod
+    def _answer_schema(cls) -> Dict[str, Any]:
+        """Get the JSON schema of the fields that hold the answer of the question type."""
+        return {}
+    
+    @classmethod
+    def json_schema(cls) -> Dict[str, Any]:
+        """
+        Get the JSON schema of the question data a model returns for the question type.
+        
+        Every field is required and no other fields are allowed, so the schema can be
+        used for the strict structured output of the platforms that support it.
+        
+        Returns:
+            A JSON schema of an object
+        """
+        properties = {
+            "question": {"type": "string", "description": "The question text"},
+            **cls._answer_schema(),
+            "concept_phrase": {
+                "type": "string",
+                "description": "A short 4-5 word phrase describing what this question is about"
+            },
+            "explanation": {"type": "string", "description": "Why the correct answer is right"},
+            "language": {
+                "type": ["string", "null"],
+                "description": "The programming language of the code in the question, or null"
+            }
+        }
+        return {
+            "type": "object",
+            "properties": properties,
+            "required": list(properties),
+            "additionalProperties": False
+        }
 
 
+@dataclass(init=False, eq=False)
 class MultipleChoiceQuestion(BaseQuestion):
     """
     Multiple-choice question class.
@@ -57,6 +205,17 @@ class MultipleChoiceQuestion(BaseQuestion):
         correct_answer: The correct option string
     """
     
+    __slots__ = ("options", "correct_answer")
+    
+    options: List[str]
+    correct_answer: str
+    
+    _field_types: ClassVar[Dict[str, Any]] = {
+        **BaseQuestion._field_types,
+        "options": list,
+        "correct_answer": str
+    }
+    
     def __init__(self, question: str, options: List[str], correct_answer: str, 
                  explanation: str, topic: str, subtopic: Optional[str] = None, 
                  focus: str = "text", language: Optional[str] = None, 
@@ -65,15 +224,98 @@ class MultipleChoiceQuestion(BaseQuestion):
                          subtopic, focus, language, concept_phrase)
         self.options = options
         self.correct_answer = correct_answer
+        self._check_types()
+    
+    def _check_types(self) -> None:
+        """Check the types of the fields, and that each option is a string."""
+        super()._check_types()
+        if not all(isinstance(option, str) for option in self.options):
+            raise QuestionValidationError(f"{self.__class__.__name__}.options must be a list of str")
+    
+    def _key(self) -> Tuple[Any, ...]:
+        """Get the values of the fields, in a tuple that compares by value."""
+        return super()._key() + (tuple(self.options), self.correct_answer)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert the question to a dictionary."""
-        result = super().to_dict()
-        result["options"] = self.options
-        result["correct_answer"] = self.correct_answer
-        return result
+        return {
+            "question": self.question,
+            "type": self.type,
+            "explanation": self.explanation,
+            "topic": self.topic,
+            "subtopic": self.subtopic,
+            "focus": self.focus,
+            "language": self.language,
+            "concept_phrase": self.concept_phrase,
+            "options": self.options,
+            "correct_answer": self.correct_answer
+        }
+    
+    @classmethod
+    def validate_data(cls, data: Any) -> Dict[str, Any]:
+        """
+        Check the data of a multiple choice question. The correct answer must be one of
+        the options; a bare option label (e.g. "B" for "B. Lists") is expanded to the option.
+        """
+        data = super().validate_data(data)
+        options = data.get("options")
+        if not isinstance(options, list) or len(options) < 2 or not all(
+            isinstance(option, str) and option.strip() for option in options
+        ):
+            raise QuestionValidationError('"options" must be a list of at least two non-empty strings')
+        if len(set(options)) < len(options):
+            raise QuestionValidationError('"options" must not repeat an option')
+        
+        answer = data.get("correct_answer")
+        if not isinstance(answer, str) or not answer.strip():
+            raise QuestionValidationError('"correct_answer" must be a non-empty string')
+        if answer not in options:
+            label = answer.strip().rstrip(".)").upper()
+            matches = []
+            for option in options:
+                match = OPTION_LABEL_PATTERN.match(option)
+                if match and (match.group(1).upper() == label or match.group(2).strip() == answer.strip()):
+                    matches.append(option)
+            if len(matches) != 1:
+                raise QuestionValidationError(f'"correct_answer" {answer!r} is not one of the options')
+            data["correct_answer"] = matches[0]
+        return data
+    
+    @classmethod
+    def _answer_schema(cls) -> Dict[str, Any]:
+        """Get the JSON schema of the options and the correct answer."""
+        return {
+            "options": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": 'The options, each starting with its label, e.g. "A. Option text"'
+            },
+            "correct_answer": {
+                "type": "string",
+                "description": "The correct option, exactly as it appears in options"
+            }
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MultipleChoiceQuestion":
+        """
+        Create a question from a dictionary produced by to_dict. A null explanation or
+        concept phrase, which older versions could store, is read as an empty string.
+        """
+        return cls(
+            question=data["question"],
+            options=data["options"],
+            correct_answer=data["correct_answer"],
+            explanation=data["explanation"] or "",
+            topic=data["topic"],
+            subtopic=data.get("subtopic"),
+            focus=data.get("focus", "text"),
+            language=data.get("language"),
+            concept_phrase=data.get("concept_phrase") or ""
+        )
 
 
+@dataclass(init=False, eq=False)
 class TrueFalseQuestion(BaseQuestion):
     """
     True/False question class.
@@ -82,20 +324,73 @@ class TrueFalseQuestion(BaseQuestion):
         correct_answer: Boolean indicating whether the statement is true or false
     """
     
+    __slots__ = ("correct_answer",)
+    
+    correct_answer: bool
+    
+    _field_types: ClassVar[Dict[str, Any]] = {**BaseQuestion._field_types, "correct_answer": bool}
+    
     def __init__(self, question: str, correct_answer: bool, explanation: str, 
                  topic: str, subtopic: Optional[str] = None, focus: str = "text", 
                  language: Optional[str] = None, concept_phrase: str = ""):
         super().__init__(question, "true_false", explanation, topic, 
                          subtopic, focus, language, concept_phrase)
         self.correct_answer = correct_answer
+        self._check_types()
+    
+    def _key(self) -> Tuple[Any, ...]:
+        """Get the values of the fields, in a tuple that compares by value."""
+        return super()._key() + (self.correct_answer,)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert the question to a dictionary."""
-        result = super().to_dict()
-        result["correct_answer"] = self.correct_answer
-        return result
+        return {
+            "question": self.question,
+            "type": self.type,
+            "explanation": self.explanation,
+            "topic": self.topic,
+            "subtopic": self.subtopic,
+            "focus": self.focus,
+            "language": self.language,
+            "concept_phrase": self.concept_phrase,
+            "correct_answer": self.correct_answer
+        }
+    
+    @classmethod
+    def validate_data(cls, data: Any) -> Dict[str, Any]:
+        """
+        Check the data of a true/false question. The correct answer must be a boolean;
+        the strings "true" and "false" are converted.
+        """
+        data = super().validate_data(data)
+        answer = data.get("correct_answer")
+        if isinstance(answer, str) and answer.strip().lower() in ("true", "false"):
+            data["correct_answer"] = answer.strip().lower() == "true"
+        elif not isinstance(answer, bool):
+            raise QuestionValidationError('"correct_answer" must be the boolean true or false')
+        return data
+    
+    @classmethod
+    def _answer_schema(cls) -> Dict[str, Any]:
+        """Get the JSON schema of the correct answer."""
+        return {"correct_answer": {"type": "boolean", "description": "Whether the statement is true"}}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TrueFalseQuestion":
+        """Create a question from a dictionary produced by to_dict."""
+        return cls(
+            question=data["question"],
+            correct_answer=data["correct_answer"],
+            explanation=data["explanation"] or "",
+            topic=data["topic"],
+            subtopic=data.get("subtopic"),
+            focus=data.get("focus", "text"),
+            language=data.get("language"),
+            concept_phrase=data.get("concept_phrase") or ""
+        )
 
 
+@dataclass(init=False, eq=False)
 class ClozeQuestion(BaseQuestion):
     """
     Cloze (fill-in-the-blank) question class.
@@ -104,15 +399,144 @@ class ClozeQuestion(BaseQuestion):
         correct_answer: The correct answer to fill in the blank
     """
     
+    __slots__ = ("correct_answer",)
+    
+    correct_answer: str
+    
+    _field_types: ClassVar[Dict[str, Any]] = {**BaseQuestion._field_types, "correct_answer": str}
+    
     def __init__(self, question: str, correct_answer: str, explanation: str, 
                  topic: str, subtopic: Optional[str] = None, focus: str = "text", 
                  language: Optional[str] = None, concept_phrase: str = ""):
         super().__init__(question, "cloze", explanation, topic, 
                          subtopic, focus, language, concept_phrase)
         self.correct_answer = correct_answer
+        self._check_types()
+    
+    def _key(self) -> Tuple[Any, ...]:
+        """Get the values of the fields, in a tuple that compares by value."""
+        return super()._key() + (self.correct_answer,)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert the question to a dictionary."""
-        result = super().to_dict()
-        result["correct_answer"] = self.correct_answer
-        return result
+        return {
+            "question": self.question,
+            "type": self.type,
+            "explanation": self.explanation,
+            "topic": self.topic,
+            "subtopic": self.subtopic,
+            "focus": self.focus,
+            "language": self.language,
+            "concept_phrase": self.concept_phrase,
+            "correct_answer": self.correct_answer
+        }
+    
+    @classmethod
+    def validate_data(cls, data: Any) -> Dict[str, Any]:
+        """
+        Check the data of a cloze question. The question must contain the blank "___"
+        and the correct answer must be a non-empty string; numbers are converted.
+        """
+        data = super().validate_data(data)
+        if CLOZE_BLANK not in data["question"]:
+            raise QuestionValidationError(f'"question" must contain the blank "{CLOZE_BLANK}"')
+        answer = data.get("correct_answer")
+        if isinstance(answer, (int, float)) and not isinstance(answer, bool):
+            data["correct_answer"] = answer = str(answer)
+        if not isinstance(answer, str) or not answer.strip():
+            raise QuestionValidationError('"correct_answer" must be a non-empty string')
+        return data
+    
+    @classmethod
+    def _answer_schema(cls) -> Dict[str, Any]:
+        """Get the JSON schema of the correct answer."""
+        return {"correct_answer": {"type": "string", "description": f'The answer that fills the blank "{CLOZE_BLANK}"'}}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ClozeQuestion":
+        """Create a question from a dictionary produced by to_dict."""
+        return cls(
+            question=data["question"],
+            correct_answer=data["correct_answer"],
+            explanation=data["explanation"] or "",
+            topic=data["topic"],
+            subtopic=data.get("subtopic"),
+            focus=data.get("focus", "text"),
+            language=data.get("language"),
+            concept_phrase=data.get("concept_phrase") or ""
+        )
+
+
+# Question class of each question type
+QUESTION_CLASSES = {
+    "multiple_choice": MultipleChoiceQuestion,
+    "true_false": TrueFalseQuestion,
+    "cloze": ClozeQuestion
+}
+
+
+def question_from_dict(data: Dict[str, Any]) -> BaseQuestion:
+    """
+    Create a question of the right type from a dictionary produced by to_dict.
+    
+    Args:
+        data: The question dictionary, including its "type"
+        
+    Returns:
+        A MultipleChoiceQuestion, TrueFalseQuestion or ClozeQuestion
+    """
+    question_class = QUESTION_CLASSES.get(data.get("type"))
+    if question_class is None:
+        raise ValueError(f"Unknown question type: {data.get('type')}")
+    return question_class.from_dict(data)
+
+
+def validate_question_data(data: Any, question_type: str) -> Dict[str, Any]:
+    """
+    Check the question data returned by a model against the schema of its question type.
+    
+    Args:
+        data: The parsed JSON of the question
+        question_type: The type of question (multiple_choice, true_false, cloze)
+        
+    Returns:
+        A copy of the data, with the answer normalized where that is unambiguous
+        
+    Raises:
+        QuestionValidationError: If the data does not match the schema
+        ValueError: If the question type is unknown
+    """
+    question_class = QUESTION_CLASSES.get(question_type)
+    if question_class is None:
+        raise ValueError(f"Unknown question type: {question_type}")
+    return question_class.validate_data(data)
+
+
+def get_question_schema(question_type: str, batch: bool = False) -> Dict[str, Any]:
+    """
+    Get the JSON schema of the response to a question request, for structured output.
+    
+    Args:
+        question_type: The type of question (multiple_choice, true_false, cloze)
+        batch: Whether the response holds several questions. The platforms require an
+               object at the top level, so the questions are wrapped in a "questions" field.
+        
+    Returns:
+        A JSON schema with a "title" that names it
+        
+    Raises:
+        ValueError: If the question type is unknown
+    """
+    question_class = QUESTION_CLASSES.get(question_type)
+    if question_class is None:
+        raise ValueError(f"Unknown question type: {question_type}")
+    schema = question_class.json_schema()
+    if not batch:
+        return {"title": f"{question_type}_question", **schema}
+    return {
+        "title": f"{question_type}_questions",
+        "type": "object",
+        "properties": {"questions": {"type": "array", "items": schema}},
+        "required": ["questions"],
+        "additionalProperties": False
+    }
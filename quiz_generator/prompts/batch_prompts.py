@@ -0,0 +1,47 @@
+"""
+Batch question prompt templates.
+
+This module contains functions for generating prompts that ask for several questions in one request.
+"""
+
+from typing import List, Optional
+
+
+def get_batch_prompt(
+    question_prompt: str,
+    num_questions: int,
+    avoid_concepts: Optional[List[str]] = None
+) -> str:
+    """
+    Generate a prompt for creating several questions in one request.
+    
+    The batch prompt wraps a single-question prompt, so the instructions, question
+    stems and JSON structure are sent once for the whole batch instead of once per question.
+    
+    Args:
+        question_prompt: The prompt for a single question (e.g., from get_multiple_choice_prompt)
+        num_questions: The number of questions to create
+        avoid_concepts: Optional concept phrases of questions that already exist, which
+                        the new questions should not repeat
+    
+    Returns:
+        A prompt for the Anthropic model
+    """
+    avoid_text = ""
+    if avoid_concepts:
+        avoid_text = f"""
+        Do NOT repeat the concepts of these existing questions: {'; '.join(avoid_concepts)}
+        """
+    
+    prompt = f"""
+        Create {num_questions} different questions following the instructions below.
+        Each question must test a different concept and have a different concept_phrase.
+        {avoid_text}
+        {question_prompt}
+        
+        BATCH FORMAT:
+        Instead of a single JSON object, return ONLY a JSON array containing exactly {num_questions} JSON objects,
+        each with the structure described above. Do NOT wrap the array in ```json code blocks.
+        """
+    
+    return prompt
@@ -0,0 +1,58 @@
+"""
+Repair prompt templates.
+
+This module contains functions for generating prompts that ask the model to fix
+questions that failed validation, instead of generating them again from scratch.
+"""
+
+from typing import List, Tuple
+
+# Characters of an invalid question included in a repair prompt
+MAX_REPAIR_ITEM_CHARS = 4000
+
+# The rule of each question type that models most often break
+QUESTION_TYPE_RULES = {
+    "multiple_choice": 'The "correct_answer" must be exactly one of the strings in "options".',
+    "true_false": 'The "correct_answer" must be the JSON boolean true or false, not a string.',
+    "cloze": 'The "question" must contain the blank as "___" (three underscores), and "correct_answer" must fill it.'
+}
+
+
+def get_repair_prompt(
+    question_type: str,
+    invalid_items: List[Tuple[str, str]],
+    batch: bool = False
+) -> str:
+    """
+    Generate a prompt for fixing questions that failed validation.
+    
+    Args:
+        question_type: The type of the questions (multiple_choice, true_false, cloze)
+        invalid_items: A (question text as returned by the model, validation error) pair for each question
+        batch: Whether to ask for a JSON array of the fixed questions instead of a single object
+    
+    Returns:
+        A prompt for the Anthropic model
+    """
+    items_text = "\n\n".join(
+        f"Question {index}: {error}\n{item[:MAX_REPAIR_ITEM_CHARS]}"
+        for index, (item, error) in enumerate(invalid_items, start=1)
+    )
+    if batch:
+        format_text = (
+            f"Return ONLY a JSON array containing the {len(invalid_items)} corrected question objects, "
+            "in the same order."
+        )
+    else:
+        format_text = "Return ONLY the corrected question as a JSON object."
+    
+    prompt = f"""
+        The following quiz questions are invalid. The problem is given before each one.
+        
+        {items_text}
+        
+        Fix each question, keeping its content and all of its fields. {QUESTION_TYPE_RULES.get(question_type, "")}
+        {format_text} Do NOT wrap the JSON in ```json code blocks.
+        """
+    
+    return prompt
@@ -5,9 +5,12 @@ This module contains MCP tool functions.
 """
 
 from .mcp_tools import get_host_agent_response, test_host_agent, generate_quiz
+from .bulk_tools import generate_quizzes_from_manifest, load_manifest
 
 __all__ = [
     'get_host_agent_response',
     'test_host_agent',
-    'generate_quiz'
+    'generate_quiz',
+    'generate_quizzes_from_manifest',
+    'load_manifest'
 ]
@@ -0,0 +1,413 @@
+"""
+Bulk quiz generation for the Quiz Generator package.
+
+This module generates a whole catalog of quizzes from a CSV or JSONL manifest, with
+one quiz per row. Every LLM call of the run shares one RequestLimiter, so the run
+stays within a global concurrency and rate limit, and finished rows are recorded in
+a state file so a run that was interrupted can be resumed.
+
+It can also be run from the command line:
+    
+    python -m quiz_generator.tools.bulk_tools manifest.csv --requests 8 --rpm 60
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ..generators.quiz_pipeline import run_quiz_pipeline
+from ..utils.host_agent import resolve_route
+from ..utils import json_codec
+from ..utils.rate_limiter import RequestLimiter
+
+# Get the logger
+logger = logging.getLogger("quiz_generator")
+
+# Manifest columns and their defaults. Only topic is required.
+MANIFEST_DEFAULTS: Dict[str, Any] = {
+    "topic": None,
+    "subtopic": None,
+    "question_focus": "text",
+    "question_type": "multiple_choice",
+    "difficulty": "challenging",
+    "num_questions": 5,
+    "output_format": "html",
+    "model": None,
+    "platform": None,
+    "batch_size": None,
+    "stream": False,
+    "use_question_bank": None,
+    "deadline": None,
+}
+_INT_FIELDS = ("num_questions", "batch_size")
+_FLOAT_FIELDS = ("deadline",)
+_BOOL_FIELDS = ("stream", "use_question_bank")
+
+# Columns that do not change which quiz a row asks for, so they are left out of its key
+_ROW_KEY_EXCLUDED_FIELDS = ("use_question_bank", "deadline")
+_TRUE_VALUES = ("1", "true", "yes", "on")
+
+# Default number of quizzes generated at once, and of LLM requests in flight across them
+DEFAULT_BULK_QUIZZES = 4
+DEFAULT_BULK_REQUESTS = 8
+
+# Suffix of the state file written next to the manifest by default
+STATE_FILE_SUFFIX = ".state.jsonl"
+
+
+class ManifestError(ValueError):
+    """Error raised when a manifest cannot be read."""
+
+
+def _normalize_row(raw: Dict[str, Any], line: int) -> Dict[str, Any]:
+    """
+    Turn a manifest row into generate_quiz parameters, filling in the defaults.
+    
+    Args:
+        raw: The row as read from the manifest
+        line: The line number of the row, used in error messages
+    
+    Returns:
+        The quiz parameters of the row
+    """
+    row = dict(MANIFEST_DEFAULTS)
+    for name, value in raw.items():
+        if name is None:
+            continue
+        name = name.strip()
+        if name not in MANIFEST_DEFAULTS:
+            logger.warning(f"Ignoring unknown manifest column {name!r} on line {line}")
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if not value:
+                continue
+        if value is None:
+            continue
+        
+        try:
+            if name in _INT_FIELDS:
+                value = int(value)
+            elif name in _FLOAT_FIELDS:
+                value = float(value)
+            elif name in _BOOL_FIELDS and isinstance(value, str):
+                value = value.lower() in _TRUE_VALUES
+        except ValueError:
+            raise ManifestError(f"Invalid {name} on line {line} of the manifest: {value!r}")
+        row[name] = value
+    
+    if not row["topic"]:
+        raise ManifestError(f"Line {line} of the manifest has no topic")
+    return row
+
+
+def load_manifest(manifest_path: str) -> List[Dict[str, Any]]:
+    """
+    Read the quizzes to generate from a manifest.
+    
+    A .csv manifest has a header row naming the columns; a .jsonl manifest has one
+    JSON object per line. The columns are the generate_quiz parameters in
+    MANIFEST_DEFAULTS, of which only topic is required.
+    
+    Args:
+        manifest_path: The path of the manifest
+    
+    Returns:
+        The quiz parameters of each row, in manifest order
+    
+    Raises:
+        ManifestError: If the manifest has an unknown format or an invalid row
+    """
+    extension = os.path.splitext(manifest_path)[1].lower()
+    rows = []
+    if extension == ".csv":
+        with open(manifest_path, "r", encoding="utf-8-sig", newline="") as f:
+            for raw in csv.DictReader(f):
+                rows.append(_normalize_row(raw, len(rows) + 2))
+    elif extension in (".jsonl", ".ndjson"):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    raw = json_codec.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ManifestError(f"Invalid JSON on line {line_number} of the manifest: {str(e)}")
+                if not isinstance(raw, dict):
+                    raise ManifestError(f"Line {line_number} of the manifest is not a JSON object")
+                rows.append(_normalize_row(raw, line_number))
+    else:
+        raise ManifestError(f"Unsupported manifest format {extension!r}; use .csv or .jsonl")
+    return rows
+
+
+def get_row_keys(rows: List[Dict[str, Any]]) -> List[str]:
+    """
+    Get a key identifying each manifest row in the state file.
+    
+    The key is a hash of the row's parameters, so rows can be reordered or added to
+    the manifest between runs. Identical rows are numbered to keep them apart.
+    
+    Args:
+        rows: The rows returned by load_manifest
+    
+    Returns:
+        A key for each row
+    """
+    keys = []
+    seen: Dict[str, int] = {}
+    for row in rows:
+        identity = {name: value for name, value in row.items() if name not in _ROW_KEY_EXCLUDED_FIELDS}
+        digest = hashlib.sha256(json.dumps(identity, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+        seen[digest] = seen.get(digest, 0) + 1
+        keys.append(f"{digest[:16]}-{seen[digest]}")
+    return keys
+
+
+class BulkRunState:
+    """
+    The record of the finished rows of a bulk run.
+    
+    Each finished row is appended to a JSON Lines file as soon as its quiz has been
+    written, so a run that crashes or is stopped loses at most the quizzes that were
+    in progress. Rows that failed are not recorded and are retried by the next run.
+    
+    Attributes:
+        path: The path of the state file
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+    
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Read the finished rows.
+        
+        Returns:
+            The result of each finished row, by row key
+        """
+        finished = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json_codec.loads(line)
+                    except json.JSONDecodeError:
+                        # The last line may have been cut off by a crash
+                        continue
+                    finished[entry["key"]] = entry["result"]
+        except FileNotFoundError:
+            pass
+        return finished
+    
+    def record(self, key: str, result: Dict[str, Any]) -> None:
+        """
+        Record a finished row.
+        
+        Args:
+            key: The row key from get_row_keys
+            result: The result of the row's quiz
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json_codec.dumps({"key": key, "result": result}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+async def generate_quiz_from_row(
+    row: Dict[str, Any],
+    request_limiter: Optional[RequestLimiter] = None,
+    use_cache: Optional[bool] = None,
+    row_key: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Generate the quiz of one manifest row and write it to the output directory.
+    
+    The row runs through the same pipeline as generate_quiz: finished items are
+    checkpointed, so a row that was interrupted part way through resumes from its
+    finished questions, and the quiz is filled from the question bank first.
+    
+    Args:
+        row: The quiz parameters of the row
+        request_limiter: Optional RequestLimiter shared by every quiz of the run
+        use_cache: Whether to reuse cached LLM responses (default: QUIZ_GENERATOR_RESPONSE_CACHE)
+        row_key: Optional key of the row from get_row_keys, which keeps the row's checkpoint
+                 apart from those of identical rows and of other runs of the same quiz
+    
+    Returns:
+        The result of the quiz, as returned by generate_quiz
+    
+    Raises:
+        HostAgentError: If no model is available
+    """
+    # Resolving the route may probe Ollama over HTTP, so it runs off the event loop
+    route = await asyncio.to_thread(resolve_route, row["platform"], row["model"])
+    return await run_quiz_pipeline(
+        route,
+        row["topic"],
+        row["subtopic"],
+        question_focus=row["question_focus"],
+        question_type=row["question_type"],
+        difficulty=row["difficulty"],
+        num_questions=row["num_questions"],
+        output_format=row["output_format"],
+        use_cache=use_cache,
+        use_question_bank=row["use_question_bank"],
+        batch_size=row["batch_size"],
+        stream=row["stream"],
+        deadline=row["deadline"],
+        request_limiter=request_limiter,
+        checkpoint_id=row_key
+    )
+
+
+async def generate_quizzes_from_manifest(
+    manifest_path: str,
+    max_concurrent_quizzes: Optional[int] = None,
+    max_concurrent_requests: Optional[int] = None,
+    requests_per_minute: Optional[float] = None,
+    use_cache: Optional[bool] = None,
+    state_path: Optional[str] = None,
+    notify: Optional[Callable[[float, Optional[float], Optional[str]], Awaitable[None]]] = None
+) -> Dict[str, Any]:
+    """
+    Generate every quiz of a manifest.
+    
+    Quizzes run a few at a time, and every LLM request of the run waits for one shared
+    RequestLimiter, so the limits hold across the whole manifest rather than per quiz.
+    The pooled provider clients are reused by every request. Rows that a previous run
+    of the same manifest finished are skipped.
+    
+    Args:
+        manifest_path: The path of the CSV or JSONL manifest
+        max_concurrent_quizzes: The number of quizzes generated at once (default: DEFAULT_BULK_QUIZZES)
+        max_concurrent_requests: The number of LLM requests in flight across all quizzes
+                                 (default: DEFAULT_BULK_REQUESTS)
+        requests_per_minute: Optional limit on the LLM requests started per minute
+        use_cache: Whether to reuse cached LLM responses (default: QUIZ_GENERATOR_RESPONSE_CACHE)
+        state_path: The path of the state file (default: the manifest path plus STATE_FILE_SUFFIX)
+        notify: Optional async callback taking (progress, total, message), called as each
+                quiz finishes, e.g. an MCP Context's report_progress
+    
+    Returns:
+        A summary of the run, with the result of each row in manifest order
+    
+    Raises:
+        ManifestError: If the manifest cannot be read
+    """
+    started = time.monotonic()
+    rows = load_manifest(manifest_path)
+    keys = get_row_keys(rows)
+    state = BulkRunState(state_path or manifest_path + STATE_FILE_SUFFIX)
+    finished = state.load()
+    
+    request_limiter = RequestLimiter(max_concurrent_requests or DEFAULT_BULK_REQUESTS, requests_per_minute)
+    quiz_semaphore = asyncio.Semaphore(max(1, max_concurrent_quizzes or DEFAULT_BULK_QUIZZES))
+    results: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+    done = 0
+    
+    async def report(index: int) -> None:
+        nonlocal done
+        done += 1
+        result = results[index]
+        message = f"Quiz {index + 1} ({rows[index]['topic']}) {result['status']}; {done}/{len(rows)} quizzes done"
+        logger.info(message)
+        if notify is not None:
+            try:
+                await notify(done, len(rows), message)
+            except Exception as e:
+                logger.warning(f"Error sending progress update: {str(e)}")
+    
+    async def run(index: int) -> None:
+        key = keys[index]
+        if key in finished:
+            results[index] = {"status": "skipped", **finished[key]}
+            await report(index)
+            return
+        
+        async with quiz_semaphore:
+            try:
+                result = await generate_quiz_from_row(rows[index], request_limiter, use_cache, key)
+            except Exception as e:
+                logger.error(f"Error generating quiz {index + 1} of the manifest ({rows[index]['topic']}): {str(e)}")
+                results[index] = {"status": "failed", "topic": rows[index]["topic"],
+                                  "subtopic": rows[index]["subtopic"], "error": str(e)}
+            else:
+                if result["deadline_expired"]:
+                    # Not recorded, so the next run resumes the row from its checkpoint
+                    results[index] = {"status": "incomplete", **result}
+                else:
+                    await asyncio.to_thread(state.record, key, result)
+                    results[index] = {"status": "completed", **result}
+        await report(index)
+    
+    logger.info(f"Generating {len(rows)} quizzes from {manifest_path} ({len(finished)} rows already finished)")
+    await asyncio.gather(*(run(index) for index in range(len(rows))))
+    
+    counts = {
+        status: sum(1 for r in results if r["status"] == status)
+        for status in ("completed", "incomplete", "skipped", "failed")
+    }
+    return {
+        "manifest": manifest_path,
+        "state_file": state.path,
+        "total": len(rows),
+        **counts,
+        "tokens_used": sum(r.get("tokens_used", 0) for r in results if r["status"] in ("completed", "incomplete")),
+        "elapsed_seconds": round(time.monotonic() - started, 2),
+        "quizzes": results
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Generate the quizzes of a manifest from the command line.
+    
+    Args:
+        argv: The command line arguments (default: sys.argv)
+    
+    Returns:
+        The exit status: 0 if every quiz was generated in full, 1 otherwise
+    """
+    parser = argparse.ArgumentParser(description="Generate a quiz for every row of a CSV or JSONL manifest.")
+    parser.add_argument("manifest", help="The path of the .csv or .jsonl manifest")
+    parser.add_argument("--quizzes", type=int, default=None,
+                        help=f"Number of quizzes generated at once (default: {DEFAULT_BULK_QUIZZES})")
+    parser.add_argument("--requests", type=int, default=None,
+                        help=f"Number of LLM requests in flight across all quizzes (default: {DEFAULT_BULK_REQUESTS})")
+    parser.add_argument("--rpm", type=float, default=None, help="Maximum LLM requests started per minute")
+    parser.add_argument("--cache", action=argparse.BooleanOptionalAction, default=None,
+                        help="Reuse cached LLM responses (default: QUIZ_GENERATOR_RESPONSE_CACHE)")
+    parser.add_argument("--state", default=None,
+                        help=f"Path of the state file used to resume a run (default: the manifest path plus {STATE_FILE_SUFFIX})")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    try:
+        summary = asyncio.run(generate_quizzes_from_manifest(
+            args.manifest,
+            max_concurrent_quizzes=args.quizzes,
+            max_concurrent_requests=args.requests,
+            requests_per_minute=args.rpm,
+            use_cache=args.cache,
+            state_path=args.state
+        ))
+    except (OSError, ManifestError) as e:
+        logger.error(str(e))
+        return 1
+    
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    return 1 if summary["failed"] or summary["incomplete"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
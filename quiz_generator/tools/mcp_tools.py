@@ -4,15 +4,15 @@ MCP tool functions for the Quiz Generator package.
 This module contains functions that are exposed as MCP tools.
 """
 
+import asyncio
 import json
 import logging
 from typing import Dict, Any, List, Optional
 
 import anthropic
 
-from ..generators.question_generator import AnthropicQuestionGenerator
-from ..utils.host_agent import get_host_agent_response
-from ..utils.output_utils import create_bootable_quiz, create_html_quiz
+from ..generators.quiz_pipeline import run_quiz_pipeline
+from ..utils.host_agent import get_host_agent_response, resolve_route
 
 # Get the logger
 logger = logging.getLogger("quiz_generator")
@@ -118,12 +118,21 @@ def generate_quiz(
     num_questions: int = 5,
     output_format: str = "html",
     model: str = None,
-    platform: str = None
+    platform: str = None,
+    concurrent: bool = True,
+    max_workers: int = None,
+    use_cache: bool = None,
+    use_question_bank: bool = None,
+    batch_size: int = None,
+    stream: bool = False,
+    deadline: float = None
 ) -> Dict[str, Any]:
     """
     Generate a quiz based on the provided parameters.
     
     This tool creates a quiz with the specified number of questions about the given topic.
+    It runs the same pipeline as the server's generate_quiz tool (run_quiz_pipeline) on an
+    event loop of its own, so it must not be called from a running event loop.
     The quiz can be generated in two formats:
     - .bquiz: A bootable quiz file that can be opened directly in MagicTutor
     - .html: A self-contained HTML file that can be opened in any web browser
@@ -145,70 +154,42 @@ def generate_quiz(
                - Ollama models like "ollama:llama3" (format: "ollama:model_name")
         platform: The platform to use (anthropic, openai, groq, openrouter, ollama)
                If specified, will use the default model for that platform
+        concurrent: Whether to send all question prompts at once instead of one after another
+        max_workers: Optional limit on concurrent requests (default: a per-platform limit)
+        use_cache: Whether to reuse cached LLM responses for identical requests
+               (default: the QUIZ_GENERATOR_RESPONSE_CACHE environment variable)
+        use_question_bank: Whether to fill the quiz from previously generated questions first
+               (default: the QUIZ_GENERATOR_QUESTION_BANK environment variable)
+        batch_size: Number of questions to request per LLM call (default: one call per question)
+        stream: Whether to stream responses, checking questions as they arrive (default: False)
+        deadline: Optional number of seconds the whole quiz may take; once it passes, the
+               quiz is made from the questions that finished in time
     
     Returns:
         A dictionary containing information about the generated quiz
-    """
-    # Create a question generator
-    question_generator = AnthropicQuestionGenerator()
     
-    # Generate questions
-    questions = []
-    for i in range(num_questions):
-        # Generate a prompt based on the question type
-        if question_type == "multiple_choice":
-            prompt = question_generator.generate_multiple_choice_question(
-                topic=topic,
-                subtopic=subtopic,
-                focus=question_focus,
-                difficulty=difficulty,
-                question_number=i+1
-            )
-        elif question_type == "true_false":
-            prompt = question_generator.generate_true_false_question(
-                topic=topic,
-                subtopic=subtopic,
-                focus=question_focus,
-                difficulty=difficulty,
-                question_number=i+1
-            )
-        else:  # cloze
-            prompt = question_generator.generate_cloze_question(
-                topic=topic,
-                subtopic=subtopic,
-                focus=question_focus,
-                difficulty=difficulty,
-                question_number=i+1
-            )
-        
-        # No reference to previous questions or series
-        
-        # Send the prompt to the host agent using the direct implementation to avoid circular references
-        response = get_host_agent_response_tool(prompt, model, platform)
-        
-        # Parse the response into a Question object
-        question = question_generator.parse_question_response(
-            response=response,
-            question_type=question_type,
-            topic=topic,
-            subtopic=subtopic,
-            focus=question_focus
-        )
-        
-        # Add the question to the list
-        questions.append(question)
-    
-    # Create the output file
-    if output_format == "bquiz":
-        file_path = create_bootable_quiz(questions, topic, subtopic)
-    else:  # html
-        file_path = create_html_quiz(questions, topic, subtopic)
+    Raises:
+        HostAgentError: If no model is available
+    """
+    # Resolve the platform and model once and pass the route through the pipeline
+    route = resolve_route(platform, model)
     
-    # Return the result
-    return {
-        "file_path": file_path,
-        "format": output_format,
-        "num_questions": len(questions),
-        "topic": topic,
-        "subtopic": subtopic
-    }
+    # Generate the microcourse and the questions, resuming from the checkpoint of an
+    # earlier run and filling from the question bank, and write the quiz file
+    return asyncio.run(run_quiz_pipeline(
+        route,
+        topic,
+        subtopic,
+        question_focus=question_focus,
+        question_type=question_type,
+        difficulty=difficulty,
+        num_questions=num_questions,
+        output_format=output_format,
+        concurrent=concurrent,
+        max_workers=max_workers,
+        use_cache=use_cache,
+        use_question_bank=use_question_bank,
+        batch_size=batch_size,
+        stream=stream,
+        deadline=deadline
+    ))
@@ -0,0 +1,202 @@
+"""
+Quiz checkpoints for the Quiz Generator package.
+
+This module contains the QuizCheckpoint class, which writes each question and the
+microcourse of a quiz to a checkpoint file as they finish, so a quiz request that
+is run again after a crash resumes where it stopped instead of calling the LLM
+again for the items that were already generated.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from ..models.question_models import BaseQuestion, question_from_dict
+from . import json_codec
+from .progress import QuestionProgress
+
+# Get the logger
+logger = logging.getLogger("quiz_generator")
+
+# Values of QUIZ_GENERATOR_CHECKPOINTS that turn checkpoints off
+_DISABLED_VALUES = ("0", "false", "no", "off")
+
+
+def get_default_checkpoint_dir() -> str:
+    """
+    Get the directory holding the checkpoint files.
+    
+    Returns:
+        The checkpoint directory (QUIZ_GENERATOR_CHECKPOINT_DIR, or data/checkpoints)
+    """
+    checkpoint_dir = os.environ.get("QUIZ_GENERATOR_CHECKPOINT_DIR")
+    if checkpoint_dir:
+        return checkpoint_dir
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "checkpoints")
+
+
+def is_checkpoint_enabled() -> bool:
+    """
+    Check whether quizzes should be checkpointed.
+    
+    Checkpoints are on unless the QUIZ_GENERATOR_CHECKPOINTS environment variable
+    turns them off.
+    
+    Returns:
+        True if quizzes should be checkpointed
+    """
+    return os.environ.get("QUIZ_GENERATOR_CHECKPOINTS", "").lower() not in _DISABLED_VALUES
+
+
+def get_checkpoint_key(request: Dict[str, Any]) -> str:
+    """
+    Get the key identifying a quiz request's checkpoint.
+    
+    Args:
+        request: The parameters that determine the quiz's content, e.g. the topic,
+                 question type, number of questions, platform and model
+    
+    Returns:
+        A hex digest of the parameters
+    """
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class QuizCheckpoint:
+    """
+    The finished items of a quiz, kept in a checkpoint file.
+    
+    Each finished question and the microcourse are appended to a JSON Lines file
+    as soon as they arrive. Placeholder questions and a microcourse that could not
+    be generated are not written, so they are generated again on resume. Remove the
+    checkpoint once the quiz has been written.
+    
+    Attributes:
+        path: The path of the checkpoint file
+        questions: The finished questions, by question number
+        microcourse: The finished microcourse, or None
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.questions: Dict[int, BaseQuestion] = {}
+        self.microcourse: Optional[str] = None
+        self._lock = threading.Lock()
+    
+    def load(self) -> "QuizCheckpoint":
+        """
+        Read the items finished by an earlier run of the quiz, if there was one.
+        
+        Returns:
+            The checkpoint itself
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json_codec.loads(line)
+                        if entry["item"] == "question":
+                            self.questions[entry["number"]] = question_from_dict(entry["data"])
+                        elif entry["item"] == "microcourse":
+                            self.microcourse = entry["content"]
+                    except (json.JSONDecodeError, KeyError, ValueError):
+                        # The last line may have been cut off by a crash
+                        continue
+        except FileNotFoundError:
+            return self
+        
+        logger.info(
+            f"Resuming from checkpoint {self.path}: {len(self.questions)} questions"
+            + (" and the microcourse" if self.microcourse is not None else "")
+        )
+        return self
+    
+    def _append(self, entries: List[Dict[str, Any]]) -> None:
+        """Append entries to the checkpoint file."""
+        if not entries:
+            return
+        try:
+            with self._lock:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(json_codec.dumps(entry) + "\n" for entry in entries))
+        except OSError as e:
+            logger.warning(f"Error writing checkpoint {self.path}: {str(e)}")
+    
+    def add_questions(self, first_question_number: int, questions: List[BaseQuestion]) -> None:
+        """
+        Record finished questions.
+        
+        Args:
+            first_question_number: The number of the first question in the series
+            questions: The questions, in order
+        """
+        from ..generators.question_generator import is_placeholder_question
+        
+        entries = []
+        for index, question in enumerate(questions):
+            if is_placeholder_question(question):
+                continue
+            number = first_question_number + index
+            self.questions[number] = question
+            entries.append({"item": "question", "number": number, "data": question.to_dict()})
+        self._append(entries)
+    
+    def on_question(self, progress: QuestionProgress) -> None:
+        """Record a QuestionProgress report; used alongside QuizProgress.on_question."""
+        self.add_questions(progress.first_question_number, progress.questions)
+    
+    def add_microcourse(self, content: str) -> None:
+        """
+        Record the finished microcourse, unless it could not be generated.
+        
+        Args:
+            content: The microcourse content
+        """
+        from .host_agent import is_microcourse_error
+        
+        if is_microcourse_error(content):
+            return
+        self.microcourse = content
+        self._append([{"item": "microcourse", "content": content}])
+    
+    def get_missing_question_numbers(self, num_questions: int) -> List[int]:
+        """
+        Get the numbers of the questions that have not finished yet.
+        
+        Args:
+            num_questions: The number of questions in the quiz
+        
+        Returns:
+            The missing question numbers, in order
+        """
+        return [number for number in range(1, num_questions + 1) if number not in self.questions]
+    
+    def remove(self) -> None:
+        """Remove the checkpoint file once the quiz has been written."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Error removing checkpoint {self.path}: {str(e)}")
+
+
+def open_checkpoint(request: Dict[str, Any]) -> Optional[QuizCheckpoint]:
+    """
+    Open the checkpoint of a quiz request, reading the items an earlier run finished.
+    
+    Args:
+        request: The parameters that determine the quiz's content
+    
+    Returns:
+        The loaded QuizCheckpoint, or None if checkpoints are turned off
+    """
+    if not is_checkpoint_enabled():
+        return None
+    path = os.path.join(get_default_checkpoint_dir(), f"{get_checkpoint_key(request)}.jsonl")
+    return QuizCheckpoint(path).load()
@@ -0,0 +1,235 @@
+"""
+Circuit breakers for the Quiz Generator package.
+
+This module contains the CircuitBreaker class, which tracks the health of one
+platform and model from the outcome and latency of its recent requests. When too
+many of them fail or are slow, the circuit opens and requests are turned away at
+once, instead of each one waiting for the platform to time out, until a trial
+request shows that the platform has recovered.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, NamedTuple, Optional, Tuple
+
+# Get the logger
+logger = logging.getLogger("quiz_generator")
+
+# Circuit states
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+# Number of recent requests the error rate and slow call rate are computed over
+CIRCUIT_WINDOW = 20
+
+# Number of requests needed in the window before the circuit may open
+CIRCUIT_MIN_REQUESTS = 5
+
+# Fraction of failed (or slow) requests in the window that opens the circuit
+CIRCUIT_FAILURE_THRESHOLD = 0.5
+
+
+class _Outcome(NamedTuple):
+    """The outcome of one request."""
+    failed: bool
+    slow: bool
+    latency: Optional[float]
+
+
+class CircuitBreaker:
+    """
+    The circuit breaker of one platform and model.
+    
+    While the circuit is closed, requests are allowed and their outcomes recorded.
+    Once at least CIRCUIT_MIN_REQUESTS of the last CIRCUIT_WINDOW requests have
+    finished and CIRCUIT_FAILURE_THRESHOLD of them failed, or took longer than
+    slow_call_seconds, the circuit opens and requests are refused. After
+    open_seconds the circuit is half open: a single trial request is allowed,
+    which closes the circuit if it succeeds and opens it again if it fails. A trial
+    request that never reports back (e.g. because it was cancelled) is given up
+    after open_seconds, and another one is allowed.
+    
+    Attributes:
+        name: The platform and model, used in log messages
+        open_seconds: How long the circuit stays open before a trial request is allowed
+        slow_call_seconds: The latency above which a request counts as slow, or None
+    """
+    
+    def __init__(self, name: str, open_seconds: float = 30.0, slow_call_seconds: Optional[float] = None):
+        """
+        Initialize the CircuitBreaker.
+        
+        Args:
+            name: The platform and model, used in log messages
+            open_seconds: How long the circuit stays open before a trial request is allowed
+            slow_call_seconds: Optional latency above which a request counts as slow
+        """
+        self.name = name
+        self.open_seconds = open_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self._state = CIRCUIT_CLOSED
+        self._opened_at = 0.0
+        self._trial_started: Optional[float] = None
+        self._outcomes: Deque[_Outcome] = deque(maxlen=CIRCUIT_WINDOW)
+        self._lock = threading.Lock()
+    
+    def _get_state(self) -> str:
+        """Get the state, moving an open circuit to half open once it has waited. Must be called with the lock held."""
+        if self._state == CIRCUIT_OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = CIRCUIT_HALF_OPEN
+            logger.info(f"Circuit for {self.name} is half open; allowing a trial request")
+        return self._state
+    
+    def _is_trial_in_flight(self) -> bool:
+        """Check whether a trial request is in flight. Must be called with the lock held."""
+        return self._trial_started is not None and time.monotonic() - self._trial_started < self.open_seconds
+    
+    @property
+    def state(self) -> str:
+        """The state of the circuit: CIRCUIT_CLOSED, CIRCUIT_OPEN or CIRCUIT_HALF_OPEN."""
+        with self._lock:
+            return self._get_state()
+    
+    def is_available(self) -> bool:
+        """
+        Check whether the circuit would allow a request, without taking the trial request.
+        
+        Returns:
+            False if the circuit is open, or half open with its trial request in flight
+        """
+        with self._lock:
+            state = self._get_state()
+            return state == CIRCUIT_CLOSED or (state == CIRCUIT_HALF_OPEN and not self._is_trial_in_flight())
+    
+    def allow_request(self) -> bool:
+        """
+        Ask to send a request. A half open circuit allows one trial request at a time.
+        
+        Returns:
+            True if the request may be sent
+        """
+        with self._lock:
+            state = self._get_state()
+            if state == CIRCUIT_CLOSED:
+                return True
+            if state == CIRCUIT_HALF_OPEN and not self._is_trial_in_flight():
+                self._trial_started = time.monotonic()
+                return True
+            return False
+    
+    def get_retry_after(self) -> float:
+        """Get the seconds until an open circuit allows a trial request."""
+        with self._lock:
+            if self._state != CIRCUIT_OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+    
+    def _open(self) -> None:
+        """Open the circuit. Must be called with the lock held."""
+        self._state = CIRCUIT_OPEN
+        self._opened_at = time.monotonic()
+        self._trial_started = None
+        logger.warning(f"Circuit for {self.name} opened; refusing requests for {self.open_seconds:.0f}s")
+    
+    def _record(self, outcome: _Outcome) -> None:
+        """Record the outcome of a request."""
+        with self._lock:
+            state = self._get_state()
+            unhealthy = outcome.failed or outcome.slow
+            # The first outcome reported while the circuit is half open decides it
+            if state == CIRCUIT_HALF_OPEN and self._trial_started is not None:
+                if unhealthy:
+                    self._open()
+                    return
+                # The trial request succeeded: start over with a clean window
+                self._state = CIRCUIT_CLOSED
+                self._trial_started = None
+                self._outcomes.clear()
+                logger.info(f"Circuit for {self.name} closed")
+            self._outcomes.append(outcome)
+            if self._state == CIRCUIT_CLOSED and len(self._outcomes) >= CIRCUIT_MIN_REQUESTS:
+                unhealthy_count = sum(1 for o in self._outcomes if o.failed or o.slow)
+                if unhealthy_count >= CIRCUIT_FAILURE_THRESHOLD * len(self._outcomes):
+                    self._open()
+    
+    def record_success(self, latency: float) -> None:
+        """
+        Record a request that the platform answered, even if with an error that does not
+        point to an unhealthy platform (e.g. a rejected request).
+        
+        Args:
+            latency: The time the request took
+        """
+        slow = self.slow_call_seconds is not None and latency > self.slow_call_seconds
+        self._record(_Outcome(False, slow, latency))
+    
+    def record_failure(self) -> None:
+        """Record a request that failed because the platform is unhealthy (e.g. overloaded or timed out)."""
+        self._record(_Outcome(True, False, None))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the state and health of the circuit."""
+        with self._lock:
+            state = self._get_state()
+            outcomes = list(self._outcomes)
+        retry_after = self.get_retry_after()
+        failed = sum(1 for o in outcomes if o.failed)
+        slow = sum(1 for o in outcomes if o.slow)
+        latencies = sorted(o.latency for o in outcomes if o.latency is not None)
+        return {
+            "name": self.name,
+            "state": state,
+            "requests": len(outcomes),
+            "error_rate": round(failed / len(outcomes), 2) if outcomes else 0.0,
+            "slow_call_rate": round(slow / len(outcomes), 2) if outcomes else 0.0,
+            "health": round(1 - sum(1 for o in outcomes if o.failed or o.slow) / len(outcomes), 2) if outcomes else 1.0,
+            "median_latency": round(latencies[len(latencies) // 2], 2) if latencies else None,
+            "retry_after": round(retry_after, 1)
+        }
+
+
+# Process-wide circuit breakers, by (platform, model)
+_circuit_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(
+    platform: str,
+    model: str,
+    open_seconds: float = 30.0,
+    slow_call_seconds: Optional[float] = None
+) -> CircuitBreaker:
+    """
+    Get the process-wide circuit breaker of a platform and model, creating it on first use.
+    
+    Args:
+        platform: The platform
+        model: The model
+        open_seconds: How long the circuit stays open, used when the breaker is created
+        slow_call_seconds: The latency above which a request is slow, used when the breaker is created
+    
+    Returns:
+        The shared CircuitBreaker
+    """
+    key = (platform, model)
+    with _circuit_breakers_lock:
+        breaker = _circuit_breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(f"{platform}/{model}", open_seconds, slow_call_seconds)
+            _circuit_breakers[key] = breaker
+        return breaker
+
+
+def get_circuit_breakers() -> Dict[Tuple[str, str], CircuitBreaker]:
+    """Get every circuit breaker created so far, by (platform, model)."""
+    with _circuit_breakers_lock:
+        return dict(_circuit_breakers)
+
+
+def reset_circuit_breakers() -> None:
+    """Forget the circuit breakers, closing every circuit."""
+    with _circuit_breakers_lock:
+        _circuit_breakers.clear()
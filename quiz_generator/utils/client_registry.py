@@ -0,0 +1,288 @@
+"""
+LLM client registry for the Quiz Generator package.
+
+This module hands out long-lived API clients so that every request to the same
+platform reuses one HTTP connection pool instead of opening new connections
+(and repeating the TLS handshake) for every question.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+import anthropic
+import httpx
+import openai
+
+# Get the logger
+logger = logging.getLogger("quiz_generator")
+
+# Base URLs for the platforms that are served through the OpenAI client
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+OLLAMA_BASE_URL = "http://localhost:11434/v1"
+
+# Environment variables holding the API key for each platform
+PLATFORM_API_KEY_ENV_VARS = {
+    "anthropic": "ANTHROPIC_API_KEY",
+    "openai": "OPENAI_API_KEY",
+    "openrouter": "OPENROUTER_API_KEY",
+    "groq": "GROQ_API_KEY",
+}
+
+# Connection pool limits shared by every client. They can be overridden with the
+# QUIZ_GENERATOR_MAX_CONNECTIONS and QUIZ_GENERATOR_MAX_KEEPALIVE_CONNECTIONS
+# environment variables.
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 10
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+
+# Clients keyed by (platform, base_url, api_key)
+_clients: Dict[Tuple[str, Optional[str], str], Any] = {}
+_clients_lock = threading.Lock()
+
+# Async clients keyed by event loop, then by (platform, base_url, api_key). An async
+# connection pool is bound to the event loop it was created on, so each loop gets
+# its own clients; they are dropped together with the loop.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, Optional[str], str], Any]]" = weakref.WeakKeyDictionary()
+
+
+def _get_int_env(name: str, default: int) -> int:
+    """Read a positive integer from the environment, falling back to a default."""
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return max(1, int(value))
+    except ValueError:
+        logger.warning(f"Ignoring invalid value for {name}: {value}")
+        return default
+
+
+def get_connection_limits() -> httpx.Limits:
+    """
+    Get the connection pool limits used for every client.
+    
+    Returns:
+        An httpx.Limits instance
+    """
+    return httpx.Limits(
+        max_connections=_get_int_env("QUIZ_GENERATOR_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS),
+        max_keepalive_connections=_get_int_env(
+            "QUIZ_GENERATOR_MAX_KEEPALIVE_CONNECTIONS", DEFAULT_MAX_KEEPALIVE_CONNECTIONS
+        ),
+        keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY
+    )
+
+
+def get_platform_base_url(platform: str) -> Optional[str]:
+    """
+    Get the base URL to use for a platform.
+    
+    Args:
+        platform: The platform name
+    
+    Returns:
+        The base URL, or None to use the client's default
+    """
+    if platform == "openrouter":
+        return OPENROUTER_BASE_URL
+    if platform == "ollama":
+        return OLLAMA_BASE_URL
+    return None
+
+
+def get_platform_api_key(platform: str) -> Optional[str]:
+    """
+    Get the API key for a platform from environment variables.
+    
+    Args:
+        platform: The platform name
+    
+    Returns:
+        The API key, or None if it is not set. Ollama does not require an API key,
+        but the OpenAI client requires a non-empty string, so "ollama" is returned.
+    """
+    if platform == "ollama":
+        return "ollama"
+    env_var = PLATFORM_API_KEY_ENV_VARS.get(platform)
+    return os.environ.get(env_var) if env_var else None
+
+
+def _create_client(platform: str, api_key: str, base_url: Optional[str]) -> Any:
+    """
+    Create a new client for a platform with a pooled HTTP client.
+    
+    The client library's own retries are turned off; failed requests are retried by
+    the host agent, which classifies the error and waits for the platform's limits.
+    """
+    limits = get_connection_limits()
+    
+    if platform == "anthropic":
+        return anthropic.Anthropic(
+            api_key=api_key,
+            max_retries=0,
+            http_client=anthropic.DefaultHttpxClient(limits=limits)
+        )
+    
+    if platform == "groq":
+        import groq
+        
+        return groq.Client(
+            api_key=api_key,
+            max_retries=0,
+            http_client=groq.DefaultHttpxClient(limits=limits)
+        )
+    
+    if platform in ("openai", "openrouter", "ollama"):
+        return openai.OpenAI(
+            api_key=api_key,
+            max_retries=0,
+            base_url=base_url,
+            http_client=openai.DefaultHttpxClient(limits=limits)
+        )
+    
+    raise ValueError(f"Unknown platform: {platform}")
+
+
+def _create_async_client(platform: str, api_key: str, base_url: Optional[str]) -> Any:
+    """Create a new async client for a platform with a pooled HTTP client."""
+    limits = get_connection_limits()
+    
+    if platform == "anthropic":
+        return anthropic.AsyncAnthropic(
+            api_key=api_key,
+            max_retries=0,
+            http_client=anthropic.DefaultAsyncHttpxClient(limits=limits)
+        )
+    
+    if platform == "groq":
+        import groq
+        
+        return groq.AsyncGroq(
+            api_key=api_key,
+            max_retries=0,
+            http_client=groq.DefaultAsyncHttpxClient(limits=limits)
+        )
+    
+    if platform in ("openai", "openrouter", "ollama"):
+        return openai.AsyncOpenAI(
+            api_key=api_key,
+            max_retries=0,
+            base_url=base_url,
+            http_client=openai.DefaultAsyncHttpxClient(limits=limits)
+        )
+    
+    raise ValueError(f"Unknown platform: {platform}")
+
+
+def _get_client_key(platform: str, api_key: Optional[str], base_url: Optional[str]) -> Tuple[str, Optional[str], str]:
+    """Build the registry key for a platform, filling in the default API key and base URL."""
+    if api_key is None:
+        api_key = get_platform_api_key(platform)
+    if not api_key:
+        raise ValueError(f"No API key available for platform: {platform}")
+    if base_url is None:
+        base_url = get_platform_base_url(platform)
+    return platform, base_url, api_key
+
+
+def get_client(platform: str, api_key: Optional[str] = None, base_url: Optional[str] = None) -> Any:
+    """
+    Get a long-lived client for a platform, creating it on first use.
+    
+    Clients are shared process-wide and keyed by (platform, base_url, api_key), so
+    all requests to the same endpoint with the same credentials share a keep-alive
+    connection pool.
+    
+    Args:
+        platform: The platform name (anthropic, openai, groq, openrouter, ollama)
+        api_key: Optional API key (default: read from the platform's environment variable)
+        base_url: Optional base URL (default: the platform's base URL)
+    
+    Returns:
+        A client instance for the platform
+    
+    Raises:
+        ValueError: If no API key is available or the platform is unknown
+        ImportError: If the client library for the platform is not installed
+    """
+    key = _get_client_key(platform, api_key, base_url)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    
+    with _clients_lock:
+        # Another thread may have created the client while we waited for the lock
+        client = _clients.get(key)
+        if client is None:
+            client = _create_client(*key)
+            _clients[key] = client
+            logger.info(f"Created pooled {platform} client" + (f" for {base_url}" if base_url else ""))
+        return client
+
+
+def get_async_client(platform: str, api_key: Optional[str] = None, base_url: Optional[str] = None) -> Any:
+    """
+    Get a long-lived async client for a platform, creating it on first use.
+    
+    Async clients are shared by everything running on the current event loop and
+    keyed by (platform, base_url, api_key), like the clients from get_client.
+    
+    Args:
+        platform: The platform name (anthropic, openai, groq, openrouter, ollama)
+        api_key: Optional API key (default: read from the platform's environment variable)
+        base_url: Optional base URL (default: the platform's base URL)
+    
+    Returns:
+        An async client instance for the platform
+    
+    Raises:
+        ValueError: If no API key is available or the platform is unknown
+        ImportError: If the client library for the platform is not installed
+        RuntimeError: If called outside of a running event loop
+    """
+    key = _get_client_key(platform, api_key, base_url)
+    loop = asyncio.get_running_loop()
+    
+    with _clients_lock:
+        loop_clients = _async_clients.setdefault(loop, {})
+        client = loop_clients.get(key)
+        if client is None:
+            client = _create_async_client(*key)
+            loop_clients[key] = client
+            logger.info(f"Created pooled async {platform} client" + (f" for {key[1]}" if key[1] else ""))
+        return client
+
+
+def close_clients() -> None:
+    """
+    Close every sync client in the registry and release their connection pools.
+    
+    Async clients are released when their event loop is garbage collected, or
+    explicitly with close_async_clients.
+    """
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    
+    for client in clients:
+        try:
+            client.close()
+        except Exception as e:
+            logger.warning(f"Error closing client: {str(e)}")
+
+
+async def close_async_clients() -> None:
+    """Close every async client created on the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = list(_async_clients.pop(loop, {}).values())
+    
+    for client in clients:
+        try:
+            await client.close()
+        except Exception as e:
+            logger.warning(f"Error closing async client: {str(e)}")
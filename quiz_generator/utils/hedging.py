@@ -0,0 +1,148 @@
+"""
+Request hedging for the Quiz Generator package.
+
+This module contains the LatencyTracker class, which keeps the recent latencies of
+the requests sent to one platform and model, and the HedgeBudget class, which caps
+the number of duplicate (hedged) requests sent for requests that are slower than
+usual, so hedging cuts tail latency without doubling the spend.
+"""
+
+import logging
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+# Get the logger
+logger = logging.getLogger("quiz_generator")
+
+# Number of recent latencies kept for each platform and model
+LATENCY_WINDOW = 200
+
+# Number of latencies needed before a percentile is trusted
+MIN_LATENCY_SAMPLES = 20
+
+
+class LatencyTracker:
+    """
+    The latencies of the most recent requests sent to one platform and model.
+    
+    Attributes:
+        window: The number of latencies kept
+    """
+    
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def record(self, seconds: float) -> None:
+        """
+        Record the latency of a finished request.
+        
+        Args:
+            seconds: The time the request took
+        """
+        with self._lock:
+            self._latencies.append(seconds)
+    
+    def percentile(self, percentile: float, min_samples: int = MIN_LATENCY_SAMPLES) -> Optional[float]:
+        """
+        Get a percentile of the recent latencies.
+        
+        Args:
+            percentile: The percentile, between 0 and 100
+            min_samples: The number of latencies needed for the percentile to be trusted
+        
+        Returns:
+            The latency in seconds, or None if too few requests have finished
+        """
+        with self._lock:
+            if len(self._latencies) < max(1, min_samples):
+                return None
+            latencies = sorted(self._latencies)
+        # Nearest-rank percentile
+        rank = math.ceil(min(max(percentile, 0.0), 100.0) / 100.0 * len(latencies))
+        return latencies[max(rank, 1) - 1]
+
+
+class HedgeBudget:
+    """
+    A cap on the hedged requests, as a fraction of all requests.
+    
+    Every request adds ratio to the budget and every hedged request takes one from
+    it, so over time at most ratio hedged requests are sent per request. The budget
+    saves up at most burst hedged requests while requests are fast.
+    
+    Attributes:
+        ratio: The number of hedged requests allowed per request
+        burst: The number of hedged requests that may be saved up
+    """
+    
+    def __init__(self, ratio: float, burst: float = 5.0):
+        self.ratio = ratio
+        self.burst = burst
+        self._balance = 0.0
+        self._lock = threading.Lock()
+    
+    def add_request(self) -> None:
+        """Add the share of a request to the budget."""
+        with self._lock:
+            self._balance = min(self.burst, self._balance + self.ratio)
+    
+    def try_spend(self) -> bool:
+        """
+        Take a hedged request from the budget, if it has one.
+        
+        Returns:
+            True if a hedged request may be sent
+        """
+        with self._lock:
+            if self._balance < 1.0:
+                return False
+            self._balance -= 1.0
+            return True
+
+
+# Process-wide latency trackers, by (platform, model)
+_latency_trackers: Dict[Tuple[str, str], LatencyTracker] = {}
+_hedge_budget: Optional[HedgeBudget] = None
+_hedging_lock = threading.Lock()
+
+
+def get_latency_tracker(platform: str, model: str) -> LatencyTracker:
+    """
+    Get the process-wide latency tracker of a platform and model, creating it on first use.
+    
+    Args:
+        platform: The platform
+        model: The model
+    
+    Returns:
+        The shared LatencyTracker
+    """
+    key = (platform, model)
+    with _hedging_lock:
+        tracker = _latency_trackers.get(key)
+        if tracker is None:
+            tracker = LatencyTracker()
+            _latency_trackers[key] = tracker
+        return tracker
+
+
+def get_hedge_budget(ratio: float) -> HedgeBudget:
+    """
+    Get the process-wide hedge budget, creating it on first use.
+    
+    Args:
+        ratio: The number of hedged requests allowed per request
+    
+    Returns:
+        The shared HedgeBudget, set to the given ratio
+    """
+    global _hedge_budget
+    with _hedging_lock:
+        if _hedge_budget is None:
+            _hedge_budget = HedgeBudget(ratio)
+        _hedge_budget.ratio = ratio
+        return _hedge_budget
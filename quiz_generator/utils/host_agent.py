@@ -4,19 +4,242 @@ Host agent utilities for interacting with the Anthropic API, GROQ API, OpenRoute
 This module contains functions for sending prompts to various LLM APIs and handling responses.
 """
 
+import asyncio
+import contextlib
+import itertools
 import json
 import logging
 import os
+import random
 import re
-import subprocess
-from typing import Optional, Dict, Any, List, Tuple
+import threading
+import time
+from typing import Optional, Dict, Any, AsyncIterator, Iterator, List, NamedTuple, Tuple
 
 import anthropic
+import httpx
 import openai
 
+from .circuit_breaker import CircuitBreaker, get_circuit_breaker, get_circuit_breakers
+from .client_registry import (
+    PLATFORM_API_KEY_ENV_VARS,
+    get_async_client,
+    get_client,
+    get_platform_api_key
+)
+from .hedging import LatencyTracker, get_hedge_budget, get_latency_tracker
+from . import json_codec
+from .json_extractor import extract_json
+from .rate_limiter import ProviderLimiter, RequestLimiter, get_provider_limiter
+from .response_cache import ResponseCache, get_response_cache, is_response_cache_enabled
+from .stream_parser import ResponseStream
+
 # Get the logger
 logger = logging.getLogger("quiz_generator")
 
+# Default number of requests that may be in flight at once for each platform.
+# Local Ollama serves one request at a time and the free tiers of OpenRouter and
+# GROQ throttle aggressively, so they get a smaller limit than the paid APIs.
+# Each limit can be overridden with a QUIZ_GENERATOR_MAX_WORKERS_<PLATFORM>
+# environment variable (e.g. QUIZ_GENERATOR_MAX_WORKERS_OLLAMA=2). The same limit
+# caps the requests in flight to each platform and model across the whole process.
+DEFAULT_PLATFORM_MAX_WORKERS = {
+    "anthropic": 5,
+    "openai": 5,
+    "openrouter": 2,
+    "groq": 3,
+    "ollama": 1,
+}
+
+
+def get_platform_max_workers(platform: str, max_workers: Optional[int] = None) -> int:
+    """
+    Get the maximum number of concurrent requests to send to a platform.
+    
+    Args:
+        platform: The platform the requests will be sent to
+        max_workers: Optional explicit limit that takes precedence over the defaults
+
+    Returns:
+        The number of concurrent requests allowed (always at least 1)
+    """
+    if max_workers is not None:
+        return max(1, int(max_workers))
+    
+    # Check for an environment override for this platform
+    env_value = os.environ.get(f"QUIZ_GENERATOR_MAX_WORKERS_{(platform or '').upper()}")
+    if env_value:
+        try:
+            return max(1, int(env_value))
+        except ValueError:
+            logger.warning(f"Ignoring invalid worker limit for {platform}: {env_value}")
+    
+    return DEFAULT_PLATFORM_MAX_WORKERS.get(platform, 1)
+
+
+# Default rate limits for each platform, as (requests per minute, tokens per minute).
+# The free tiers of GROQ and OpenRouter throttle per minute; the other platforms are
+# only limited by the number of requests in flight. Each limit can be overridden with
+# a QUIZ_GENERATOR_RPM_<PLATFORM> or QUIZ_GENERATOR_TPM_<PLATFORM> environment
+# variable (e.g. QUIZ_GENERATOR_TPM_GROQ=6000), where 0 means no limit.
+DEFAULT_PLATFORM_RATE_LIMITS = {
+    "groq": (30, None),
+    "openrouter": (20, None),
+}
+
+# Seconds to hold requests back after a rate limit error that does not say how long to wait
+DEFAULT_RATE_LIMIT_BACKOFF = 5.0
+
+# Kinds of platform errors, as returned by classify_error
+ERROR_RATE_LIMIT = "rate_limit"
+ERROR_OVERLOADED = "overloaded"
+ERROR_TIMEOUT = "timeout"
+ERROR_CONNECTION = "connection"
+ERROR_AUTH = "auth"
+ERROR_OTHER = "other"
+
+# Kinds of errors that are likely to go away when the request is sent again
+RETRYABLE_ERRORS = (ERROR_RATE_LIMIT, ERROR_OVERLOADED, ERROR_TIMEOUT, ERROR_CONNECTION)
+
+# Retry settings. Retries wait a capped, exponentially growing delay with jitter, or
+# as long as the platform's Retry-After header asks (up to MAX_RETRY_AFTER). The
+# number of retries can be overridden with the QUIZ_GENERATOR_MAX_RETRIES environment variable.
+DEFAULT_MAX_RETRIES = 3
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+MAX_RETRY_AFTER = 60.0
+
+# Circuit breaker settings. Requests that are overloaded, time out or cannot connect
+# count against the circuit of their platform and model, and so do requests slower
+# than QUIZ_GENERATOR_CIRCUIT_SLOW_SECONDS (0 means no limit). An open circuit stays
+# open for QUIZ_GENERATOR_CIRCUIT_OPEN_SECONDS. QUIZ_GENERATOR_CIRCUIT_BREAKER=off
+# turns the circuit breakers off.
+CIRCUIT_BREAKER_ERRORS = (ERROR_OVERLOADED, ERROR_TIMEOUT, ERROR_CONNECTION)
+DEFAULT_CIRCUIT_OPEN_SECONDS = 30.0
+DEFAULT_CIRCUIT_SLOW_SECONDS = 120.0
+
+# Seconds a single call to a platform may take, unless QUIZ_GENERATOR_REQUEST_TIMEOUT
+# says otherwise (0 means no limit). Calls made for a request with a deadline are
+# also cut to the time left before the deadline.
+DEFAULT_REQUEST_TIMEOUT = 300.0
+
+
+def get_platform_rate_limits(platform: str) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Get the rate limits for the requests sent to a platform.
+    
+    Args:
+        platform: The platform the requests will be sent to
+    
+    Returns:
+        A tuple of (requests per minute, tokens per minute), where None means no limit
+    """
+    limits = []
+    for name, default in zip(("RPM", "TPM"), DEFAULT_PLATFORM_RATE_LIMITS.get(platform, (None, None))):
+        env_value = os.environ.get(f"QUIZ_GENERATOR_{name}_{(platform or '').upper()}")
+        if env_value:
+            try:
+                default = float(env_value) or None
+            except ValueError:
+                logger.warning(f"Ignoring invalid {name} limit for {platform}: {env_value}")
+        limits.append(default)
+    return limits[0], limits[1]
+
+
+def get_route_limiter(platform: str, model: str) -> ProviderLimiter:
+    """
+    Get the process-wide limiter for the requests sent to a platform and model.
+    
+    Args:
+        platform: The platform
+        model: The model actually used
+    
+    Returns:
+        The shared ProviderLimiter, created with the platform's limits on first use
+    """
+    requests_per_minute, tokens_per_minute = get_platform_rate_limits(platform)
+    return get_provider_limiter(platform, model, get_platform_max_workers(platform), requests_per_minute, tokens_per_minute)
+
+
+def _get_seconds_setting(env_var: str, default: Optional[float]) -> Optional[float]:
+    """Read a number of seconds from an environment variable, where 0 means None."""
+    env_value = os.environ.get(env_var)
+    if env_value:
+        try:
+            return float(env_value) or None
+        except ValueError:
+            logger.warning(f"Ignoring invalid value for {env_var}: {env_value}")
+    return default
+
+
+def get_request_timeout() -> Optional[float]:
+    """
+    Get the number of seconds a single call to a platform may take.
+    
+    Returns:
+        QUIZ_GENERATOR_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT, or None for no limit
+    """
+    return _get_seconds_setting("QUIZ_GENERATOR_REQUEST_TIMEOUT", DEFAULT_REQUEST_TIMEOUT)
+
+
+def is_circuit_breaker_enabled() -> bool:
+    """
+    Check whether requests go through the circuit breakers.
+    
+    Returns:
+        True unless QUIZ_GENERATOR_CIRCUIT_BREAKER turns the circuit breakers off
+    """
+    return os.environ.get("QUIZ_GENERATOR_CIRCUIT_BREAKER", "").lower() not in ("0", "false", "no", "off")
+
+
+def is_structured_output_enabled() -> bool:
+    """
+    Check whether requests with a response schema use the platforms' structured output.
+    
+    Returns:
+        True unless QUIZ_GENERATOR_STRUCTURED_OUTPUT turns structured output off
+    """
+    return os.environ.get("QUIZ_GENERATOR_STRUCTURED_OUTPUT", "").lower() not in ("0", "false", "no", "off")
+
+
+def get_route_circuit_breaker(platform: str, model: str) -> Optional[CircuitBreaker]:
+    """
+    Get the process-wide circuit breaker of a platform and model.
+    
+    Args:
+        platform: The platform
+        model: The model actually used
+    
+    Returns:
+        The shared CircuitBreaker, or None if the circuit breakers are turned off
+    """
+    if not is_circuit_breaker_enabled():
+        return None
+    return get_circuit_breaker(
+        platform,
+        model,
+        _get_seconds_setting("QUIZ_GENERATOR_CIRCUIT_OPEN_SECONDS", DEFAULT_CIRCUIT_OPEN_SECONDS) or DEFAULT_CIRCUIT_OPEN_SECONDS,
+        _get_seconds_setting("QUIZ_GENERATOR_CIRCUIT_SLOW_SECONDS", DEFAULT_CIRCUIT_SLOW_SECONDS)
+    )
+
+
+def is_route_healthy(platform: str, model: str) -> bool:
+    """
+    Check whether requests may be sent to a platform and model, i.e. its circuit is not open.
+    
+    Args:
+        platform: The platform
+        model: The model actually used
+    
+    Returns:
+        False if the circuit of the platform and model is open
+    """
+    if not is_circuit_breaker_enabled():
+        return True
+    # Do not create breakers for routes that have not been used
+    breaker = get_circuit_breakers().get((platform, model))
+    return breaker is None or breaker.is_available()
+
 
 def select_platform_and_model(specified_platform: Optional[str] = None, specified_model: Optional[str] = None) -> Tuple[str, str]:
     """
@@ -30,6 +253,8 @@ def select_platform_and_model(specified_platform: Optional[str] = None, specifie
        - OpenRouter (default to qwen/qwen-2.5-72b-instruct:free)
        - GROQ (default to llama3-70b-8192)
        - Ollama (use smallest available model)
+    3. Platforms whose circuit is open (see is_route_healthy) are skipped, unless the
+       circuit of every available platform is open
     
     Args:
         specified_platform: Optional explicitly specified platform
@@ -83,60 +308,308 @@ def select_platform_and_model(specified_platform: Optional[str] = None, specifie
         return specified_platform, model
     
     # If neither platform nor model is specified, implement the fallback mechanism
-    # Check for API keys in order of preference
+    selected_platform, selected_model, _ = _select_available_platform()
+    return selected_platform, selected_model
+
+
+def _select_available_platform() -> Tuple[str, str, bool]:
+    """
+    Select the preferred platform that has an API key (or Ollama models) and a closed circuit.
+    
+    Returns:
+        A tuple of (platform, model, whether a preferred platform was skipped because
+        its circuit is open)
+    """
+    # Check for API keys in order of preference, skipping platforms whose circuit is open
+    skipped = None
     
     # Check for Anthropic API key
     if os.environ.get("ANTHROPIC_API_KEY"):
-        logger.info("Using Anthropic platform (API key found)")
-        return "anthropic", "claude-3-7-sonnet-20250219"
+        if is_route_healthy("anthropic", "claude-3-7-sonnet-20250219"):
+            logger.info("Using Anthropic platform (API key found)")
+            return "anthropic", "claude-3-7-sonnet-20250219", skipped is not None
+        logger.info("Skipping Anthropic platform (circuit open)")
+        skipped = skipped or ("anthropic", "claude-3-7-sonnet-20250219")
     
     # Check for OpenAI API key
     if os.environ.get("OPENAI_API_KEY"):
-        logger.info("Using OpenAI platform (API key found)")
-        return "openai", "gpt-4o"
+        if is_route_healthy("openai", "gpt-4o"):
+            logger.info("Using OpenAI platform (API key found)")
+            return "openai", "gpt-4o", skipped is not None
+        logger.info("Skipping OpenAI platform (circuit open)")
+        skipped = skipped or ("openai", "gpt-4o")
     
     # Check for OpenRouter API key
     if os.environ.get("OPENROUTER_API_KEY"):
-        logger.info("Using OpenRouter platform (API key found)")
-        return "openrouter", "qwen/qwen-2.5-72b-instruct:free"
+        if is_route_healthy("openrouter", "qwen/qwen-2.5-72b-instruct:free"):
+            logger.info("Using OpenRouter platform (API key found)")
+            return "openrouter", "qwen/qwen-2.5-72b-instruct:free", skipped is not None
+        logger.info("Skipping OpenRouter platform (circuit open)")
+        skipped = skipped or ("openrouter", "qwen/qwen-2.5-72b-instruct:free")
     
     # Check for GROQ API key
     if os.environ.get("GROQ_API_KEY"):
-        logger.info("Using GROQ platform (API key found)")
-        return "groq", "llama3-70b-8192"
+        if is_route_healthy("groq", "llama3-70b-8192"):
+            logger.info("Using GROQ platform (API key found)")
+            return "groq", "llama3-70b-8192", skipped is not None
+        logger.info("Skipping GROQ platform (circuit open)")
+        skipped = skipped or ("groq", "llama3-70b-8192")
     
     # If no API keys are found, fall back to Ollama
     # Check if Ollama is available
     available_models = get_available_ollama_models()
     if available_models:
-        logger.info(f"Using Ollama platform with model: {available_models[0]}")
-        return "ollama", f"ollama:{available_models[0]}"
+        if is_route_healthy("ollama", f"ollama:{available_models[0]}"):
+            logger.info(f"Using Ollama platform with model: {available_models[0]}")
+            return "ollama", f"ollama:{available_models[0]}", skipped is not None
+        logger.info("Skipping Ollama platform (circuit open)")
+        skipped = skipped or ("ollama", f"ollama:{available_models[0]}")
+    
+    # If every available platform's circuit is open, use the preferred one anyway
+    if skipped:
+        logger.warning(f"The circuit of every available platform is open; using {skipped[0]} with model {skipped[1]}")
+        return skipped[0], skipped[1], False
     
     # If no options are available, log a warning and return a special value
     # to indicate that no valid model or platform is available
     logger.warning("No API keys or Ollama models found. Returning special 'no_model_available' value.")
-    return "no_model_available", "no_model_available"
+    return "no_model_available", "no_model_available", False
 
 
-def get_available_ollama_models() -> List[str]:
+class ProviderRoute(NamedTuple):
     """
-    Get a list of available Ollama models on the user's system.
+    An immutable platform/model decision.
+    
+    A route is resolved once with resolve_route and then passed through the whole
+    generation pipeline, so the environment is not re-read for every request.
+    It unpacks like the (platform, model) tuple from select_platform_and_model.
+    
+    Attributes:
+        platform: The platform to send requests to
+        model: The model to use on that platform
+    """
+    platform: str
+    model: str
+
+
+# Routes keyed by (specified platform, specified model, environment fingerprint)
+_routes: Dict[Tuple[Optional[str], Optional[str], Tuple[Optional[str], ...]], ProviderRoute] = {}
+_routes_lock = threading.Lock()
+
+
+def _get_routing_environment() -> Tuple[Optional[str], ...]:
+    """Get the environment variables that platform selection depends on."""
+    return tuple(os.environ.get(env_var) for env_var in PLATFORM_API_KEY_ENV_VARS.values())
+
+
+def resolve_route(platform: Optional[str] = None, model: Optional[str] = None, reload: bool = False) -> ProviderRoute:
+    """
+    Resolve the platform and model to use into a ProviderRoute.
+    
+    The decision made by select_platform_and_model is memoized per process and is
+    only made again when reload is requested or one of the API key environment
+    variables changes. A bare "ollama" model is resolved to the smallest available
+    Ollama model, so requests do not need to look it up again. While the circuit of
+    an automatically selected route is open, the route is selected again without
+    forgetting the memoized one, so it is used again once it has recovered. A route
+    selected in place of one whose circuit is open is never memoized.
+    
+    Args:
+        platform: Optional explicitly specified platform
+        model: Optional explicitly specified model
+        reload: Whether to ignore the memoized route and resolve it again
     
     Returns:
-        A list of model names available in Ollama, sorted by parameter size (smallest first),
-        or an empty list if Ollama is not running or no models are available.
+        The ProviderRoute to use
+    """
+    key = (platform, model, _get_routing_environment())
+    if not reload:
+        route = _routes.get(key)
+        if route is not None and (platform or model or is_route_healthy(*route)):
+            return route
+    
+    if platform or model:
+        selected_platform, selected_model = select_platform_and_model(platform, model)
+        stand_in = False
+    else:
+        selected_platform, selected_model, stand_in = _select_available_platform()
+    if selected_platform == "ollama" and selected_model == "ollama":
+        available_models = get_available_ollama_models()
+        if available_models:
+            selected_model = f"ollama:{available_models[0]}"
+    route = ProviderRoute(selected_platform, selected_model)
+    
+    # Do not remember that nothing was available, so a newly started Ollama is picked up,
+    # nor a route that only stands in for one whose circuit is open
+    if selected_platform != "no_model_available" and selected_model != "ollama" and not stand_in:
+        with _routes_lock:
+            if reload or key not in _routes:
+                _routes[key] = route
+    
+    logger.info(f"Resolved route: platform {route.platform} with model {route.model}")
+    return route
+
+
+def reload_routes() -> None:
+    """Forget every memoized route so the next request re-resolves its platform and model."""
+    with _routes_lock:
+        _routes.clear()
+    invalidate_ollama_models_cache()
+
+
+# Platforms a failed request moves on to, in order, when QUIZ_GENERATOR_FAILOVER is
+# not set. This is the order select_platform_and_model picks the primary platform in.
+DEFAULT_FAILOVER_CHAIN = ("anthropic", "openai", "openrouter", "groq", "ollama")
+
+# Values of QUIZ_GENERATOR_FAILOVER that turn failover off
+_FAILOVER_DISABLED_VALUES = ("0", "false", "no", "off", "none")
+
+
+def get_failover_chain() -> List[str]:
+    """
+    Get the failover chain: the platforms and models a failed request moves on to.
+    
+    The chain is read from the QUIZ_GENERATOR_FAILOVER environment variable, a
+    comma-separated list of platforms, "platform:model" entries and models (e.g.
+    "openai,groq:llama3-8b-8192,ollama:llama3"). It defaults to every platform in
+    DEFAULT_FAILOVER_CHAIN, with its default model.
+    
+    Returns:
+        The entries of the chain, or an empty list if failover is turned off
+    """
+    env_value = os.environ.get("QUIZ_GENERATOR_FAILOVER")
+    if env_value is None or not env_value.strip():
+        return list(DEFAULT_FAILOVER_CHAIN)
+    if env_value.strip().lower() in _FAILOVER_DISABLED_VALUES:
+        return []
+    return [entry.strip() for entry in env_value.split(",") if entry.strip()]
+
+
+def get_failover_deadline() -> Optional[float]:
+    """
+    Get the latency deadline after which a request moves on to the next provider.
+    
+    Returns:
+        QUIZ_GENERATOR_FAILOVER_DEADLINE in seconds, or None if requests have no deadline
+    """
+    env_value = os.environ.get("QUIZ_GENERATOR_FAILOVER_DEADLINE")
+    if env_value:
+        try:
+            deadline = float(env_value)
+            return deadline if deadline > 0 else None
+        except ValueError:
+            logger.warning(f"Ignoring invalid value for QUIZ_GENERATOR_FAILOVER_DEADLINE: {env_value}")
+    return None
+
+
+def _parse_failover_entry(entry: str) -> Tuple[Optional[str], Optional[str]]:
+    """Split an entry of the failover chain into the (platform, model) to resolve."""
+    prefix, _, rest = entry.partition(":")
+    if prefix not in PLATFORM_DISPLAY_NAMES:
+        # A bare model, whose platform is determined from its name
+        return None, entry
+    if prefix == "ollama":
+        return "ollama", entry if rest else "ollama"
+    return prefix, rest or None
+
+
+def _is_route_available(route: ProviderRoute) -> bool:
+    """Check whether a route's platform has an API key, or its Ollama model is running, and its circuit is not open."""
+    if not is_route_healthy(*route):
+        return False
+    if route.platform == "ollama":
+        available_models = get_available_ollama_models()
+        model_name = route.model.split(":", 1)[1] if route.model.startswith("ollama:") else route.model
+        return model_name in available_models or f"{model_name}:latest" in available_models
+    return route.platform in PLATFORM_API_KEY_ENV_VARS and bool(get_platform_api_key(route.platform))
+
+
+def get_failover_routes(route: ProviderRoute) -> List[ProviderRoute]:
+    """
+    Get the routes a request moves on to when it fails along a route.
+    
+    Entries of the failover chain (see get_failover_chain) are resolved like the
+    platform and model arguments of resolve_route. Entries whose platform has no
+    API key, whose Ollama model is not available or whose circuit is open are left
+    out, and so is the failed route itself.
+    
+    Args:
+        route: The route the request was sent along first
+    
+    Returns:
+        The fallback routes, in order
+    """
+    routes: List[ProviderRoute] = []
+    for entry in get_failover_chain():
+        candidate = resolve_route(*_parse_failover_entry(entry))
+        if candidate != route and candidate not in routes and _is_route_available(candidate):
+            routes.append(candidate)
+    return routes
+
+
+class _FailoverChain:
+    """The routes of one request: the primary route, then its fallbacks, looked up on the first failure."""
+    
+    def __init__(self, route: ProviderRoute):
+        self._routes = [route]
+        self._looked_up = False
+    
+    def get(self, index: int) -> Optional[ProviderRoute]:
+        """Get the route at a position in the chain, or None past its end."""
+        if index > 0 and not self._looked_up:
+            self._routes.extend(get_failover_routes(self._routes[0]))
+            self._looked_up = True
+        return self._routes[index] if index < len(self._routes) else None
+
+
+# Ollama model discovery settings. The model list is cached for
+# QUIZ_GENERATOR_OLLAMA_MODELS_TTL seconds; once it is stale the cached list is
+# still returned while a background thread refreshes it. A failed probe is only
+# cached briefly, so a daemon started after the server is noticed quickly.
+OLLAMA_TAGS_URL = "http://localhost:11434/api/tags"
+OLLAMA_MODELS_TTL = 60.0
+OLLAMA_MODELS_EMPTY_TTL = 10.0
+OLLAMA_CONNECT_TIMEOUT = 0.5
+OLLAMA_READ_TIMEOUT = 3.0
+
+# Pattern for the parameter size in a model name (e.g., "qwen2.5:3b" -> 3)
+OLLAMA_PARAM_SIZE_PATTERN = re.compile(r'(\d+)b')
+
+# Cached model list and the time it was fetched (time.monotonic())
+_ollama_models: Optional[List[str]] = None
+_ollama_models_fetched_at = 0.0
+_ollama_models_lock = threading.Lock()
+_ollama_refresh_thread: Optional[threading.Thread] = None
+
+
+def _get_ollama_param_size(model_name: str) -> int:
+    """Get the parameter size of an Ollama model from its name, or 1000 if unknown."""
+    # Look for patterns like "1b", "3b", "7b", "13b", "70b", etc.
+    match = OLLAMA_PARAM_SIZE_PATTERN.search(model_name.lower())
+    if match:
+        return int(match.group(1))
+    # If no parameter size found, return a large number to put it at the end
+    return 1000
+
+
+def _fetch_ollama_models() -> List[str]:
+    """
+    Query the Ollama API for the installed models.
+    
+    Returns:
+        A list of model names sorted by parameter size (smallest first), or an empty
+        list if Ollama is not running or no models are available.
     """
     try:
-        # Try to list available models using curl
-        result = subprocess.run(
-            ["curl", "-s", "http://localhost:11434/api/tags"],
-            capture_output=True,
-            text=True,
-            check=True
+        # Probe the Ollama API with a short connect timeout so a missing daemon fails fast
+        response = httpx.get(
+            OLLAMA_TAGS_URL,
+            timeout=httpx.Timeout(OLLAMA_READ_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT)
         )
+        response.raise_for_status()
         
         # Parse the JSON response
-        models_data = json.loads(result.stdout)
+        models_data = response.json()
         
         if "models" in models_data and len(models_data["models"]) > 0:
             # Extract model names
@@ -144,23 +617,13 @@ def get_available_ollama_models() -> List[str]:
             logger.info(f"Found {len(model_names)} Ollama models: {', '.join(model_names)}")
             
             # Sort models by parameter size (smallest first)
-            # Extract parameter size from model name (e.g., "qwen2.5:3b" -> 3)
-            def get_param_size(model_name):
-                # Look for patterns like "1b", "3b", "7b", "13b", "70b", etc.
-                match = re.search(r'(\d+)b', model_name.lower())
-                if match:
-                    return int(match.group(1))
-                # If no parameter size found, return a large number to put it at the end
-                return 1000
-            
-            # Sort models by parameter size
-            sorted_models = sorted(model_names, key=get_param_size)
+            sorted_models = sorted(model_names, key=_get_ollama_param_size)
             logger.info(f"Sorted models by parameter size (smallest first): {', '.join(sorted_models)}")
             return sorted_models
         else:
             logger.warning("Ollama is running but no models are available")
             return []
-    except subprocess.CalledProcessError:
+    except httpx.TransportError:
         logger.warning("Failed to connect to Ollama API. Is Ollama running?")
         return []
     except json.JSONDecodeError:
@@ -171,6 +634,84 @@ def get_available_ollama_models() -> List[str]:
         return []
 
 
+def _get_ollama_models_ttl(models: Optional[List[str]]) -> float:
+    """Get how long a fetched model list stays fresh."""
+    if not models:
+        return OLLAMA_MODELS_EMPTY_TTL
+    try:
+        return float(os.environ.get("QUIZ_GENERATOR_OLLAMA_MODELS_TTL", OLLAMA_MODELS_TTL))
+    except ValueError:
+        return OLLAMA_MODELS_TTL
+
+
+def refresh_ollama_models() -> List[str]:
+    """
+    Query Ollama for the installed models and update the cache.
+    
+    Returns:
+        The refreshed list of model names, sorted by parameter size (smallest first)
+    """
+    global _ollama_models, _ollama_models_fetched_at
+    
+    models = _fetch_ollama_models()
+    with _ollama_models_lock:
+        _ollama_models = models
+        _ollama_models_fetched_at = time.monotonic()
+    return list(models)
+
+
+def _refresh_ollama_models_in_background() -> None:
+    """Start a background refresh of the model cache unless one is already running."""
+    global _ollama_refresh_thread
+    
+    with _ollama_models_lock:
+        if _ollama_refresh_thread is not None and _ollama_refresh_thread.is_alive():
+            return
+        _ollama_refresh_thread = threading.Thread(
+            target=refresh_ollama_models,
+            name="ollama-model-refresh",
+            daemon=True
+        )
+        _ollama_refresh_thread.start()
+
+
+def invalidate_ollama_models_cache() -> None:
+    """Drop the cached Ollama model list so the next lookup queries Ollama again."""
+    global _ollama_models, _ollama_models_fetched_at
+    
+    with _ollama_models_lock:
+        _ollama_models = None
+        _ollama_models_fetched_at = 0.0
+
+
+def get_available_ollama_models(refresh: bool = False) -> List[str]:
+    """
+    Get a list of available Ollama models on the user's system.
+    
+    The list is cached in-process. The first call (or a call with refresh=True)
+    queries Ollama directly; after that a stale list is returned immediately while
+    it is refreshed in the background.
+    
+    Args:
+        refresh: Whether to bypass the cache and query Ollama now
+    
+    Returns:
+        A list of model names available in Ollama, sorted by parameter size (smallest first),
+        or an empty list if Ollama is not running or no models are available.
+    """
+    with _ollama_models_lock:
+        models = _ollama_models
+        age = time.monotonic() - _ollama_models_fetched_at
+    
+    if refresh or models is None:
+        return refresh_ollama_models()
+    
+    if age > _get_ollama_models_ttl(models):
+        _refresh_ollama_models_in_background()
+    
+    return list(models)
+
+
 def initialize_anthropic_client() -> Optional[anthropic.Anthropic]:
     """
     Initialize the Anthropic client using the API key from environment variables.
@@ -186,9 +727,9 @@ def initialize_anthropic_client() -> Optional[anthropic.Anthropic]:
         logger.warning("When run through the MCP system, this key will be provided automatically.")
         return None
     
-    # Create an Anthropic client
+    # Get the pooled Anthropic client
     try:
-        client = anthropic.Anthropic(api_key=api_key)
+        client = get_client("anthropic", api_key)
         logger.info("Anthropic client initialized successfully")
         return client
     except Exception as e:
@@ -196,381 +737,1430 @@ def initialize_anthropic_client() -> Optional[anthropic.Anthropic]:
         return None
 
 
-def get_host_agent_response(prompt: str, client: Optional[anthropic.Anthropic] = None, model: str = None, platform: str = None) -> str:
+# System prompt used for question generation
+QUESTION_SYSTEM_PROMPT = "You are a quiz question generator. You MUST return ONLY a valid JSON object with no additional text or commentary. Do not review or comment on the question. Your JSON response MUST include ALL fields specified in the prompt, including the explanation field."
+
+# System prompt used when several questions are requested in one call
+BATCH_QUESTION_SYSTEM_PROMPT = "You are a quiz question generator. You MUST return ONLY a valid JSON array of question objects with no additional text or commentary. Do not review or comment on the questions. Every object in the array MUST include ALL fields specified in the prompt, including the explanation field."
+
+# System prompt used for microcourse generation
+MICROCOURSE_SYSTEM_PROMPT = "You are an educational content creator. You create clear, concise, and informative content in markdown format. Format your response using markdown with proper headings, bullet points, and code blocks where appropriate."
+
+# Display names for each platform, used in log and error messages
+PLATFORM_DISPLAY_NAMES = {
+    "anthropic": "Anthropic",
+    "openai": "OpenAI",
+    "groq": "GROQ",
+    "openrouter": "OpenRouter",
+    "ollama": "Ollama",
+}
+
+
+class HostAgentError(Exception):
     """
-    Send a prompt to the selected model and get a response.
+    Error raised when a request cannot be sent to the selected platform.
     
-    Args:
-        prompt: The prompt to send to the model
-        client: An optional Anthropic client instance. If not provided, a new client will be initialized.
-        model: The model to use for generation (default: determined by select_platform_and_model)
-               Can be:
-               - Anthropic models like "claude-3-7-sonnet-20250219"
-               - OpenAI models like "gpt-4o"
-               - GROQ models like "llama3-70b-8192"
-               - OpenRouter models like "qwen/qwen-2.5-72b-instruct:free"
-               - Ollama models like "ollama:llama3" (format: "ollama:model_name")
-        platform: The platform to use (anthropic, openai, groq, openrouter, ollama)
-               If specified, will use the default model for that platform
-        
-    Returns:
-        The model's response as a string
+    Attributes:
+        message: A short description of the error
+        explanation: An explanation of how to fix the error, shown to the user
     """
-    # Select the platform and model based on specified values and available API keys
-    selected_platform, selected_model = select_platform_and_model(platform, model)
     
-    # Log the selected platform and model
-    logger.info(f"Using platform: {selected_platform} with model: {selected_model}")
+    def __init__(self, message: str, explanation: str):
+        super().__init__(message)
+        self.message = message
+        self.explanation = explanation
+
+
+class DeadlineExceededError(HostAgentError):
+    """Error raised when a request's deadline passes before it could be answered."""
     
-    # If no client is provided and we're using Anthropic, initialize a new one
-    if not client and selected_platform == "anthropic":
-        client = initialize_anthropic_client()
+    def __init__(self):
+        super().__init__(
+            "Deadline exceeded",
+            "The deadline of the request passed before a response was received."
+        )
+
+
+class CircuitOpenError(HostAgentError):
+    """Error raised when a request is refused because the circuit of its platform and model is open."""
     
-    try:
-        # Handle based on the selected platform
-        if selected_platform == "groq":
-            # Import GROQ client if needed
-            try:
-                import groq
-            except ImportError:
-                logger.error("GROQ client not installed. Please install with 'pip install groq'")
-                return json.dumps({
-                    "error": "GROQ client not installed",
-                    "question": "Error generating question. Please try again.",
-                    "explanation": "The GROQ client is not installed. Please install with 'pip install groq'."
-                })
-            
-            # Get the GROQ API key from environment variables
-            groq_api_key = os.environ.get("GROQ_API_KEY")
-            if not groq_api_key:
-                logger.error("GROQ_API_KEY environment variable not found")
-                return json.dumps({
-                    "error": "No GROQ API key available",
-                    "question": "Error generating question. Please try again.",
-                    "explanation": "The GROQ API key is not available. Make sure the GROQ_API_KEY environment variable is set."
-                })
-            
-            # Create a GROQ client
-            groq_client = groq.Client(api_key=groq_api_key)
-            
-            # Generate the response using the GROQ API
-            response = groq_client.chat.completions.create(
-                model=selected_model,
-                messages=[
-                    {"role": "system", "content": "You are a quiz question generator. You MUST return ONLY a valid JSON object with no additional text or commentary. Do not review or comment on the question. Your JSON response MUST include ALL fields specified in the prompt, including the explanation field."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2048
-            )
-            
-            # Extract the response text
-            response_text = response.choices[0].message.content
-            logger.info(f"Generated response from GROQ: {response_text[:100]}...")
-            
-            return response_text
-        # Handle OpenAI platform
-        elif selected_platform == "openai":
-            # Import OpenAI client if needed
-            try:
-                import openai
-            except ImportError:
-                logger.error("OpenAI client not installed. Please install with 'pip install openai'")
-                return json.dumps({
-                    "error": "OpenAI client not installed",
-                    "question": "Error generating question. Please try again.",
-                    "explanation": "The OpenAI client is not installed. Please install with 'pip install openai'."
-                })
-            
-            # Get the OpenAI API key from environment variables
-            openai_api_key = os.environ.get("OPENAI_API_KEY")
-            if not openai_api_key:
-                logger.error("OPENAI_API_KEY environment variable not found")
-                return json.dumps({
-                    "error": "No OpenAI API key available",
-                    "question": "Error generating question. Please try again.",
-                    "explanation": "The OpenAI API key is not available. Make sure the OPENAI_API_KEY environment variable is set."
-                })
-            
-            # Create an OpenAI client
-            openai_client = openai.OpenAI(api_key=openai_api_key)
-            
-            # Generate the response using the OpenAI API
-            response = openai_client.chat.completions.create(
-                model=selected_model,
-                messages=[
-                    {"role": "system", "content": "You are a quiz question generator. You MUST return ONLY a valid JSON object with no additional text or commentary. Do not review or comment on the question. Your JSON response MUST include ALL fields specified in the prompt, including the explanation field."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2048
-            )
-            
-            # Extract the response text
-            response_text = response.choices[0].message.content
-            logger.info(f"Generated response from OpenAI: {response_text[:100]}...")
-            
-            return response_text
-        # Handle OpenRouter platform
-        elif selected_platform == "openrouter":
-            # Get the OpenRouter API key from environment variables
-            openrouter_api_key = os.environ.get("OPENROUTER_API_KEY")
-            if not openrouter_api_key:
-                logger.error("OPENROUTER_API_KEY environment variable not found")
-                return json.dumps({
-                    "error": "No OpenRouter API key available",
-                    "question": "Error generating question. Please try again.",
-                    "explanation": "The OpenRouter API key is not available. Make sure the OPENROUTER_API_KEY environment variable is set."
-                })
-            
-            # Create an OpenAI client with OpenRouter base URL
-            openai_client = openai.OpenAI(
-                base_url="https://openrouter.ai/api/v1",
-                api_key=openrouter_api_key,
-            )
-            
-            # Generate the response using the OpenRouter API
-            response = openai_client.chat.completions.create(
-                model=selected_model,
-                messages=[
-                    {"role": "system", "content": "You are a quiz question generator. You MUST return ONLY a valid JSON object with no additional text or commentary. Do not review or comment on the question. Your JSON response MUST include ALL fields specified in the prompt, including the explanation field."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2048
-            )
-            
-            # Extract the response text
-            response_text = response.choices[0].message.content
-            logger.info(f"Generated response from OpenRouter: {response_text[:100]}...")
-            
-            return response_text
-        # Handle Ollama platform
-        elif selected_platform == "ollama":
-            # Import OpenAI client
-            try:
-                import openai
-            except ImportError:
-                logger.error("OpenAI client not installed. Please install with 'pip install openai'")
-                return json.dumps({
-                    "error": "OpenAI client not installed",
-                    "question": "Error generating question. Please try again.",
-                    "explanation": "The OpenAI client is not installed. Please install with 'pip install openai'."
-                })
-            
-            # If just "ollama" is specified, get available models and use the first one
-            if selected_model == "ollama":
-                available_models = get_available_ollama_models()
-                if not available_models:
-                    error_message = "No Ollama models available. Please pull a model using 'ollama pull llama3' or similar."
-                    logger.error(error_message)
-                    return json.dumps({
-                        "error": error_message,
-                        "question": "Error generating question. Please try again.",
-                        "explanation": "No Ollama models are available. Please pull a model using 'ollama pull llama3' or similar."
-                    })
-                
-                # Use the smallest available model (already sorted by parameter size)
-                ollama_model = available_models[0]
-                logger.info(f"Using automatically selected smallest Ollama model: {ollama_model}")
-            else:
-                # Extract the actual model name from the string (remove "ollama:" prefix)
-                if selected_model.startswith("ollama:"):
-                    ollama_model = selected_model.split(":", 1)[1]
-                else:
-                    ollama_model = selected_model
-            
-            # Create an OpenAI client with Ollama base URL
-            try:
-                ollama_client = openai.OpenAI(
-                    base_url="http://localhost:11434/v1",
-                    api_key="ollama",  # Ollama doesn't require an API key, but the client requires a non-empty string
-                )
-                
-                # Generate the response using the Ollama API
-                response = ollama_client.chat.completions.create(
-                    model=ollama_model,
-                    messages=[
-                        {"role": "system", "content": "You are a quiz question generator. You MUST return ONLY a valid JSON object with no additional text or commentary. Do not review or comment on the question. Your JSON response MUST include ALL fields specified in the prompt, including the explanation field."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.7,
-                    max_tokens=2048
-                )
-                
-                # Extract the response text
-                response_text = response.choices[0].message.content
-                logger.info(f"Generated response from Ollama ({ollama_model}): {response_text[:100]}...")
-                
-                return response_text
-            except Exception as e:
-                error_message = f"Error generating response from Ollama: {str(e)}"
-                logger.error(error_message)
-                return json.dumps({
-                    "error": error_message,
-                    "question": f"Error generating question. Please try again.",
-                    "explanation": "An error occurred while generating the question with Ollama. Make sure Ollama is running and the model is available."
-                })
-        # Handle Anthropic platform
-        elif selected_platform == "anthropic":
-            # Check if we have a valid client
-            if not client:
-                logger.error("No Anthropic client available")
-                return json.dumps({
-                    "error": "No Anthropic client available",
-                    "question": "Error generating question. Please try again.",
-                    "explanation": "The Anthropic client is not initialized. Make sure the ANTHROPIC_API_KEY environment variable is set."
-                })
-            
-            # Generate the response using the Anthropic API
-            response = client.messages.create(
-                model=selected_model,
-                max_tokens=2048,
-                temperature=0.7,
-                system="You are a quiz question generator. You MUST return ONLY a valid JSON object with no additional text or commentary. Do not review or comment on the question. Your JSON response MUST include ALL fields specified in the prompt, including the explanation field.",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": prompt
-                            }
-                        ]
-                    }
-                ]
-            )
-            
-            # Extract the response text
-            response_text = response.content[0].text
-            logger.info(f"Generated response from Anthropic: {response_text[:100]}...")
-            
-            return response_text
-        else:
-            # Unknown platform
-            error_message = f"Unknown platform: {selected_platform}"
-            logger.error(error_message)
-            return json.dumps({
-                "error": error_message,
-                "question": "Error generating question. Please try again.",
-                "explanation": f"The platform '{selected_platform}' is not supported."
-            })
-    except Exception as e:
-        error_message = f"Error generating response: {str(e)}"
-        logger.error(error_message)
-        return json.dumps({
-            "error": error_message,
-            "question": f"Error generating question. Please try again.",
-            "explanation": "An error occurred while generating the question."
-        })
+    def __init__(self, breaker: CircuitBreaker):
+        super().__init__(
+            f"Circuit for {breaker.name} is open",
+            f"Requests to {breaker.name} failed repeatedly and are paused for "
+            f"{breaker.get_retry_after():.0f}s. Try again later or use another platform."
+        )
 
 
-def clean_json_response(response: str) -> str:
+class TokenUsage:
     """
-    Clean up JSON response that might be wrapped in markdown code blocks or contain escaped characters.
+    Running count of the tokens used by one or more requests, and of their retries.
     
-    Args:
-        response: The response string from the model
-        
-    Returns:
-        A cleaned JSON string
+    Streamed responses that are stopped early, and platforms that do not report
+    usage for streams, are counted with an estimate of four characters per token.
+    
+    Attributes:
+        input_tokens: Number of prompt tokens
+        output_tokens: Number of generated tokens
+        retries: Number of times a failed request was sent again
+        models_used: The model that served each successful request, in order
+    """
+    
+    def __init__(self):
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.retries = 0
+        self.models_used: List[str] = []
+        self._lock = threading.Lock()
+    
+    @property
+    def total_tokens(self) -> int:
+        """The number of input and output tokens."""
+        return self.input_tokens + self.output_tokens
+    
+    def add(self, input_tokens: Optional[int], output_tokens: Optional[int], retries: int = 0) -> None:
+        """Add the tokens (and retries) of a request."""
+        with self._lock:
+            self.input_tokens += input_tokens or 0
+            self.output_tokens += output_tokens or 0
+            self.retries += retries
+    
+    def add_model(self, model_used: str) -> None:
+        """Record the model that served a request."""
+        with self._lock:
+            self.models_used.append(model_used)
+    
+    def merge(self, other: "TokenUsage") -> None:
+        """Add the tokens, retries and models of another TokenUsage."""
+        with self._lock:
+            self.input_tokens += other.input_tokens
+            self.output_tokens += other.output_tokens
+            self.retries += other.retries
+            self.models_used.extend(other.models_used)
+
+
+def _estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a text."""
+    return (len(text) + 3) // 4
+
+
+def _record_usage(platform: str, response_usage: Any, usage: Optional[TokenUsage]) -> None:
+    """Add the usage reported by a platform to a TokenUsage."""
+    if usage is None or response_usage is None:
+        return
+    if platform == "anthropic":
+        usage.add(getattr(response_usage, "input_tokens", 0), getattr(response_usage, "output_tokens", 0))
+    else:
+        usage.add(getattr(response_usage, "prompt_tokens", 0), getattr(response_usage, "completion_tokens", 0))
+
+
+def classify_error(error: Exception) -> str:
+    """
+    Classify an error raised by a platform's client library.
+    
+    The Anthropic, OpenAI and GROQ libraries share their exception class names, so
+    errors are matched by name as well as by HTTP status code.
+    
+    Args:
+        error: The error raised by the request
+    
+    Returns:
+        One of ERROR_RATE_LIMIT, ERROR_OVERLOADED, ERROR_TIMEOUT, ERROR_CONNECTION,
+        ERROR_AUTH and ERROR_OTHER
+    """
+    names = {cls.__name__ for cls in type(error).__mro__}
+    status = getattr(error, "status_code", None)
+    if status == 429 or "RateLimitError" in names:
+        return ERROR_RATE_LIMIT
+    if status in (401, 403) or names & {"AuthenticationError", "PermissionDeniedError"}:
+        return ERROR_AUTH
+    # 529 is Anthropic's "overloaded" status
+    if (isinstance(status, int) and status >= 500) or "InternalServerError" in names:
+        return ERROR_OVERLOADED
+    if isinstance(error, (TimeoutError, httpx.TimeoutException)) or "APITimeoutError" in names:
+        return ERROR_TIMEOUT
+    if isinstance(error, (ConnectionError, httpx.TransportError)) or "APIConnectionError" in names:
+        return ERROR_CONNECTION
+    return ERROR_OTHER
+
+
+def _get_retry_after(error: Exception) -> Optional[float]:
+    """Get the seconds to wait from the Retry-After headers of a platform error, if it has them."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers is None:
+        return None
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            return max(0.0, float(headers.get(name)) * scale)
+        except (AttributeError, TypeError, ValueError):
+            continue
+    return None
+
+
+def get_max_retries() -> int:
+    """
+    Get the number of times a failed request is retried.
+    
+    Returns:
+        QUIZ_GENERATOR_MAX_RETRIES, or DEFAULT_MAX_RETRIES
+    """
+    env_value = os.environ.get("QUIZ_GENERATOR_MAX_RETRIES")
+    if env_value:
+        try:
+            return max(0, int(env_value))
+        except ValueError:
+            logger.warning(f"Ignoring invalid value for QUIZ_GENERATOR_MAX_RETRIES: {env_value}")
+    return DEFAULT_MAX_RETRIES
+
+
+def _get_retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """
+    Decide whether a failed request should be retried.
+    
+    Args:
+        error: The error raised by the request
+        attempt: The number of retries made so far
+    
+    Returns:
+        The seconds to wait before retrying, or None if the request should not be retried
+    """
+    if classify_error(error) not in RETRYABLE_ERRORS or attempt >= get_max_retries():
+        return None
+    retry_after = _get_retry_after(error)
+    if retry_after is not None:
+        return min(retry_after, MAX_RETRY_AFTER)
+    # Exponential backoff with "equal jitter": half of the delay is fixed, half random
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+# Hedging settings. With QUIZ_GENERATOR_HEDGE_PERCENTILE set (e.g. 95), a question
+# request that has not returned after that percentile of the recent latencies of its
+# platform and model is sent a second time, and the first response wins. At most
+# QUIZ_GENERATOR_HEDGE_BUDGET hedged requests are sent per request.
+DEFAULT_HEDGE_BUDGET = 0.05
+
+
+def get_hedge_percentile() -> Optional[float]:
     """
-    # Check if the response contains thinking tags from OpenRouter
-    if "<think>" in response and "</think>" in response:
-        # Extract the content after the thinking section
+    Get the latency percentile after which a question request is hedged.
+    
+    Returns:
+        QUIZ_GENERATOR_HEDGE_PERCENTILE, or None if hedging is turned off
+    """
+    env_value = os.environ.get("QUIZ_GENERATOR_HEDGE_PERCENTILE")
+    if env_value:
         try:
-            response = response.split("</think>")[1].strip()
-            logger.info(f"Extracted content after thinking tags: {response[:100]}...")
-        except IndexError:
-            logger.warning("Failed to extract content after thinking tags")
-    
-    # Check if the response is wrapped in a code block
-    if response.startswith("```json") and response.endswith("```"):
-        response = response[7:-3].strip()
-    elif response.startswith("```") and response.endswith("```"):
-        response = response[3:-3].strip()
-    
-    # Try to extract a JSON object from the response
+            percentile = float(env_value)
+            return percentile if 0 < percentile < 100 else None
+        except ValueError:
+            logger.warning(f"Ignoring invalid value for QUIZ_GENERATOR_HEDGE_PERCENTILE: {env_value}")
+    return None
+
+
+def get_hedge_budget_ratio() -> float:
+    """
+    Get the number of hedged requests allowed per request.
+    
+    Returns:
+        QUIZ_GENERATOR_HEDGE_BUDGET, or DEFAULT_HEDGE_BUDGET
+    """
+    env_value = os.environ.get("QUIZ_GENERATOR_HEDGE_BUDGET")
+    if env_value:
+        try:
+            return min(1.0, max(0.0, float(env_value)))
+        except ValueError:
+            logger.warning(f"Ignoring invalid value for QUIZ_GENERATOR_HEDGE_BUDGET: {env_value}")
+    return DEFAULT_HEDGE_BUDGET
+
+
+def _log_retry(platform: str, model_used: str, error: Exception, attempt: int, delay: float) -> None:
+    """Log that a failed request will be retried."""
+    logger.warning(
+        f"{classify_error(error).replace('_', ' ').capitalize()} error from {PLATFORM_DISPLAY_NAMES[platform]} "
+        f"({model_used}): {str(error) or type(error).__name__}; retry {attempt + 1} of {get_max_retries()} in {delay:.1f}s"
+    )
+
+
+def _error_response(error_message: str, explanation: str) -> str:
+    """Build the JSON error response returned in place of a question."""
+    return json.dumps({
+        "error": error_message,
+        "question": "Error generating question. Please try again.",
+        "explanation": explanation
+    })
+
+
+def _resolve_ollama_model(model: str) -> str:
+    """
+    Get the Ollama model name to send requests to.
+    
+    Args:
+        model: The selected model, either "ollama" (use the smallest available model),
+               "ollama:model_name" or a bare model name
+    
+    Returns:
+        The Ollama model name without the "ollama:" prefix
+    """
+    # If just "ollama" is specified, get available models and use the first one
+    if model == "ollama":
+        available_models = get_available_ollama_models()
+        if not available_models:
+            raise HostAgentError(
+                "No Ollama models available. Please pull a model using 'ollama pull llama3' or similar.",
+                "No Ollama models are available. Please pull a model using 'ollama pull llama3' or similar."
+            )
+        
+        # Use the smallest available model (already sorted by parameter size)
+        logger.info(f"Using automatically selected smallest Ollama model: {available_models[0]}")
+        return available_models[0]
+    
+    # Extract the actual model name from the string (remove "ollama:" prefix)
+    if model.startswith("ollama:"):
+        return model.split(":", 1)[1]
+    return model
+
+
+def _prepare_request(
+    platform: str,
+    model: str,
+    prompt: str,
+    system_prompt: str,
+    max_tokens: int,
+    temperature: float = 0.7,
+    response_schema: Optional[Dict[str, Any]] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build the request arguments for a platform.
+    
+    With a response schema, the platform's structured output is used where it has one
+    (see is_structured_output_enabled): a strict JSON schema response format for OpenAI
+    and OpenRouter, a forced tool call with the schema as its input for Anthropic, and
+    JSON mode for Ollama. GROQ gets the prompt alone.
+    
+    Args:
+        platform: The platform to send the request to
+        model: The selected model
+        prompt: The user prompt
+        system_prompt: The system prompt
+        max_tokens: The maximum number of tokens to generate
+        temperature: The sampling temperature
+        response_schema: Optional JSON schema of the response, named by its "title"
+    
+    Returns:
+        A tuple of (model actually used, keyword arguments for the create call)
+    
+    Raises:
+        HostAgentError: If the platform is not supported or no model is available
+    """
+    if platform not in PLATFORM_DISPLAY_NAMES:
+        raise HostAgentError(
+            f"Unknown platform: {platform}",
+            f"The platform '{platform}' is not supported."
+        )
+    
+    if response_schema is not None and not is_structured_output_enabled():
+        response_schema = None
+    if response_schema is not None:
+        schema_name = response_schema.get("title", "response")
+        schema = {key: value for key, value in response_schema.items() if key != "title"}
+    
+    if platform == "anthropic":
+        request = {
+            "model": model,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "system": system_prompt,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": prompt
+                        }
+                    ]
+                }
+            ]
+        }
+        if response_schema is not None:
+            # Anthropic returns structured output as the input of a tool call
+            request["tools"] = [{
+                "name": schema_name,
+                "description": "Return the response in this structure",
+                "input_schema": schema
+            }]
+            request["tool_choice"] = {"type": "tool", "name": schema_name}
+        return model, request
+    
+    # Every other platform uses the OpenAI chat completions format
+    model_name = _resolve_ollama_model(model) if platform == "ollama" else model
+    model_used = f"ollama:{model_name}" if platform == "ollama" else model
+    request = {
+        "model": model_name,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+    if response_schema is not None and platform in ("openai", "openrouter"):
+        request["response_format"] = {
+            "type": "json_schema",
+            "json_schema": {"name": schema_name, "schema": schema, "strict": True}
+        }
+    elif response_schema is not None and platform == "ollama":
+        # Ollama's OpenAI-compatible API turns this into its format: "json" option
+        request["response_format"] = {"type": "json_object"}
+    return model_used, request
+
+
+def _get_platform_client(platform: str, use_async: bool = False) -> Any:
+    """
+    Get the pooled client for a platform.
+    
+    Args:
+        platform: The platform to get a client for
+        use_async: Whether to return an async client
+    
+    Returns:
+        A client instance from the client registry
+    
+    Raises:
+        HostAgentError: If the client library is not installed or the API key is missing
+    """
+    name = PLATFORM_DISPLAY_NAMES.get(platform, platform)
+    env_var = PLATFORM_API_KEY_ENV_VARS.get(platform)
+    api_key = get_platform_api_key(platform)
+    if not api_key:
+        logger.error(f"{env_var} environment variable not found")
+        raise HostAgentError(
+            f"No {name} API key available",
+            f"The {name} API key is not available. Make sure the {env_var} environment variable is set."
+        )
+    
     try:
-        # First, try to parse the response directly as JSON
-        json.loads(response)
-        return response
-    except json.JSONDecodeError:
-        # If that fails, try to extract a JSON object from the text
-        logger.info("Response is not valid JSON, attempting to extract JSON object")
+        return get_async_client(platform, api_key) if use_async else get_client(platform, api_key)
+    except ImportError:
+        package = "groq" if platform == "groq" else "openai"
+        logger.error(f"{name} client not installed. Please install with 'pip install {package}'")
+        raise HostAgentError(
+            f"{name} client not installed",
+            f"The {name} client is not installed. Please install with 'pip install {package}'."
+        )
+
+
+def _extract_response_text(platform: str, response: Any) -> str:
+    """Extract the generated text from a platform response."""
+    if platform == "anthropic":
+        # Structured output arrives as the already decoded input of a tool call
+        for block in response.content:
+            if block.type == "tool_use":
+                return json_codec.dumps(block.input)
+        return response.content[0].text
+    return response.choices[0].message.content
+
+
+def _send_request(platform: str, client: Any, request: Dict[str, Any], usage: Optional[TokenUsage] = None) -> str:
+    """Send a prepared request with a sync client and return the response text."""
+    if platform == "anthropic":
+        response = client.messages.create(**request)
+    else:
+        response = client.chat.completions.create(**request)
+    _record_usage(platform, getattr(response, "usage", None), usage)
+    return _extract_response_text(platform, response)
+
+
+async def _send_request_async(platform: str, client: Any, request: Dict[str, Any], usage: Optional[TokenUsage] = None) -> str:
+    """Send a prepared request with an async client and return the response text."""
+    if platform == "anthropic":
+        response = await client.messages.create(**request)
+    else:
+        response = await client.chat.completions.create(**request)
+    _record_usage(platform, getattr(response, "usage", None), usage)
+    return _extract_response_text(platform, response)
+
+
+def _get_stream_options(platform: str) -> Dict[str, Any]:
+    """Get the extra arguments for a streamed chat completions request."""
+    # OpenAI only reports the usage of a stream when asked to
+    if platform == "openai":
+        return {"stream": True, "stream_options": {"include_usage": True}}
+    return {"stream": True}
+
+
+def _record_chunk_usage(platform: str, chunk: Any, usage: TokenUsage) -> None:
+    """Record the usage reported in a streamed chat completions chunk, if any."""
+    # GROQ reports the usage of a stream in an x_groq field of the last chunk
+    chunk_usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+    _record_usage(platform, chunk_usage, usage)
+
+
+def _record_snapshot_usage(stream: Any, usage: TokenUsage) -> None:
+    """Record the usage of an Anthropic message stream, as far as it has been received."""
+    try:
+        _record_usage("anthropic", stream.current_message_snapshot.usage, usage)
+    except Exception:
+        # No message has started yet
+        pass
+
+
+def _get_event_text(event: Any) -> List[str]:
+    """Get the text, or the JSON of a tool call's input, added by an Anthropic stream event."""
+    if event.type != "content_block_delta":
+        return []
+    if event.delta.type == "text_delta":
+        return [event.delta.text]
+    if event.delta.type == "input_json_delta":
+        return [event.delta.partial_json]
+    return []
+
+
+def _iter_stream_text(platform: str, client: Any, request: Dict[str, Any], usage: TokenUsage) -> Iterator[str]:
+    """Send a prepared request with a sync client and yield the response text as it arrives."""
+    if platform == "anthropic":
+        with client.messages.stream(**request) as stream:
+            try:
+                if "tools" in request:
+                    for event in stream:
+                        yield from _get_event_text(event)
+                else:
+                    yield from stream.text_stream
+            finally:
+                _record_snapshot_usage(stream, usage)
+        return
+    
+    stream = client.chat.completions.create(**request, **_get_stream_options(platform))
+    try:
+        for chunk in stream:
+            _record_chunk_usage(platform, chunk, usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        # Closing the stream drops the connection, so the model stops generating
+        stream.close()
+
+
+async def _iter_stream_text_async(platform: str, client: Any, request: Dict[str, Any], usage: TokenUsage) -> AsyncIterator[str]:
+    """Send a prepared request with an async client and yield the response text as it arrives."""
+    if platform == "anthropic":
+        async with client.messages.stream(**request) as stream:
+            try:
+                if "tools" in request:
+                    async for event in stream:
+                        for text in _get_event_text(event):
+                            yield text
+                else:
+                    async for text in stream.text_stream:
+                        yield text
+            finally:
+                _record_snapshot_usage(stream, usage)
+        return
+    
+    stream = await client.chat.completions.create(**request, **_get_stream_options(platform))
+    try:
+        async for chunk in stream:
+            _record_chunk_usage(platform, chunk, usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        await stream.close()
+
+
+def _finish_stream_usage(request: Dict[str, Any], response_text: str, stream_usage: TokenUsage, usage: Optional[TokenUsage]) -> None:
+    """Add the usage of a streamed request to a TokenUsage, estimating it if none was reported."""
+    if usage is None:
+        return
+    if stream_usage.output_tokens:
+        usage.add(stream_usage.input_tokens, stream_usage.output_tokens)
+        return
+    prompt_text = request.get("system", "") + "".join(str(message["content"]) for message in request["messages"])
+    usage.add(stream_usage.input_tokens or _estimate_tokens(prompt_text), _estimate_tokens(response_text))
+
+
+def _send_stream_request(
+    platform: str,
+    client: Any,
+    request: Dict[str, Any],
+    response_stream: ResponseStream,
+    usage: Optional[TokenUsage] = None
+) -> str:
+    """
+    Stream a prepared request with a sync client into a ResponseStream.
+    
+    The stream is closed as soon as the ResponseStream asks to stop, so a response
+    that has delivered its questions, or gone wrong, is not generated to the end.
+    
+    Returns:
+        The response text received
+    """
+    stream_usage = TokenUsage()
+    chunks = _iter_stream_text(platform, client, request, stream_usage)
+    try:
+        for text in chunks:
+            if not response_stream.feed(text):
+                break
+    finally:
+        chunks.close()
+    response_text = response_stream.finish()
+    _finish_stream_usage(request, response_text, stream_usage, usage)
+    return response_text
+
+
+async def _send_stream_request_async(
+    platform: str,
+    client: Any,
+    request: Dict[str, Any],
+    response_stream: ResponseStream,
+    usage: Optional[TokenUsage] = None
+) -> str:
+    """Stream a prepared request with an async client into a ResponseStream (see _send_stream_request)."""
+    stream_usage = TokenUsage()
+    chunks = _iter_stream_text_async(platform, client, request, stream_usage)
+    try:
+        async for text in chunks:
+            if not response_stream.feed(text):
+                break
+    finally:
+        await chunks.aclose()
+    response_text = response_stream.finish()
+    _finish_stream_usage(request, response_text, stream_usage, usage)
+    return response_text
+
+
+def _get_cached_response(platform: str, request: Dict[str, Any], use_cache: Optional[bool], cache_variant: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Look up a prepared request in the response cache.
+    
+    Returns:
+        A tuple of (cache key, cached response). The key is None when caching is disabled
+        and the response is None on a cache miss.
+    """
+    if not is_response_cache_enabled(use_cache):
+        return None, None
+    cache_key = ResponseCache.make_key(platform, request, cache_variant)
+    return cache_key, get_response_cache().get(cache_key)
+
+
+def _record_outcome(
+    latency: LatencyTracker,
+    breaker: Optional[CircuitBreaker],
+    elapsed: float,
+    error: Optional[Exception] = None,
+    cut_by_deadline: bool = False
+) -> None:
+    """
+    Record the latency of a request and its outcome in the circuit breaker. A request
+    that timed out because its timeout was cut short by its deadline says nothing about
+    the platform's health and is not recorded.
+    """
+    if error is None:
+        latency.record(elapsed)
+    if breaker is None:
+        return
+    if error is not None and classify_error(error) in CIRCUIT_BREAKER_ERRORS:
+        if cut_by_deadline and classify_error(error) == ERROR_TIMEOUT:
+            return
+        breaker.record_failure()
+    else:
+        # The platform answered, even if it rejected the request
+        breaker.record_success(elapsed)
+
+
+def _acquire_limiter(limiter: ProviderLimiter, reserved_tokens: int, timeout: Optional[float], call_deadline: Optional[float]) -> Optional[float]:
+    """
+    Wait for the platform's limiter, and get the timeout of the call that follows.
+    
+    If the timeout was cut to fit a deadline, call_deadline is the monotonic time it
+    runs out: the wait may not go past it, and the call only gets the time that is left.
+    Otherwise the wait is not bounded and the call gets the whole timeout.
+    
+    Raises:
+        DeadlineExceededError: If the deadline passes before the request may be sent
+    """
+    if call_deadline is None:
+        limiter.acquire(reserved_tokens)
+        return timeout
+    try:
+        limiter.acquire(reserved_tokens, call_deadline - time.monotonic())
+    except TimeoutError:
+        raise DeadlineExceededError() from None
+    return _get_remaining_timeout(limiter, reserved_tokens, call_deadline)
+
+
+async def _acquire_limiter_async(limiter: ProviderLimiter, reserved_tokens: int, timeout: Optional[float], call_deadline: Optional[float]) -> Optional[float]:
+    """Wait for the platform's limiter without blocking the event loop (see _acquire_limiter)."""
+    if call_deadline is None:
+        await limiter.acquire_async(reserved_tokens)
+        return timeout
+    try:
+        await limiter.acquire_async(reserved_tokens, call_deadline - time.monotonic())
+    except TimeoutError:
+        raise DeadlineExceededError() from None
+    return _get_remaining_timeout(limiter, reserved_tokens, call_deadline)
+
+
+def _get_remaining_timeout(limiter: ProviderLimiter, reserved_tokens: int, call_deadline: float) -> float:
+    """Get the time left before call_deadline, giving the limiter back its slot if there is none."""
+    remaining = call_deadline - time.monotonic()
+    if remaining <= 0:
+        limiter.release(reserved_tokens)
+        raise DeadlineExceededError()
+    return remaining
+
+
+def _send_limited(
+    platform: str,
+    client: Any,
+    request: Dict[str, Any],
+    response_stream: Optional[ResponseStream],
+    limiter: ProviderLimiter,
+    reserved_tokens: int,
+    usage: TokenUsage,
+    latency: LatencyTracker,
+    breaker: Optional[CircuitBreaker],
+    timeout: Optional[float] = None,
+    cut_by_deadline: bool = False
+) -> str:
+    """
+    Send a prepared request once it is allowed by the circuit breaker and the platform's
+    limiter, recording its latency and outcome. The client gives up on the request after
+    timeout seconds; cut_by_deadline tells whether the timeout was cut to fit a deadline,
+    in which case the wait for the limiter counts against it too.
+    """
+    if breaker is not None and not breaker.allow_request():
+        raise CircuitOpenError(breaker)
+    call_deadline = time.monotonic() + timeout if cut_by_deadline else None
+    timeout = _acquire_limiter(limiter, reserved_tokens, timeout, call_deadline)
+    used = TokenUsage()
+    started = time.monotonic()
+    try:
+        if timeout is not None:
+            client = client.with_options(timeout=timeout)
+        if response_stream is not None:
+            response_text = _send_stream_request(platform, client, request, response_stream, used)
+        else:
+            response_text = _send_request(platform, client, request, used)
+        _record_outcome(latency, breaker, time.monotonic() - started)
+        return response_text
+    except Exception as e:
+        _record_outcome(latency, breaker, time.monotonic() - started, e, cut_by_deadline)
+        if classify_error(e) == ERROR_RATE_LIMIT:
+            limiter.back_off(_get_retry_after(e) or DEFAULT_RATE_LIMIT_BACKOFF)
+        raise
+    finally:
+        limiter.release(reserved_tokens, used.total_tokens)
+        usage.add(used.input_tokens, used.output_tokens)
+
+
+async def _send_limited_async(
+    platform: str,
+    client: Any,
+    request: Dict[str, Any],
+    response_stream: Optional[ResponseStream],
+    limiter: ProviderLimiter,
+    reserved_tokens: int,
+    usage: TokenUsage,
+    latency: LatencyTracker,
+    breaker: Optional[CircuitBreaker],
+    request_limiter: Optional[RequestLimiter] = None,
+    timeout: Optional[float] = None,
+    cut_by_deadline: bool = False
+) -> str:
+    """
+    Send a prepared request with an async client once it is allowed by the circuit breaker
+    and the limiters (see _send_limited). The request is cancelled with a TimeoutError if
+    it has not finished within timeout seconds of being sent.
+    """
+    if breaker is not None and not breaker.allow_request():
+        raise CircuitOpenError(breaker)
+    # The waits for the limiters count against a timeout that was cut to fit a deadline
+    call_deadline = time.monotonic() + timeout if cut_by_deadline else None
+    async with request_limiter or contextlib.nullcontext():
+        timeout = await _acquire_limiter_async(limiter, reserved_tokens, timeout, call_deadline)
+        used = TokenUsage()
+        started = time.monotonic()
+        try:
+            if response_stream is not None:
+                send = _send_stream_request_async(platform, client, request, response_stream, used)
+            else:
+                send = _send_request_async(platform, client, request, used)
+            response_text = await asyncio.wait_for(send, timeout)
+            _record_outcome(latency, breaker, time.monotonic() - started)
+            return response_text
+        except Exception as e:
+            _record_outcome(latency, breaker, time.monotonic() - started, e, cut_by_deadline)
+            if classify_error(e) == ERROR_RATE_LIMIT:
+                limiter.back_off(_get_retry_after(e) or DEFAULT_RATE_LIMIT_BACKOFF)
+            raise
+        finally:
+            limiter.release(reserved_tokens, used.total_tokens)
+            usage.add(used.input_tokens, used.output_tokens)
+
+
+def _get_retry_delay_for(
+    error: Exception,
+    attempt: int,
+    response_stream: Optional[ResponseStream],
+    deadline: Optional[float]
+) -> Optional[float]:
+    """Get the delay before retrying a failed request, or None if it should not be retried."""
+    # A stream that has already delivered text to its reader cannot be sent again
+    if response_stream is not None and response_stream.text:
+        return None
+    delay = _get_retry_delay(error, attempt)
+    # Do not wait for a retry that would start after the deadline
+    if delay is not None and deadline is not None and time.monotonic() + delay >= deadline:
+        return None
+    return delay
+
+
+def _get_call_timeout(failover_deadline: Optional[float], deadline: Optional[float]) -> Tuple[Optional[float], bool]:
+    """
+    Get the timeout of one call to a platform: the request timeout, cut to the failover
+    deadline and to the time left before the request's deadline.
+    
+    Returns:
+        A tuple of (timeout in seconds or None, whether it was cut to fit the deadline)
+    
+    Raises:
+        DeadlineExceededError: If the deadline has passed
+    """
+    timeouts = [timeout for timeout in (get_request_timeout(), failover_deadline) if timeout is not None]
+    timeout = min(timeouts) if timeouts else None
+    if deadline is None:
+        return timeout, False
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceededError()
+    if timeout is None or remaining < timeout:
+        return remaining, True
+    return timeout, False
+
+
+def _is_past(deadline: Optional[float]) -> bool:
+    """Check whether a deadline has passed."""
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def _should_fail_over(error: Exception, failover_deadline: Optional[float], failover: _FailoverChain, index: int) -> bool:
+    """Check whether a request that timed out should move on to the next route instead of being retried."""
+    return failover_deadline is not None and classify_error(error) == ERROR_TIMEOUT and failover.get(index + 1) is not None
+
+
+def _log_failover(route: ProviderRoute, next_route: ProviderRoute, error: Exception) -> None:
+    """Log that a failed request moves on to the next route."""
+    logger.warning(
+        f"Request to {PLATFORM_DISPLAY_NAMES.get(route.platform, route.platform)} ({route.model}) failed: "
+        f"{str(error) or type(error).__name__}; failing over to "
+        f"{PLATFORM_DISPLAY_NAMES.get(next_route.platform, next_route.platform)} ({next_route.model})"
+    )
+
+
+def _complete_route(
+    route: ProviderRoute,
+    prompt: str,
+    system_prompt: str,
+    max_tokens: int,
+    client: Optional[anthropic.Anthropic],
+    use_cache: Optional[bool],
+    cache_variant: Optional[str],
+    response_stream: Optional[ResponseStream],
+    usage: Optional[TokenUsage],
+    failover: _FailoverChain,
+    index: int,
+    failover_deadline: Optional[float],
+    deadline: Optional[float],
+    response_schema: Optional[Dict[str, Any]] = None
+) -> Tuple[str, str]:
+    """Send a prompt along one route of its failover chain, retrying it there (see _complete)."""
+    platform, model = route
+    model_used, request = _prepare_request(
+        platform, model, prompt, system_prompt, max_tokens, response_schema=response_schema
+    )
+    
+    cache_key, cached_response = _get_cached_response(platform, request, use_cache, cache_variant)
+    if cached_response is not None:
+        logger.info(f"Using cached response from {PLATFORM_DISPLAY_NAMES[platform]} ({model_used}): {cached_response[:100]}...")
+        if response_stream is not None:
+            # Report the cached items as if they had been streamed
+            response_stream.feed(cached_response)
+            response_stream.finish()
+        return cached_response, model_used
+    
+    # Use the provided Anthropic client if there is one, otherwise the pooled client
+    if not (platform == "anthropic" and client is not None):
+        client = _get_platform_client(platform)
+    
+    # Wait for the platform's limits. The tokens are reserved from an estimate (the
+    # prompt plus max_tokens) and settled with the actual usage afterwards.
+    limiter = get_route_limiter(platform, model_used)
+    latency = get_latency_tracker(platform, model_used)
+    breaker = get_route_circuit_breaker(platform, model_used)
+    reserved_tokens = _estimate_tokens(system_prompt + prompt) + max_tokens
+    request_usage = TokenUsage()
+    try:
+        for attempt in itertools.count():
+            timeout, cut_by_deadline = _get_call_timeout(failover_deadline, deadline)
+            try:
+                response_text = _send_limited(
+                    platform, client, request, response_stream, limiter, reserved_tokens, request_usage, latency,
+                    breaker, timeout, cut_by_deadline
+                )
+                break
+            except Exception as e:
+                if _should_fail_over(e, failover_deadline, failover, index):
+                    raise
+                delay = _get_retry_delay_for(e, attempt, response_stream, deadline)
+                if delay is None:
+                    raise
+                _log_retry(platform, model_used, e, attempt, delay)
+                request_usage.add(0, 0, retries=1)
+                time.sleep(delay)
+    finally:
+        if usage is not None:
+            usage.add(request_usage.input_tokens, request_usage.output_tokens, request_usage.retries)
+    logger.info(f"Generated response from {PLATFORM_DISPLAY_NAMES[platform]} ({model_used}): {response_text[:100]}...")
+    
+    # Do not cache responses that were aborted part way through
+    if cache_key is not None and not (response_stream is not None and response_stream.aborted):
+        get_response_cache().set(cache_key, response_text)
+    return response_text, model_used
+
+
+def _complete(
+    route: ProviderRoute,
+    prompt: str,
+    system_prompt: str,
+    max_tokens: int,
+    client: Optional[anthropic.Anthropic] = None,
+    use_cache: Optional[bool] = None,
+    cache_variant: Optional[str] = None,
+    response_stream: Optional[ResponseStream] = None,
+    usage: Optional[TokenUsage] = None,
+    deadline: Optional[float] = None,
+    response_schema: Optional[Dict[str, Any]] = None
+) -> Tuple[str, str]:
+    """
+    Send a prompt along a route and return the generated text.
+    
+    Requests wait for the process-wide limiter of the platform and model (see
+    get_route_limiter), so callers queue instead of running into the platform's
+    rate limits. Cached responses do not wait. Requests that fail with a retryable
+    error (rate limit, overload, timeout, connection) are sent again after a backoff
+    (see _get_retry_delay); the retries are counted in usage.
+    
+    A request that still fails moves on to the next route of the failover chain
+    (see get_failover_routes). If QUIZ_GENERATOR_FAILOVER_DEADLINE is set, a request
+    that takes longer than the deadline moves on at once instead of being retried.
+    A streamed response that has already delivered text does not move on.
+    
+    Every call to a platform times out after QUIZ_GENERATOR_REQUEST_TIMEOUT seconds.
+    With a deadline, the calls are also cut to the time left before it, and no retry
+    or failover is started once it has passed.
+    
+    Args:
+        route: The resolved platform and model to use
+        prompt: The user prompt
+        system_prompt: The system prompt
+        max_tokens: The maximum number of tokens to generate
+        client: An optional Anthropic client to use instead of the pooled one
+        use_cache: Whether to use the response cache (default: QUIZ_GENERATOR_RESPONSE_CACHE)
+        cache_variant: Optional extra cache key component for otherwise identical requests
+        response_stream: Optional ResponseStream. If given, the response is streamed into it
+                         and may be stopped early.
+        usage: Optional TokenUsage to add the tokens used, the retries and the model that
+               served the request to. Cached responses use no tokens.
+        deadline: Optional time.monotonic() value by which the request must have finished
+        response_schema: Optional JSON schema of the response, for the platform's structured
+                         output (see _prepare_request)
+    
+    Returns:
+        A tuple of (response text, model actually used)
+    
+    Raises:
+        HostAgentError: If the request cannot be sent along any route
+        DeadlineExceededError: If the deadline passed before the request was sent
+        Exception: The error of the last route tried, if every route failed
+    """
+    failover = _FailoverChain(route)
+    failover_deadline = get_failover_deadline()
+    for index in itertools.count():
+        current = failover.get(index)
+        try:
+            response_text, model_used = _complete_route(
+                current, prompt, system_prompt, max_tokens, client if index == 0 else None, use_cache,
+                cache_variant, response_stream, usage, failover, index, failover_deadline, deadline, response_schema
+            )
+        except Exception as e:
+            stream_started = response_stream is not None and response_stream.text
+            next_route = None if stream_started or _is_past(deadline) else failover.get(index + 1)
+            if next_route is None:
+                raise
+            _log_failover(current, next_route, e)
+            continue
+        if usage is not None:
+            usage.add_model(model_used)
+        return response_text, model_used
+
+
+async def _complete_route_async(
+    route: ProviderRoute,
+    prompt: str,
+    system_prompt: str,
+    max_tokens: int,
+    client: Optional[anthropic.AsyncAnthropic],
+    use_cache: Optional[bool],
+    cache_variant: Optional[str],
+    response_stream: Optional[ResponseStream],
+    usage: Optional[TokenUsage],
+    request_limiter: Optional[RequestLimiter],
+    failover: _FailoverChain,
+    index: int,
+    failover_deadline: Optional[float],
+    deadline: Optional[float],
+    response_schema: Optional[Dict[str, Any]] = None
+) -> Tuple[str, str]:
+    """Send a prompt along one route of its failover chain without blocking the event loop (see _complete_route)."""
+    platform, model = route
+    model_used, request = _prepare_request(
+        platform, model, prompt, system_prompt, max_tokens, response_schema=response_schema
+    )
+    
+    cache_key, cached_response = _get_cached_response(platform, request, use_cache, cache_variant)
+    if cached_response is not None:
+        logger.info(f"Using cached response from {PLATFORM_DISPLAY_NAMES[platform]} ({model_used}): {cached_response[:100]}...")
+        if response_stream is not None:
+            # Report the cached items as if they had been streamed
+            response_stream.feed(cached_response)
+            response_stream.finish()
+        return cached_response, model_used
+    
+    # Use the provided Anthropic client if there is one, otherwise the pooled client
+    if not (platform == "anthropic" and client is not None):
+        client = _get_platform_client(platform, use_async=True)
+    
+    limiter = get_route_limiter(platform, model_used)
+    latency = get_latency_tracker(platform, model_used)
+    breaker = get_route_circuit_breaker(platform, model_used)
+    reserved_tokens = _estimate_tokens(system_prompt + prompt) + max_tokens
+    request_usage = TokenUsage()
+    try:
+        for attempt in itertools.count():
+            timeout, cut_by_deadline = _get_call_timeout(failover_deadline, deadline)
+            try:
+                response_text = await _send_limited_async(
+                    platform, client, request, response_stream, limiter, reserved_tokens, request_usage, latency,
+                    breaker, request_limiter, timeout, cut_by_deadline
+                )
+                break
+            except Exception as e:
+                if _should_fail_over(e, failover_deadline, failover, index):
+                    raise
+                delay = _get_retry_delay_for(e, attempt, response_stream, deadline)
+                if delay is None:
+                    raise
+                _log_retry(platform, model_used, e, attempt, delay)
+                request_usage.add(0, 0, retries=1)
+                await asyncio.sleep(delay)
+    finally:
+        if usage is not None:
+            usage.add(request_usage.input_tokens, request_usage.output_tokens, request_usage.retries)
+    logger.info(f"Generated response from {PLATFORM_DISPLAY_NAMES[platform]} ({model_used}): {response_text[:100]}...")
+    
+    # Do not cache responses that were aborted part way through
+    if cache_key is not None and not (response_stream is not None and response_stream.aborted):
+        get_response_cache().set(cache_key, response_text)
+    return response_text, model_used
+
+
+async def _complete_async(
+    route: ProviderRoute,
+    prompt: str,
+    system_prompt: str,
+    max_tokens: int,
+    client: Optional[anthropic.AsyncAnthropic] = None,
+    use_cache: Optional[bool] = None,
+    cache_variant: Optional[str] = None,
+    response_stream: Optional[ResponseStream] = None,
+    usage: Optional[TokenUsage] = None,
+    request_limiter: Optional[RequestLimiter] = None,
+    deadline: Optional[float] = None,
+    response_schema: Optional[Dict[str, Any]] = None
+) -> Tuple[str, str]:
+    """
+    Send a prompt along a route without blocking the event loop.
+    
+    This is the asyncio counterpart of _complete and takes the same arguments, plus
+    an optional RequestLimiter that the request waits for before the platform's
+    limiter. Cached responses wait for neither.
+    
+    Returns:
+        A tuple of (response text, model actually used)
+    """
+    failover = _FailoverChain(route)
+    failover_deadline = get_failover_deadline()
+    for index in itertools.count():
+        current = failover.get(index)
+        try:
+            response_text, model_used = await _complete_route_async(
+                current, prompt, system_prompt, max_tokens, client if index == 0 else None, use_cache,
+                cache_variant, response_stream, usage, request_limiter, failover, index, failover_deadline, deadline,
+                response_schema
+            )
+        except Exception as e:
+            stream_started = response_stream is not None and response_stream.text
+            next_route = None if stream_started or _is_past(deadline) else failover.get(index + 1)
+            if next_route is None:
+                raise
+            _log_failover(current, next_route, e)
+            continue
+        if usage is not None:
+            usage.add_model(model_used)
+        return response_text, model_used
+
+
+def _discard_result(task: asyncio.Task) -> None:
+    """Retrieve the result of a request that lost a hedge, so its error is not reported as unhandled."""
+    if not task.cancelled():
+        task.exception()
+
+
+async def _complete_hedged_async(
+    route: ProviderRoute,
+    prompt: str,
+    system_prompt: str,
+    max_tokens: int,
+    client: Optional[anthropic.AsyncAnthropic],
+    use_cache: Optional[bool],
+    cache_variant: Optional[str],
+    usage: Optional[TokenUsage],
+    request_limiter: Optional[RequestLimiter],
+    percentile: float,
+    deadline: Optional[float] = None,
+    response_schema: Optional[Dict[str, Any]] = None
+) -> Tuple[str, str]:
+    """
+    Send a prompt along a route, hedging it if it is slower than usual.
+    
+    If the request has not returned after the given percentile of the recent
+    latencies of its route, and the hedge budget allows it, the same prompt is sent
+    along the first failover route (or the same route, if there is none). The first
+    successful response wins and the other request is cancelled.
+    
+    Returns:
+        A tuple of (response text, model actually used)
+    """
+    budget = get_hedge_budget(get_hedge_budget_ratio())
+    budget.add_request()
+    hedge_after = get_latency_tracker(*route).percentile(percentile)
+    
+    attempts: Dict[asyncio.Task, TokenUsage] = {}
+    
+    def start(attempt_route: ProviderRoute, attempt_client: Optional[anthropic.AsyncAnthropic]) -> asyncio.Task:
+        attempt_usage = TokenUsage()
+        task = asyncio.create_task(_complete_async(
+            attempt_route, prompt, system_prompt, max_tokens, attempt_client, use_cache, cache_variant,
+            usage=attempt_usage, request_limiter=request_limiter, deadline=deadline, response_schema=response_schema
+        ))
+        attempts[task] = attempt_usage
+        return task
+    
+    primary = start(route, client)
+    winner = None
+    try:
+        pending = {primary}
+        if hedge_after is not None:
+            done, pending = await asyncio.wait(pending, timeout=hedge_after)
+            if not done and budget.try_spend():
+                hedge_route = (get_failover_routes(route) or [route])[0]
+                logger.info(
+                    f"No response from {PLATFORM_DISPLAY_NAMES[route.platform]} ({route.model}) after "
+                    f"{hedge_after:.1f}s; hedging with {PLATFORM_DISPLAY_NAMES[hedge_route.platform]} ({hedge_route.model})"
+                )
+                pending.add(start(hedge_route, client if hedge_route == route else None))
+            pending |= done
+        
+        # Wait for the first success; if one request fails, wait for the other
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winner = next((task for task in done if task.exception() is None), None)
+        if winner is None:
+            return primary.result()
+        return winner.result()
+    finally:
+        for task in attempts:
+            if not task.done():
+                task.cancel()
+            task.add_done_callback(_discard_result)
+        if usage is not None:
+            for task, attempt_usage in attempts.items():
+                if task is winner:
+                    usage.merge(attempt_usage)
+                else:
+                    usage.add(attempt_usage.input_tokens, attempt_usage.output_tokens, attempt_usage.retries)
+
+
+def _request_error_response(platform: str, error: Exception) -> str:
+    """Build the JSON error response for an exception raised by a platform request."""
+    if isinstance(error, HostAgentError):
+        logger.error(error.message)
+        return _error_response(error.message, error.explanation)
+    
+    if platform == "ollama":
+        error_message = f"Error generating response from Ollama: {str(error) or type(error).__name__}"
+        explanation = "An error occurred while generating the question with Ollama. Make sure Ollama is running and the model is available."
+    else:
+        error_message = f"Error generating response: {str(error) or type(error).__name__}"
+        explanation = "An error occurred while generating the question."
+    logger.error(error_message)
+    return _error_response(error_message, explanation)
+
+
+def get_host_agent_response(
+    prompt: str,
+    client: Optional[anthropic.Anthropic] = None,
+    model: str = None,
+    platform: str = None,
+    route: Optional[ProviderRoute] = None,
+    use_cache: Optional[bool] = None,
+    cache_variant: Optional[str] = None,
+    system_prompt: str = QUESTION_SYSTEM_PROMPT,
+    max_tokens: int = 2048,
+    response_stream: Optional[ResponseStream] = None,
+    usage: Optional[TokenUsage] = None,
+    deadline: Optional[float] = None,
+    response_schema: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Send a prompt to the selected model and get a response.
+    
+    Args:
+        prompt: The prompt to send to the model
+        client: An optional Anthropic client instance. If not provided, the pooled client will be used.
+        model: The model to use for generation (default: determined by select_platform_and_model)
+               Can be:
+               - Anthropic models like "claude-3-7-sonnet-20250219"
+               - OpenAI models like "gpt-4o"
+               - GROQ models like "llama3-70b-8192"
+               - OpenRouter models like "qwen/qwen-2.5-72b-instruct:free"
+               - Ollama models like "ollama:llama3" (format: "ollama:model_name")
+        platform: The platform to use (anthropic, openai, groq, openrouter, ollama)
+               If specified, will use the default model for that platform
+        route: An already resolved ProviderRoute. Takes precedence over model and platform.
+        use_cache: Whether to use the response cache (default: the QUIZ_GENERATOR_RESPONSE_CACHE
+               environment variable)
+        cache_variant: Optional extra cache key component that keeps otherwise identical
+               prompts apart, e.g. the question number within a quiz
+        system_prompt: The system prompt (default: QUESTION_SYSTEM_PROMPT, for a single question)
+        max_tokens: The maximum number of tokens to generate
+        response_stream: Optional ResponseStream. If given, the response is streamed with the
+               platform's streaming API, parsed as it arrives and stopped as soon as the
+               stream has the questions it expects or the output goes wrong.
+        usage: Optional TokenUsage to add the tokens used by the request to
+        deadline: Optional time.monotonic() value by which the request must have finished.
+               Calls to the platform time out when it passes.
+        response_schema: Optional JSON schema of the response (e.g. from get_question_schema).
+               Platforms with structured output are made to return JSON that matches it,
+               so the response can be decoded directly.
         
-        # Try to construct a JSON object from the key-value pairs in the response
-        # Check for various possible formats
-        question_headers = ["**Question:**", "**Question Stem:**"]
-        options_headers = ["**Options:**"]
-        answer_headers = ["**Correct Answer:**", "**Answer:**"]
-        concept_headers = ["**Concept Phrase:**"]
-        explanation_headers = ["**Explanation:**"]
+    Returns:
+        The model's response as a string
+    """
+    # Use the resolved route, or resolve one from the specified values and available API keys
+    route = route or resolve_route(platform, model)
+    
+    try:
+        # Fall back to the shared Anthropic client, as initialized at startup
+        if route.platform == "anthropic" and client is None:
+            client = initialize_anthropic_client()
+            if not client:
+                raise HostAgentError(
+                    "No Anthropic client available",
+                    "The Anthropic client is not initialized. Make sure the ANTHROPIC_API_KEY environment variable is set."
+                )
         
-        # Find which headers are present
-        question_header = next((h for h in question_headers if h in response), None)
-        options_header = next((h for h in options_headers if h in response), None)
-        answer_header = next((h for h in answer_headers if h in response), None)
-        concept_header = next((h for h in concept_headers if h in response), None)
-        explanation_header = next((h for h in explanation_headers if h in response), None)
+        response_text, _ = _complete(
+            route, prompt, system_prompt, max_tokens, client, use_cache, cache_variant, response_stream, usage,
+            deadline, response_schema
+        )
+        return response_text
+    except Exception as e:
+        return _request_error_response(route.platform, e)
+
+
+async def get_host_agent_response_async(
+    prompt: str,
+    client: Optional[anthropic.AsyncAnthropic] = None,
+    model: str = None,
+    platform: str = None,
+    route: Optional[ProviderRoute] = None,
+    use_cache: Optional[bool] = None,
+    cache_variant: Optional[str] = None,
+    system_prompt: str = QUESTION_SYSTEM_PROMPT,
+    max_tokens: int = 2048,
+    response_stream: Optional[ResponseStream] = None,
+    usage: Optional[TokenUsage] = None,
+    request_limiter: Optional[RequestLimiter] = None,
+    deadline: Optional[float] = None,
+    response_schema: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Send a prompt to the selected model and get a response without blocking the event loop.
+    
+    This is the asyncio counterpart of get_host_agent_response. It uses the async
+    clients of the Anthropic, OpenAI and GROQ libraries, so many requests can be in
+    flight on one event loop at the same time. If QUIZ_GENERATOR_HEDGE_PERCENTILE is
+    set, requests that are slower than usual are hedged (see _complete_hedged_async).
+    
+    Args:
+        prompt: The prompt to send to the model
+        client: An optional AsyncAnthropic client instance. If not provided, the pooled async client will be used.
+        model: The model to use for generation (default: determined by select_platform_and_model)
+        platform: The platform to use (anthropic, openai, groq, openrouter, ollama)
+        route: An already resolved ProviderRoute. Takes precedence over model and platform.
+        use_cache: Whether to use the response cache (default: QUIZ_GENERATOR_RESPONSE_CACHE)
+        cache_variant: Optional extra cache key component for otherwise identical prompts
+        system_prompt: The system prompt (default: QUESTION_SYSTEM_PROMPT, for a single question)
+        max_tokens: The maximum number of tokens to generate
+        response_stream: Optional ResponseStream to stream the response into
+        usage: Optional TokenUsage to add the tokens used by the request to
+        request_limiter: Optional RequestLimiter shared by the requests of a run, which the
+               request waits for before it is sent
+        deadline: Optional time.monotonic() value by which the request must have finished
+        response_schema: Optional JSON schema of the response, for the platform's structured output
         
-        if question_header and options_header and answer_header:
-            logger.info("Found question format, constructing JSON object")
-            
-            # Extract question
-            question_match = re.search(fr'{re.escape(question_header)}\s*(.*?)(?={"|".join([re.escape(h) for h in question_headers + options_headers + answer_headers + concept_headers + explanation_headers if h != question_header])}|\Z)', response, re.DOTALL)
-            question = question_match.group(1).strip() if question_match else ""
-            
-            # Extract options
-            options_text = re.search(fr'{re.escape(options_header)}\s*(.*?)(?={"|".join([re.escape(h) for h in question_headers + options_headers + answer_headers + concept_headers + explanation_headers if h != options_header])}|\Z)', response, re.DOTALL)
-            options = []
-            if options_text:
-                options_lines = options_text.group(1).strip().split('\n')
-                for line in options_lines:
-                    line = line.strip()
-                    if line.startswith(('A.', 'B.', 'C.', 'D.')):
-                        options.append(line)
-            
-            # Extract correct answer
-            correct_answer_match = re.search(fr'{re.escape(answer_header)}\s*(.*?)(?={"|".join([re.escape(h) for h in question_headers + options_headers + answer_headers + concept_headers + explanation_headers if h != answer_header])}|\Z)', response, re.DOTALL)
-            correct_answer = correct_answer_match.group(1).strip() if correct_answer_match else ""
-            
-            # Extract concept phrase
-            concept_phrase = ""
-            if concept_header:
-                concept_phrase_match = re.search(fr'{re.escape(concept_header)}\s*(.*?)(?={"|".join([re.escape(h) for h in question_headers + options_headers + answer_headers + concept_headers + explanation_headers if h != concept_header])}|\Z)', response, re.DOTALL)
-                concept_phrase = concept_phrase_match.group(1).strip() if concept_phrase_match else ""
-            
-            # Extract explanation
-            explanation = ""
-            if explanation_header:
-                explanation_match = re.search(fr'{re.escape(explanation_header)}\s*(.*?)(?={"|".join([re.escape(h) for h in question_headers + options_headers + answer_headers + concept_headers + explanation_headers if h != explanation_header])}|\Z)', response, re.DOTALL)
-                explanation = explanation_match.group(1).strip() if explanation_match else ""
-            
-            # Construct JSON object
-            json_obj = {
-                "question": question,
-                "options": options,
-                "correct_answer": correct_answer,
-                "type": "multiple_choice",
-                "concept_phrase": concept_phrase,
-                "explanation": explanation
-            }
-            
-            # Convert to JSON string
-            response = json.dumps(json_obj)
-            logger.info(f"Constructed JSON object: {response[:100]}...")
-            return response
+    Returns:
+        The model's response as a string
+    """
+    # Use the resolved route, or resolve one from the specified values and available API keys
+    route = route or resolve_route(platform, model)
+    
+    try:
+        # A streamed response is read as it arrives, so only unstreamed requests are hedged
+        hedge_percentile = get_hedge_percentile()
+        if hedge_percentile is not None and response_stream is None:
+            response_text, _ = await _complete_hedged_async(
+                route, prompt, system_prompt, max_tokens, client, use_cache, cache_variant, usage, request_limiter,
+                hedge_percentile, deadline, response_schema
+            )
+        else:
+            response_text, _ = await _complete_async(
+                route, prompt, system_prompt, max_tokens, client, use_cache, cache_variant, response_stream, usage,
+                request_limiter, deadline, response_schema
+            )
+        return response_text
+    except Exception as e:
+        return _request_error_response(route.platform, e)
+
+
+# Headings of the markdown shown in place of a microcourse that could not be generated
+MICROCOURSE_UNAVAILABLE_HEADING = "# Microcourse content could not be generated"
+MICROCOURSE_ERROR_HEADING = "# Error generating microcourse"
+
+
+def _microcourse_error_content(platform: str, error: Exception) -> str:
+    """Build the markdown shown in place of a microcourse that could not be generated."""
+    if isinstance(error, HostAgentError):
+        return f"{MICROCOURSE_UNAVAILABLE_HEADING}\n\n{error.explanation}"
+    
+    error_message = f"Error generating microcourse from {PLATFORM_DISPLAY_NAMES.get(platform, platform)}: {str(error) or type(error).__name__}"
+    logger.error(error_message)
+    return f"{MICROCOURSE_ERROR_HEADING}\n\n{error_message}"
+
+
+def is_microcourse_error(content: str) -> bool:
+    """
+    Check whether microcourse content is the error shown for a failed microcourse request.
+    
+    Args:
+        content: The content returned by get_microcourse_response
+        
+    Returns:
+        True if the microcourse could not be generated
+    """
+    return content.startswith((MICROCOURSE_UNAVAILABLE_HEADING, MICROCOURSE_ERROR_HEADING))
+
+
+def get_microcourse_response(
+    prompt: str,
+    route: ProviderRoute,
+    use_cache: Optional[bool] = None,
+    usage: Optional[TokenUsage] = None,
+    deadline: Optional[float] = None
+) -> Tuple[str, str]:
+    """
+    Send a microcourse prompt to the selected platform and get the markdown content.
+    
+    Unlike get_host_agent_response, errors are returned as markdown so that the quiz
+    can still be created with an explanation in place of the microcourse.
+    
+    Args:
+        prompt: The microcourse prompt to send to the model
+        route: The resolved platform and model to use
+        use_cache: Whether to use the response cache (default: QUIZ_GENERATOR_RESPONSE_CACHE)
+        usage: Optional TokenUsage to add the tokens used by the request to
+        deadline: Optional time.monotonic() value by which the request must have finished
+        
+    Returns:
+        A tuple of (microcourse markdown, model actually used)
+    """
+    try:
+        return _complete(
+            route, prompt, MICROCOURSE_SYSTEM_PROMPT, 4000, use_cache=use_cache, usage=usage, deadline=deadline
+        )
+    except Exception as e:
+        return _microcourse_error_content(route.platform, e), route.model
+
+
+async def get_microcourse_response_async(
+    prompt: str,
+    route: ProviderRoute,
+    use_cache: Optional[bool] = None,
+    usage: Optional[TokenUsage] = None,
+    request_limiter: Optional[RequestLimiter] = None,
+    deadline: Optional[float] = None
+) -> Tuple[str, str]:
+    """
+    Send a microcourse prompt to the selected platform without blocking the event loop.
+    
+    This is the asyncio counterpart of get_microcourse_response.
+    
+    Args:
+        prompt: The microcourse prompt to send to the model
+        route: The resolved platform and model to use
+        use_cache: Whether to use the response cache (default: QUIZ_GENERATOR_RESPONSE_CACHE)
+        usage: Optional TokenUsage to add the tokens used by the request to
+        request_limiter: Optional RequestLimiter that the request waits for before it is sent
+        deadline: Optional time.monotonic() value by which the request must have finished
         
-        # Handle case where there might be text before or after the JSON
-        import re
-        json_pattern = r'({[\s\S]*})'
-        match = re.search(json_pattern, response)
-        if match:
-            response = match.group(1)
-            logger.info(f"Extracted JSON object using regex: {response[:100]}...")
-            return response
+    Returns:
+        A tuple of (microcourse markdown, model actually used)
+    """
+    try:
+        return await _complete_async(
+            route, prompt, MICROCOURSE_SYSTEM_PROMPT, 4000, use_cache=use_cache, usage=usage,
+            request_limiter=request_limiter, deadline=deadline
+        )
+    except Exception as e:
+        return _microcourse_error_content(route.platform, e), route.model
+
+
+def clean_json_response(response: str) -> str:
+    """
+    Clean up JSON response that might be wrapped in markdown code blocks or contain other text.
+    
+    Use extract_json to get the parsed JSON without decoding it a second time.
+    
+    Args:
+        response: The response string from the model
         
-        # If all else fails, return the original response
+    Returns:
+        A cleaned JSON string, or the response itself if it contains no JSON
+    """
+    try:
+        return json_codec.dumps(extract_json(response, allow_array=True))
+    except json.JSONDecodeError:
         logger.warning("Failed to extract JSON object from response")
         return response
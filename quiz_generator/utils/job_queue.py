@@ -0,0 +1,474 @@
+"""
+Background job queue for the Quiz Generator package.
+
+This module contains a persistent queue of quiz generation jobs, run by a bounded
+pool of asyncio workers, so clients can submit many quizzes at once and poll for
+their results instead of holding a tool call open for each one.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Get the logger
+logger = logging.getLogger("quiz_generator")
+
+# Default number of jobs that run at the same time. It can be overridden with the
+# QUIZ_GENERATOR_JOB_WORKERS environment variable.
+DEFAULT_JOB_WORKERS = 2
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    progress TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status
+    ON jobs (status, created_at);
+"""
+
+# Columns stored as JSON
+_JSON_COLUMNS = ("params", "result", "progress")
+
+
+def get_default_job_store_path() -> str:
+    """
+    Get the path of the job database.
+    
+    Returns:
+        The database path (QUIZ_GENERATOR_JOBS_PATH, or data/jobs.db)
+    """
+    path = os.environ.get("QUIZ_GENERATOR_JOBS_PATH")
+    if path:
+        return path
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "jobs.db")
+
+
+def get_job_workers(max_workers: Optional[int] = None) -> int:
+    """
+    Get the number of jobs that may run at the same time.
+    
+    Args:
+        max_workers: Explicit limit from the caller. If None, the QUIZ_GENERATOR_JOB_WORKERS
+                     environment variable or DEFAULT_JOB_WORKERS is used.
+    
+    Returns:
+        The number of job workers (at least 1)
+    """
+    if max_workers is not None:
+        return max(1, max_workers)
+    value = os.environ.get("QUIZ_GENERATOR_JOB_WORKERS")
+    if value:
+        try:
+            return max(1, int(value))
+        except ValueError:
+            logger.warning(f"Ignoring invalid value for QUIZ_GENERATOR_JOB_WORKERS: {value}")
+    return DEFAULT_JOB_WORKERS
+
+
+def _format_time(timestamp: Optional[float]) -> Optional[str]:
+    """Format a timestamp for job status responses."""
+    return datetime.fromtimestamp(timestamp).isoformat(timespec="seconds") if timestamp else None
+
+
+class JobStore:
+    """
+    A persistent table of jobs, so queued and running jobs survive a server restart.
+    
+    Attributes:
+        db_path: The path of the SQLite database
+    """
+    
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or get_default_job_store_path()
+        self._lock = threading.Lock()
+        self._initialized = False
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection to the database, creating the schema on first use."""
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+                    connection = sqlite3.connect(self.db_path, timeout=30)
+                    try:
+                        connection.execute("PRAGMA journal_mode=WAL")
+                        connection.executescript(_SCHEMA)
+                        connection.commit()
+                    finally:
+                        connection.close()
+                    self._initialized = True
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        return connection
+    
+    def create_job(self, job_id: str, params: Dict[str, Any]) -> None:
+        """
+        Add a queued job.
+        
+        Args:
+            job_id: The ID of the job
+            params: The arguments to run the job with
+        """
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    "INSERT INTO jobs (id, status, params, created_at) VALUES (?, ?, ?, ?)",
+                    (job_id, JOB_QUEUED, json.dumps(params), time.time())
+                )
+        finally:
+            connection.close()
+    
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a job.
+        
+        Args:
+            job_id: The ID of the job
+        
+        Returns:
+            The job's columns, with JSON columns decoded, or None if there is no such job
+        """
+        connection = self._connect()
+        try:
+            row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            connection.close()
+        if row is None:
+            return None
+        job = dict(row)
+        for column in _JSON_COLUMNS:
+            if job[column] is not None:
+                job[column] = json.loads(job[column])
+        return job
+    
+    def update_job(self, job_id: str, **fields: Any) -> None:
+        """
+        Update columns of a job.
+        
+        Args:
+            job_id: The ID of the job
+            **fields: The columns to set
+        """
+        for column in _JSON_COLUMNS:
+            if column in fields and fields[column] is not None:
+                fields[column] = json.dumps(fields[column])
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+        finally:
+            connection.close()
+    
+    def claim_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Mark a queued job as running, unless it has been cancelled (or claimed) since it was queued.
+        
+        Args:
+            job_id: The ID of the job
+        
+        Returns:
+            The arguments to run the job with, or None if the job is no longer queued
+        """
+        connection = self._connect()
+        try:
+            with connection:
+                cursor = connection.execute(
+                    "UPDATE jobs SET status = ?, started_at = ? WHERE id = ? AND status = ?",
+                    (JOB_RUNNING, time.time(), job_id, JOB_QUEUED)
+                )
+                if cursor.rowcount == 0:
+                    return None
+                row = connection.execute("SELECT params FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            connection.close()
+        return json.loads(row["params"])
+    
+    def cancel_job(self, job_id: str) -> bool:
+        """
+        Mark a job as cancelled, unless it has already finished.
+        
+        Args:
+            job_id: The ID of the job
+        
+        Returns:
+            True if the job was queued or running and is now cancelled
+        """
+        connection = self._connect()
+        try:
+            with connection:
+                cursor = connection.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status IN (?, ?)",
+                    (JOB_CANCELLED, time.time(), job_id, JOB_QUEUED, JOB_RUNNING)
+                )
+        finally:
+            connection.close()
+        return cursor.rowcount > 0
+    
+    def get_unfinished_jobs(self) -> List[str]:
+        """
+        Get the jobs that were queued or running, marking running jobs as queued again.
+        
+        Returns:
+            The IDs of the unfinished jobs, oldest first
+        """
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    "UPDATE jobs SET status = ?, started_at = NULL WHERE status = ?", (JOB_QUEUED, JOB_RUNNING)
+                )
+                rows = connection.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (JOB_QUEUED,)
+                ).fetchall()
+        finally:
+            connection.close()
+        return [row["id"] for row in rows]
+
+
+class JobContext:
+    """
+    Stands in for an MCP Context while a job runs, recording the job's progress.
+    
+    Attributes:
+        job_id: The ID of the job
+    """
+    
+    def __init__(self, job_queue: "JobQueue", job_id: str):
+        self._job_queue = job_queue
+        self.job_id = job_id
+        # Keeps the progress updates in order
+        self._lock = asyncio.Lock()
+    
+    async def report_progress(self, progress: float, total: Optional[float] = None, message: Optional[str] = None) -> None:
+        """Record the progress of the job, like Context.report_progress."""
+        async with self._lock:
+            await asyncio.to_thread(
+                self._job_queue.store.update_job,
+                self.job_id,
+                progress={"completed_items": progress, "total_items": total, "message": message}
+            )
+
+
+class JobQueue:
+    """
+    A queue of jobs run in the background by a bounded pool of asyncio workers.
+    
+    Jobs are stored in a JobStore as soon as they are submitted. The workers are
+    started on the running event loop by start(), which also queues again any jobs
+    that were queued or running when the server last stopped. The server calls it
+    when it starts, so those jobs resume without waiting for a client.
+    
+    Attributes:
+        runner: Async function taking (params, context) that runs a job and returns its result
+        store: The JobStore holding the jobs
+        max_workers: The number of jobs that run at the same time
+    """
+    
+    def __init__(
+        self,
+        runner: Callable[[Dict[str, Any], JobContext], Awaitable[Dict[str, Any]]],
+        store: Optional[JobStore] = None,
+        max_workers: Optional[int] = None
+    ):
+        self.runner = runner
+        self.store = store or JobStore()
+        self.max_workers = get_job_workers(max_workers)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancel_requested: set = set()
+    
+    async def start(self) -> None:
+        """Start the workers on the running event loop, if they are not running yet."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._running = {}
+        
+        unfinished = await asyncio.to_thread(self.store.get_unfinished_jobs)
+        for job_id in unfinished:
+            self._queue.put_nowait(job_id)
+        if unfinished:
+            logger.info(f"Resuming {len(unfinished)} unfinished quiz jobs")
+        
+        self._workers = [loop.create_task(self._work()) for _ in range(self.max_workers)]
+        logger.info(f"Started {self.max_workers} quiz job workers")
+    
+    async def submit(self, params: Dict[str, Any]) -> str:
+        """
+        Queue a job.
+        
+        Args:
+            params: The arguments to run the job with. They must be JSON serializable.
+        
+        Returns:
+            The ID of the job
+        """
+        await self.start()
+        job_id = uuid.uuid4().hex
+        await asyncio.to_thread(self.store.create_job, job_id, params)
+        self._queue.put_nowait(job_id)
+        logger.info(f"Queued quiz job {job_id} ({self._queue.qsize()} jobs waiting)")
+        return job_id
+    
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a job. A queued job is not run; a running job is stopped.
+        
+        Args:
+            job_id: The ID of the job
+        
+        Returns:
+            The job's status, or None if there is no such job
+        """
+        await self.start()
+        job = await asyncio.to_thread(self.store.get_job, job_id)
+        if job is None:
+            return None
+        
+        if job["status"] in (JOB_QUEUED, JOB_RUNNING):
+            self._cancel_requested.add(job_id)
+            task = self._running.get(job_id)
+            if task is None:
+                # The job is still queued. The update only applies to a job that has not
+                # finished, and a worker only claims a job that is still queued.
+                await asyncio.to_thread(self.store.cancel_job, job_id)
+                # A worker may have picked the job up in the meantime
+                task = self._running.get(job_id)
+            if task is not None:
+                task.cancel()
+                # Wait for the job to record its cancellation, so the status below is final
+                await asyncio.wait([task])
+            else:
+                self._cancel_requested.discard(job_id)
+        return await self.get_status(job_id)
+    
+    async def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the status of a job.
+        
+        Args:
+            job_id: The ID of the job
+        
+        Returns:
+            The job's status and progress, or None if there is no such job
+        """
+        await self.start()
+        job = await asyncio.to_thread(self.store.get_job, job_id)
+        if job is None:
+            return None
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "topic": job["params"].get("topic"),
+            "subtopic": job["params"].get("subtopic"),
+            "progress": job["progress"],
+            "error": job["error"],
+            "created_at": _format_time(job["created_at"]),
+            "started_at": _format_time(job["started_at"]),
+            "finished_at": _format_time(job["finished_at"])
+        }
+    
+    async def get_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the result of a job.
+        
+        Args:
+            job_id: The ID of the job
+        
+        Returns:
+            The job's result once it has completed, its status otherwise, or None if
+            there is no such job
+        """
+        await self.start()
+        job = await asyncio.to_thread(self.store.get_job, job_id)
+        if job is None:
+            return None
+        if job["status"] != JOB_COMPLETED:
+            return await self.get_status(job_id)
+        return {"job_id": job_id, "status": job["status"], **job["result"]}
+    
+    async def _work(self) -> None:
+        """Run queued jobs one at a time, until cancelled."""
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error running quiz job {job_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+    
+    async def _run(self, job_id: str) -> None:
+        """Run a job in its own task, so it can be cancelled on its own."""
+        # The task is registered before the job is claimed, so a cancel always finds it
+        task = asyncio.ensure_future(self._run_job(job_id))
+        self._running[job_id] = task
+        try:
+            await task
+        except asyncio.CancelledError:
+            if job_id in self._cancel_requested:
+                # Only the job was cancelled; the worker goes on to the next one
+                return
+            # The worker itself is being stopped. The job stays running in the store
+            # and is queued again when the workers next start.
+            task.cancel()
+            raise
+        finally:
+            self._running.pop(job_id, None)
+            self._cancel_requested.discard(job_id)
+    
+    async def _run_job(self, job_id: str) -> None:
+        """Claim a queued job, run it and record its outcome."""
+        try:
+            params = await asyncio.to_thread(self.store.claim_job, job_id)
+            if params is None:
+                # The job was cancelled while it was queued
+                return
+            logger.info(f"Running quiz job {job_id}")
+            result = await self.runner(params, JobContext(self, job_id))
+        except asyncio.CancelledError:
+            if job_id not in self._cancel_requested:
+                raise
+            logger.info(f"Cancelled quiz job {job_id}")
+            # If the cancel landed while the job was being claimed, the claim may commit
+            # after this update; it then finds the job cancelled and changes nothing
+            await asyncio.to_thread(self.store.cancel_job, job_id)
+        except Exception as e:
+            logger.error(f"Quiz job {job_id} failed: {str(e)}")
+            await asyncio.to_thread(
+                self.store.update_job, job_id, status=JOB_FAILED, error=str(e), finished_at=time.time()
+            )
+        else:
+            await asyncio.to_thread(
+                self.store.update_job, job_id, status=JOB_COMPLETED, result=result, finished_at=time.time()
+            )
+            logger.info(f"Completed quiz job {job_id}")
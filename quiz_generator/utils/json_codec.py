@@ -0,0 +1,196 @@
+"""
+JSON codec for the Quiz Generator package.
+
+This module encodes and decodes JSON with the fastest library installed: orjson,
+then msgspec, then the standard library json module. QUIZ_GENERATOR_JSON_CODEC
+selects one of them (orjson, msgspec or json) instead of the first one installed.
+
+The output is the same JSON whichever codec is used, but not byte for byte: orjson
+and msgspec write no spaces after separators. JSON that is hashed into a key (e.g.
+the response cache keys) is therefore still written with the json module, so the
+keys do not change with the codec.
+
+Dataclasses, such as the question classes, are encoded as objects of their fields.
+msgspec encodes them natively. orjson and the json module encode the dictionary
+returned by their to_dict method, if they have one: orjson is slower on slotted
+dataclasses than on a flat dictionary.
+"""
+
+import dataclasses
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, List, NamedTuple, Union
+
+# Get the logger
+logger = logging.getLogger("quiz_generator")
+
+# Codecs in order of preference
+JSON_CODECS = ("orjson", "msgspec", "json")
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _dataclass_to_dict(obj: Any) -> Dict[str, Any]:
+    """Convert a dataclass into a dictionary of its fields, for the codecs that do not encode it natively."""
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        if hasattr(obj, "to_dict"):
+            return obj.to_dict()
+        return {field.name: getattr(obj, field.name) for field in dataclasses.fields(obj)}
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
+def _stdlib_dumps(obj: Any, indent: bool, sort_keys: bool) -> bytes:
+    """Encode with the json module."""
+    return json.dumps(
+        obj, indent=2 if indent else None, sort_keys=sort_keys, ensure_ascii=False, default=_dataclass_to_dict
+    ).encode("utf-8")
+
+
+def _orjson_dumps(obj: Any, indent: bool, sort_keys: bool) -> bytes:
+    """Encode with orjson."""
+    option = (
+        orjson.OPT_PASSTHROUGH_DATACLASS
+        | (orjson.OPT_INDENT_2 if indent else 0)
+        | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+    )
+    try:
+        return orjson.dumps(obj, default=_dataclass_to_dict, option=option)
+    except TypeError:
+        # orjson refuses some values the json module accepts, e.g. integers over 64 bits
+        return _stdlib_dumps(obj, indent, sort_keys)
+
+
+def _msgspec_dumps(obj: Any, indent: bool, sort_keys: bool) -> bytes:
+    """Encode with msgspec."""
+    try:
+        data = msgspec.json.encode(obj, order="sorted" if sort_keys else None)
+    except (TypeError, msgspec.EncodeError):
+        return _stdlib_dumps(obj, indent, sort_keys)
+    return msgspec.json.format(data, indent=2) if indent else data
+
+
+def _stdlib_loads(data: Union[str, bytes]) -> Any:
+    """Decode with the json module."""
+    return json.loads(data)
+
+
+def _msgspec_loads(data: Union[str, bytes]) -> Any:
+    """Decode with msgspec, raising json.JSONDecodeError like the other codecs."""
+    try:
+        return msgspec.json.decode(data)
+    except msgspec.DecodeError as e:
+        text = data.decode("utf-8", "replace") if isinstance(data, bytes) else data
+        raise json.JSONDecodeError(str(e), text, 0) from None
+
+
+class JSONCodec(NamedTuple):
+    """
+    A JSON library.
+    
+    Attributes:
+        name: The name of the library
+        dumps: Encodes a value as UTF-8 JSON, given whether to indent and to sort keys
+        loads: Decodes JSON text or UTF-8 bytes, raising json.JSONDecodeError
+    """
+    name: str
+    dumps: Callable[[Any, bool, bool], bytes]
+    loads: Callable[[Union[str, bytes]], Any]
+
+
+def get_available_codecs() -> Dict[str, JSONCodec]:
+    """
+    Get the JSON codecs that are installed.
+    
+    Returns:
+        The codecs by name, in order of preference
+    """
+    codecs: List[JSONCodec] = []
+    if orjson is not None:
+        # orjson.JSONDecodeError is a subclass of json.JSONDecodeError
+        codecs.append(JSONCodec("orjson", _orjson_dumps, orjson.loads))
+    if msgspec is not None:
+        codecs.append(JSONCodec("msgspec", _msgspec_dumps, _msgspec_loads))
+    codecs.append(JSONCodec("json", _stdlib_dumps, _stdlib_loads))
+    return {codec.name: codec for codec in codecs}
+
+
+def _select_codec() -> JSONCodec:
+    """Choose the codec from QUIZ_GENERATOR_JSON_CODEC and the installed libraries."""
+    available = get_available_codecs()
+    requested = os.environ.get("QUIZ_GENERATOR_JSON_CODEC", "").lower()
+    if requested and requested != "auto":
+        if requested not in JSON_CODECS:
+            logger.warning(f"Ignoring invalid value for QUIZ_GENERATOR_JSON_CODEC: {requested}")
+        elif requested not in available:
+            logger.warning(f"JSON codec {requested} is not installed; using the fastest one installed")
+        else:
+            return available[requested]
+    return next(iter(available.values()))
+
+
+_codec = _select_codec()
+
+
+def get_json_codec() -> str:
+    """
+    Get the name of the JSON codec in use.
+    
+    Returns:
+        "orjson", "msgspec" or "json"
+    """
+    return _codec.name
+
+
+def dumps_bytes(obj: Any, indent: bool = False, sort_keys: bool = False) -> bytes:
+    """
+    Encode a value as UTF-8 JSON.
+    
+    Args:
+        obj: The value to encode
+        indent: Whether to indent the JSON by two spaces
+        sort_keys: Whether to sort the keys of objects
+    
+    Returns:
+        The JSON, with non-ASCII characters written as they are
+    """
+    return _codec.dumps(obj, indent, sort_keys)
+
+
+def dumps(obj: Any, indent: bool = False, sort_keys: bool = False) -> str:
+    """
+    Encode a value as JSON text.
+    
+    Args:
+        obj: The value to encode
+        indent: Whether to indent the JSON by two spaces
+        sort_keys: Whether to sort the keys of objects
+    
+    Returns:
+        The JSON, with non-ASCII characters written as they are
+    """
+    return _codec.dumps(obj, indent, sort_keys).decode("utf-8")
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Decode JSON text or UTF-8 bytes.
+    
+    Args:
+        data: The JSON
+    
+    Returns:
+        The decoded value
+    
+    Raises:
+        json.JSONDecodeError: If the data is not valid JSON
+    """
+    return _codec.loads(data)
@@ -0,0 +1,192 @@
+"""
+JSON extraction for the Quiz Generator package.
+
+This module finds and parses the JSON in a model response. Models often wrap their
+JSON in code fences, precede it with a <think> block or a sentence of prose, or
+follow it with a note. All patterns are compiled at import time, and a response
+that is nothing but JSON is decoded directly with the JSON codec; otherwise the
+JSON is decoded from the first opening brace (or bracket) it can be decoded from.
+"""
+
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from . import json_codec
+
+# Get the logger
+logger = logging.getLogger("quiz_generator")
+
+THINK_END = "</think>"
+
+# Patterns for the code fence opening and closing a response, with an optional language tag
+OPENING_FENCE_PATTERN = re.compile(r'\A\s*```[\w+-]*[ \t]*\r?\n?')
+CLOSING_FENCE_PATTERN = re.compile(r'```\s*\Z')
+
+# Pattern for the characters a JSON object or array starts with
+OBJECT_START_PATTERN = re.compile(r'\{')
+CONTAINER_START_PATTERN = re.compile(r'[\[{]')
+
+# Pattern for the markdown headers of a question written out as text rather than JSON
+QUESTION_HEADER_PATTERN = re.compile(
+    r'\*\*(Question Stem|Question|Options|Correct Answer|Answer|Concept Phrase|Explanation):\*\*'
+)
+
+# Pattern for an option line of a question written out as text, e.g. "B. Lists"
+OPTION_LINE_PATTERN = re.compile(r'^\s*([A-D]\.\s*.*?)\s*$', re.MULTILINE)
+
+# Field of the question data that each markdown header fills
+QUESTION_HEADER_FIELDS = {
+    "Question Stem": "question",
+    "Question": "question",
+    "Options": "options",
+    "Correct Answer": "correct_answer",
+    "Answer": "correct_answer",
+    "Concept Phrase": "concept_phrase",
+    "Explanation": "explanation"
+}
+
+_decoder = json.JSONDecoder()
+
+
+def strip_think_block(response: str) -> str:
+    """
+    Remove the reasoning that some models write before their answer.
+    
+    Everything up to the last </think> tag is dropped, which also covers models
+    that leave out the opening <think> tag.
+    
+    Args:
+        response: The response from the model
+    
+    Returns:
+        The response without its <think> block
+    """
+    _, found, answer = response.rpartition(THINK_END)
+    return answer if found else response
+
+
+def strip_code_fence(response: str) -> str:
+    """
+    Remove the code fence around a response, if it has one.
+    
+    Fences inside the response are left alone, since a question about code may
+    contain a fenced snippet in one of its strings.
+    
+    Args:
+        response: The response from the model
+    
+    Returns:
+        The response without its surrounding code fence
+    """
+    opening = OPENING_FENCE_PATTERN.match(response)
+    if opening is None:
+        return response
+    closing = CLOSING_FENCE_PATTERN.search(response, opening.end())
+    return response[opening.end():closing.start() if closing else len(response)]
+
+
+def _is_wanted(value: Any, allow_array: bool) -> bool:
+    """Check whether a decoded value is what the caller is looking for."""
+    if isinstance(value, dict):
+        return True
+    # A list of questions holds objects; skip e.g. "[1]" in the prose before it
+    return allow_array and isinstance(value, list) and bool(value) and isinstance(value[0], dict)
+
+
+def _decode_first(text: str, allow_array: bool) -> Optional[Any]:
+    """Decode the first JSON value in the text that starts at an opening brace (or bracket)."""
+    pattern = CONTAINER_START_PATTERN if allow_array else OBJECT_START_PATTERN
+    position = 0
+    while True:
+        match = pattern.search(text, position)
+        if match is None:
+            return None
+        try:
+            value, end = _decoder.raw_decode(text, match.start())
+        except json.JSONDecodeError:
+            # Try the next opening brace, which may start a valid value nested in this
+            # one, e.g. when a note follows the inner object before the outer one closes
+            position = match.start() + 1
+            continue
+        if _is_wanted(value, allow_array):
+            return value
+        # Skip past the whole value rather than into it
+        position = end
+
+
+def _parse_question_text(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Build the data of a multiple choice question from a response written as markdown.
+    
+    Args:
+        text: The response, with headers like **Question:** and **Options:**
+    
+    Returns:
+        The question data, or None if the question, options or answer is missing
+    """
+    headers = list(QUESTION_HEADER_PATTERN.finditer(text))
+    sections: Dict[str, str] = {}
+    for index, match in enumerate(headers):
+        end = headers[index + 1].start() if index + 1 < len(headers) else len(text)
+        sections.setdefault(QUESTION_HEADER_FIELDS[match.group(1)], text[match.end():end].strip())
+    
+    if not {"question", "options", "correct_answer"} <= sections.keys():
+        return None
+    
+    options: List[str] = OPTION_LINE_PATTERN.findall(sections["options"])
+    return {
+        "question": sections["question"],
+        "options": options,
+        "correct_answer": sections["correct_answer"],
+        "type": "multiple_choice",
+        "concept_phrase": sections.get("concept_phrase", ""),
+        "explanation": sections.get("explanation", "")
+    }
+
+
+def extract_json(response: str, allow_array: bool = False) -> Any:
+    """
+    Find and parse the JSON in a model response.
+    
+    The <think> block and the surrounding code fence are dropped, and the first
+    JSON object (or, if allow_array is set, array of objects) in the rest of the
+    response is decoded once and returned. A multiple choice question written
+    out as markdown headers instead of JSON is turned into question data.
+    
+    Args:
+        response: The response from the model
+        allow_array: Whether a JSON array of objects may be returned, e.g. for a batch of questions
+    
+    Returns:
+        The parsed JSON object or array
+    
+    Raises:
+        json.JSONDecodeError: If the response contains no JSON
+    """
+    text = strip_code_fence(strip_think_block(response)).strip()
+    # Structured output and well-behaved models return nothing but the JSON
+    if text[:1] in ("{", "[") and text[-1:] in ("}", "]"):
+        try:
+            value = json_codec.loads(text)
+        except json.JSONDecodeError:
+            value = None
+        if _is_wanted(value, allow_array):
+            return value
+        if isinstance(value, list) and not allow_array:
+            # A single question asked for, but returned in an array
+            value = next((item for item in value if isinstance(item, dict)), None)
+            if value is not None:
+                return value
+    
+    value = _decode_first(text, allow_array)
+    if value is not None:
+        return value
+    
+    data = _parse_question_text(text)
+    if data is not None:
+        logger.info("Response is not JSON; built the question from its markdown headers")
+        return data
+    
+    raise json.JSONDecodeError("No JSON object found in response", response, 0)
@@ -5,12 +5,12 @@ This module contains functions for creating bootable quizzes and HTML quizzes.
 """
 
 import os
-import json
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import IO, List, Dict, Any, Tuple
 
 from ..models.question_models import BaseQuestion
 from .common_utils import sanitize_filename
+from . import json_codec
 from .templates.html.base import get_base_html
 from .templates.html.head import get_head_content
 from .templates.html.styles import get_css_styles
@@ -18,6 +18,30 @@ from .templates.html.scripts import get_javascript_code
 from .templates.html.components import get_sidebar_html, get_main_content_html
 
 
+def _open_new_file(output_dir: str, filename: str) -> Tuple[str, IO[str]]:
+    """
+    Create a new output file, adding a number to the name if the file already exists.
+    
+    Filenames only carry a timestamp to the second, so quizzes on the same topic that
+    are written at the same time (e.g. in a bulk run) would otherwise overwrite each other.
+    
+    Args:
+        output_dir: The directory to create the file in
+        filename: The preferred filename
+        
+    Returns:
+        A tuple of (file path, file opened for writing)
+    """
+    stem, extension = os.path.splitext(filename)
+    number = 1
+    while True:
+        file_path = os.path.join(output_dir, filename if number == 1 else f"{stem}_{number}{extension}")
+        try:
+            return file_path, open(file_path, 'x', encoding='utf-8')
+        except FileExistsError:
+            number += 1
+
+
 def create_bootable_quiz(questions: List[BaseQuestion], topic: str, subtopic: str = None, microcourse_content: str = None) -> str:
     """
     Create a bootable quiz file (.bquiz) for MagicTutor.
@@ -53,9 +77,9 @@ def create_bootable_quiz(questions: List[BaseQuestion], topic: str, subtopic: st
     os.makedirs(output_dir, exist_ok=True)
     
     # Save the file
-    file_path = os.path.join(output_dir, filename)
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(quiz_data, f, indent=2, ensure_ascii=False)
+    file_path, f = _open_new_file(output_dir, filename)
+    with f:
+        f.write(json_codec.dumps(quiz_data, indent=True))
     
     return file_path
 
@@ -116,14 +140,14 @@ def create_html_quiz(questions: List[BaseQuestion], topic: str, subtopic: str =
     javascript_code = get_javascript_code()
     javascript_code = javascript_code.replace(
         "QUESTIONS_JSON_PLACEHOLDER", 
-        json.dumps(questions_json)
+        json_codec.dumps(questions_json)
     )
     
     # Add microcourse content if available
     if microcourse_content:
         javascript_code = javascript_code.replace(
             "MICROCOURSE_CONTENT_PLACEHOLDER",
-            json.dumps(microcourse_content)
+            json_codec.dumps(microcourse_content)
         )
     else:
         javascript_code = javascript_code.replace(
@@ -145,8 +169,8 @@ def create_html_quiz(questions: List[BaseQuestion], topic: str, subtopic: str =
     )
     
     # Save the file
-    file_path = os.path.join(output_dir, filename)
-    with open(file_path, 'w', encoding='utf-8') as f:
+    file_path, f = _open_new_file(output_dir, filename)
+    with f:
         f.write(html_content)
     
     return file_path
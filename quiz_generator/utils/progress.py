@@ -0,0 +1,234 @@
+"""
+Progress tracking for the Quiz Generator package.
+
+This module contains the QuizProgress class, which collects the questions and the
+microcourse of a quiz as they finish, together with their status, elapsed time,
+tokens used and the model that served them, and forwards progress updates to the caller (e.g. an MCP client).
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from ..models.question_models import BaseQuestion
+from .host_agent import TokenUsage
+
+# Get the logger
+logger = logging.getLogger("quiz_generator")
+
+
+class QuestionProgress(NamedTuple):
+    """
+    Report of one or more questions that have finished generating.
+    
+    Attributes:
+        first_question_number: The number of the first question in the series
+        questions: The questions, in order (a single question, or a batch)
+        elapsed: Seconds taken to generate the questions
+        usage: The tokens used to generate the questions
+    """
+    first_question_number: int
+    questions: List[BaseQuestion]
+    elapsed: float
+    usage: TokenUsage
+
+
+class QuizProgress:
+    """
+    Collects the items of a quiz as they finish and reports progress.
+    
+    Progress updates are sent to an optional async notify callback, e.g. an MCP
+    Context's report_progress. Items may be added from worker threads; updates are
+    sent on the event loop the QuizProgress was created on. The questions collected
+    so far stay available if the quiz is cancelled part way through.
+    
+    Attributes:
+        total_items: The number of items in the quiz (questions plus the microcourse)
+        completed_items: The number of items that have finished
+        items: A status record for each finished item
+        usage: The tokens used so far
+        microcourse: The microcourse content, once it has finished
+    """
+    
+    def __init__(
+        self,
+        total_items: int,
+        notify: Optional[Callable[[float, Optional[float], Optional[str]], Awaitable[None]]] = None
+    ):
+        """
+        Initialize the QuizProgress.
+        
+        Args:
+            total_items: The number of items in the quiz
+            notify: Optional async callback taking (progress, total, message). It must be
+                    created on a running event loop if notify is given.
+        """
+        self.total_items = total_items
+        self.completed_items = 0
+        self.items: List[Dict[str, Any]] = []
+        self.usage = TokenUsage()
+        self.microcourse: Optional[str] = None
+        self._questions: Dict[int, BaseQuestion] = {}
+        self._started = time.monotonic()
+        self._notify = notify
+        self._loop = asyncio.get_running_loop() if notify else None
+        self._pending: set = set()
+        self._lock = threading.Lock()
+    
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the quiz was started."""
+        return time.monotonic() - self._started
+    
+    def _add_item(self, name: str, status: str, elapsed: float, input_tokens: int, output_tokens: int,
+                  retries: int = 0, model_used: Optional[str] = None) -> Dict[str, Any]:
+        """Record a finished item. Must be called with the lock held."""
+        self.completed_items += 1
+        item = {
+            "item": name,
+            "status": status,
+            "elapsed": round(elapsed, 2),
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "retries": retries,
+            "model_used": model_used
+        }
+        self.items.append(item)
+        return item
+    
+    def add_questions(
+        self,
+        first_question_number: int,
+        questions: List[BaseQuestion],
+        elapsed: float = 0.0,
+        usage: Optional[TokenUsage] = None,
+        status: Optional[str] = None
+    ) -> None:
+        """
+        Record questions that have finished.
+        
+        Args:
+            first_question_number: The number of the first question in the series
+            questions: The questions, in order
+            elapsed: Seconds taken to generate the questions
+            usage: The tokens used to generate the questions
+            status: The status of every question (default: "ready", or "failed" for placeholders)
+        """
+        from ..generators.question_generator import is_placeholder_question
+        
+        input_tokens = usage.input_tokens if usage else 0
+        output_tokens = usage.output_tokens if usage else 0
+        retries = usage.retries if usage else 0
+        # The model that served the last request is the one that produced the questions
+        model_used = usage.models_used[-1] if usage and usage.models_used else None
+        count = max(len(questions), 1)
+        messages = []
+        with self._lock:
+            if usage:
+                self.usage.merge(usage)
+            for index, question in enumerate(questions):
+                number = first_question_number + index
+                self._questions[number] = question
+                # The tokens of a batch are shared out between its questions; its retries
+                # are counted once, on the first question
+                item = self._add_item(
+                    f"question {number}",
+                    status or ("failed" if is_placeholder_question(question) else "ready"),
+                    elapsed,
+                    input_tokens // count + (input_tokens % count if index == 0 else 0),
+                    output_tokens // count + (output_tokens % count if index == 0 else 0),
+                    retries if index == 0 else 0,
+                    model_used if not is_placeholder_question(question) else None
+                )
+                messages.append((self.completed_items, self._describe(item)))
+        for completed, message in messages:
+            self._report(completed, message)
+    
+    def on_question(self, progress: QuestionProgress) -> None:
+        """Record a QuestionProgress report; used as the question generator's on_question callback."""
+        self.add_questions(progress.first_question_number, progress.questions, progress.elapsed, progress.usage)
+    
+    def add_microcourse(self, content: str, elapsed: float, usage: Optional[TokenUsage] = None) -> None:
+        """
+        Record the microcourse once it has finished.
+        
+        Args:
+            content: The microcourse content
+            elapsed: Seconds taken to generate the microcourse
+            usage: The tokens used to generate the microcourse
+        """
+        with self._lock:
+            self.microcourse = content
+            if usage:
+                self.usage.merge(usage)
+            item = self._add_item(
+                "microcourse", "ready", elapsed,
+                usage.input_tokens if usage else 0, usage.output_tokens if usage else 0,
+                usage.retries if usage else 0,
+                usage.models_used[-1] if usage and usage.models_used else None
+            )
+            completed = self.completed_items
+        self._report(completed, self._describe(item))
+    
+    def get_questions(self) -> List[BaseQuestion]:
+        """Get the questions that have finished, in question order."""
+        with self._lock:
+            return [self._questions[number] for number in sorted(self._questions)]
+    
+    def get_models_used(self) -> List[str]:
+        """Get the models that served the requests of the quiz, in the order they were first used."""
+        with self._lock:
+            return list(dict.fromkeys(self.usage.models_used))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Get a summary of the progress so far."""
+        with self._lock:
+            return {
+                "completed_items": self.completed_items,
+                "total_items": self.total_items,
+                "elapsed": round(self.elapsed, 2),
+                "input_tokens": self.usage.input_tokens,
+                "output_tokens": self.usage.output_tokens,
+                "retries": self.usage.retries,
+                "models_used": list(dict.fromkeys(self.usage.models_used)),
+                "items": list(self.items)
+            }
+    
+    def _describe(self, item: Dict[str, Any]) -> str:
+        """Build the progress message for a finished item."""
+        tokens = item["input_tokens"] + item["output_tokens"]
+        retries = f", {item['retries']} retries" if item["retries"] else ""
+        return (
+            f"{item['item'].capitalize()} {item['status']} after {item['elapsed']:.1f}s "
+            f"({tokens} tokens{retries}; {self.completed_items}/{self.total_items} items, "
+            f"{self.usage.total_tokens} tokens in total)"
+        )
+    
+    def _report(self, completed: int, message: str) -> None:
+        """Send a progress update to the notify callback on its event loop."""
+        logger.info(message)
+        if self._notify is None:
+            return
+        self._loop.call_soon_threadsafe(self._start_notify, completed, message)
+    
+    def _start_notify(self, completed: int, message: str) -> None:
+        """Start sending a progress update; runs on the event loop."""
+        task = self._loop.create_task(self._send(completed, message))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+    
+    async def _send(self, completed: int, message: str) -> None:
+        """Send a progress update, logging errors instead of failing the quiz."""
+        try:
+            await self._notify(completed, self.total_items, message)
+        except Exception as e:
+            logger.warning(f"Error sending progress update: {str(e)}")
+    
+    async def flush(self) -> None:
+        """Wait until every progress update has been sent."""
+        # Let callbacks scheduled from worker threads start their tasks first
+        await asyncio.sleep(0)
+        while self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
@@ -0,0 +1,258 @@
+"""
+Question bank for the Quiz Generator package.
+
+This module contains a persistent SQLite store of generated questions, so quizzes
+on topics that have been requested before can be filled without calling the LLM.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+from ..models.question_models import BaseQuestion, question_from_dict
+from . import json_codec
+
+# Get the logger
+logger = logging.getLogger("quiz_generator")
+
+# Values of QUIZ_GENERATOR_QUESTION_BANK that turn the question bank on by default
+_ENABLED_VALUES = ("1", "true", "yes", "on")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    question_hash TEXT NOT NULL UNIQUE,
+    topic TEXT NOT NULL,
+    subtopic TEXT NOT NULL DEFAULT '',
+    type TEXT NOT NULL,
+    focus TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    concept_phrase TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    times_used INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_questions_lookup
+    ON questions (topic, subtopic, type, focus, difficulty, times_used);
+CREATE INDEX IF NOT EXISTS idx_questions_concept_phrase
+    ON questions (concept_phrase);
+"""
+
+
+def get_default_question_bank_path() -> str:
+    """
+    Get the path of the question bank database.
+    
+    Returns:
+        The database path (QUIZ_GENERATOR_QUESTION_BANK_PATH, or data/question_bank.db)
+    """
+    path = os.environ.get("QUIZ_GENERATOR_QUESTION_BANK_PATH")
+    if path:
+        return path
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "question_bank.db")
+
+
+def is_question_bank_enabled(use_question_bank: Optional[bool] = None) -> bool:
+    """
+    Check whether the question bank should be used.
+    
+    Args:
+        use_question_bank: Explicit setting from the caller. If None, the
+                           QUIZ_GENERATOR_QUESTION_BANK environment variable decides.
+    
+    Returns:
+        True if the question bank should be used
+    """
+    if use_question_bank is not None:
+        return use_question_bank
+    return os.environ.get("QUIZ_GENERATOR_QUESTION_BANK", "").lower() in _ENABLED_VALUES
+
+
+def get_question_hash(question: BaseQuestion) -> str:
+    """
+    Get a hash identifying a question, used to avoid storing duplicates.
+    
+    Args:
+        question: The question to hash
+    
+    Returns:
+        A hex digest of the question's type, text and correct answer
+    """
+    payload = json.dumps(
+        [question.type, question.question.strip(), getattr(question, "correct_answer", None)],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class QuestionBank:
+    """
+    A persistent store of generated questions.
+    
+    Each question is stored as its to_dict() JSON, indexed by topic, subtopic, type,
+    focus, difficulty and concept phrase. Questions are handed out least-used first,
+    so repeated quizzes on the same topic rotate through the stored questions.
+    
+    Attributes:
+        db_path: The path of the SQLite database
+    """
+    
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or get_default_question_bank_path()
+        self._lock = threading.Lock()
+        self._initialized = False
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection to the database, creating the schema on first use."""
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+                    connection = sqlite3.connect(self.db_path, timeout=30)
+                    try:
+                        connection.execute("PRAGMA journal_mode=WAL")
+                        connection.executescript(_SCHEMA)
+                        connection.commit()
+                    finally:
+                        connection.close()
+                    self._initialized = True
+        return sqlite3.connect(self.db_path, timeout=30)
+    
+    def add_questions(self, questions: List[BaseQuestion], difficulty: str) -> int:
+        """
+        Store questions in the bank, skipping questions that are already stored.
+        
+        Args:
+            questions: The questions to store
+            difficulty: The difficulty the questions were generated for
+        
+        Returns:
+            The number of questions added
+        """
+        rows = [
+            (
+                get_question_hash(q),
+                q.topic,
+                q.subtopic or "",
+                q.type,
+                q.focus,
+                difficulty,
+                q.concept_phrase or "",
+                json_codec.dumps(q.to_dict()),
+                time.time()
+            )
+            for q in questions
+        ]
+        if not rows:
+            return 0
+        
+        connection = self._connect()
+        try:
+            with connection:
+                before = connection.total_changes
+                connection.executemany(
+                    "INSERT OR IGNORE INTO questions "
+                    "(question_hash, topic, subtopic, type, focus, difficulty, concept_phrase, data, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                added = connection.total_changes - before
+        finally:
+            connection.close()
+        
+        logger.info(f"Added {added} of {len(rows)} questions to the question bank")
+        return added
+    
+    def find_questions(self, topic: str, subtopic: Optional[str], question_type: str, focus: str,
+                       difficulty: str, limit: int) -> List[BaseQuestion]:
+        """
+        Take stored questions matching a quiz request.
+        
+        The least-used matching questions are returned and their use count is
+        incremented, so the next request gets different questions if there are any.
+        
+        Args:
+            topic: The main topic of the quiz
+            subtopic: Optional subtopic of the quiz
+            question_type: The type of questions (multiple_choice, true_false, cloze)
+            focus: Whether the questions focus on code or text
+            difficulty: The difficulty level of the questions
+            limit: The maximum number of questions to return
+        
+        Returns:
+            A list of up to limit Question objects
+        """
+        if limit <= 0:
+            return []
+        
+        connection = self._connect()
+        try:
+            with connection:
+                rows = connection.execute(
+                    "SELECT id, data FROM questions "
+                    "WHERE topic = ? AND subtopic = ? AND type = ? AND focus = ? AND difficulty = ? "
+                    "ORDER BY times_used, RANDOM() LIMIT ?",
+                    (topic, subtopic or "", question_type, focus, difficulty, limit)
+                ).fetchall()
+                connection.executemany(
+                    "UPDATE questions SET times_used = times_used + 1 WHERE id = ?",
+                    [(row[0],) for row in rows]
+                )
+        finally:
+            connection.close()
+        
+        questions = []
+        for _, data in rows:
+            try:
+                questions.append(question_from_dict(json_codec.loads(data)))
+            except (json.JSONDecodeError, KeyError, ValueError) as e:
+                logger.warning(f"Skipping unreadable question in the question bank: {str(e)}")
+        
+        if questions:
+            logger.info(f"Using {len(questions)} questions from the question bank for {topic}")
+        return questions
+    
+    def count_questions(self, topic: Optional[str] = None) -> int:
+        """
+        Count the stored questions.
+        
+        Args:
+            topic: Optional topic to count questions for
+        
+        Returns:
+            The number of stored questions
+        """
+        connection = self._connect()
+        try:
+            if topic is None:
+                row = connection.execute("SELECT COUNT(*) FROM questions").fetchone()
+            else:
+                row = connection.execute("SELECT COUNT(*) FROM questions WHERE topic = ?", (topic,)).fetchone()
+        finally:
+            connection.close()
+        return row[0]
+
+
+# Process-wide question bank, created on first use
+_question_bank: Optional[QuestionBank] = None
+_question_bank_lock = threading.Lock()
+
+
+def get_question_bank() -> QuestionBank:
+    """
+    Get the process-wide question bank.
+    
+    Returns:
+        The shared QuestionBank instance
+    """
+    global _question_bank
+    
+    with _question_bank_lock:
+        if _question_bank is None:
+            _question_bank = QuestionBank()
+        return _question_bank
@@ -0,0 +1,387 @@
+"""
+Request limiting for the Quiz Generator package.
+
+This module contains the RequestLimiter class, which caps the number of LLM
+requests in flight and the rate at which they are started, so a long run of
+many quizzes stays within a provider's limits, and the ProviderLimiter class,
+which governs every request sent to one platform and model in the process.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+# Get the logger
+logger = logging.getLogger("quiz_generator")
+
+
+class RequestLimiter:
+    """
+    A limit on the LLM requests shared by every quiz of a run.
+    
+    Use it as an async context manager around each request. Entering waits for a
+    free request slot and, if a rate is set, for the request's turn; leaving frees
+    the slot. Requests per minute are paced with a token bucket, so a burst of up
+    to one minute's worth of requests may start at once after an idle period.
+    
+    Attributes:
+        max_concurrent: The number of requests allowed in flight at once, or None
+        requests_per_minute: The number of requests allowed to start per minute, or None
+    """
+    
+    def __init__(self, max_concurrent: Optional[int] = None, requests_per_minute: Optional[float] = None):
+        """
+        Initialize the RequestLimiter.
+        
+        Args:
+            max_concurrent: Optional limit on the requests in flight at once
+            requests_per_minute: Optional limit on the requests started per minute
+        """
+        self.max_concurrent = max(1, int(max_concurrent)) if max_concurrent else None
+        self.requests_per_minute = float(requests_per_minute) if requests_per_minute else None
+        self._semaphore = asyncio.Semaphore(self.max_concurrent) if self.max_concurrent else None
+        self._rate_lock = asyncio.Lock()
+        self._tokens = self.requests_per_minute or 0.0
+        self._updated = time.monotonic()
+    
+    async def _wait_for_rate(self) -> None:
+        """Wait until the request rate allows another request to start."""
+        if not self.requests_per_minute:
+            return
+        
+        # Requests take their turn in the order they arrive
+        async with self._rate_lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.requests_per_minute,
+                    self._tokens + (now - self._updated) * self.requests_per_minute / 60.0
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * 60.0 / self.requests_per_minute)
+    
+    async def __aenter__(self) -> "RequestLimiter":
+        if self._semaphore is not None:
+            await self._semaphore.acquire()
+        try:
+            await self._wait_for_rate()
+        except BaseException:
+            if self._semaphore is not None:
+                self._semaphore.release()
+            raise
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket that refills at a fixed rate per minute.
+    
+    Callers reserve what they need up front. The level may go below zero, in which
+    case the caller waits until the bucket has refilled to cover the reservation;
+    later callers queue behind it, so requests are served in the order they arrive.
+    
+    Attributes:
+        per_minute: The number of tokens added per minute, which is also the capacity
+    """
+    
+    def __init__(self, per_minute: float):
+        self.per_minute = float(per_minute)
+        self._level = self.per_minute
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self) -> None:
+        """Add the tokens earned since the last update. Must be called with the lock held."""
+        now = time.monotonic()
+        self._level = min(self.per_minute, self._level + (now - self._updated) * self.per_minute / 60.0)
+        self._updated = now
+    
+    def reserve(self, amount: float) -> float:
+        """
+        Take tokens from the bucket.
+        
+        Args:
+            amount: The number of tokens to take
+        
+        Returns:
+            The number of seconds to wait before using them
+        """
+        with self._lock:
+            self._refill()
+            self._level -= amount
+            return max(0.0, -self._level * 60.0 / self.per_minute)
+    
+    def adjust(self, amount: float) -> None:
+        """
+        Take more tokens (or give tokens back, if amount is negative) after the fact.
+        
+        Args:
+            amount: The number of tokens to take
+        """
+        with self._lock:
+            self._refill()
+            self._level = min(self.per_minute, self._level - amount)
+
+
+class _Waiter:
+    """A caller waiting for a free request slot."""
+    
+    __slots__ = ("wake", "granted")
+    
+    def __init__(self, wake: Callable[[], None]):
+        self.wake = wake
+        self.granted = False
+
+
+class ProviderLimiter:
+    """
+    The limits on the requests sent to one platform and model.
+    
+    Every request, from worker threads and event loops alike, first waits for one
+    of max_in_flight request slots, then for the request and token rates. Waiting
+    callers are served in order. The tokens of a request are reserved up front from
+    an estimate and settled with the actual usage once the request has finished.
+    
+    Attributes:
+        name: The platform and model, used in log messages
+        max_in_flight: The number of requests allowed in flight at once, or None
+        requests_per_minute: The bucket of requests started per minute, or None
+        tokens_per_minute: The bucket of tokens used per minute, or None
+        in_flight: The number of requests holding a slot
+        waiting: The number of callers waiting for a slot
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        max_in_flight: Optional[int] = None,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None
+    ):
+        """
+        Initialize the ProviderLimiter.
+        
+        Args:
+            name: The platform and model, used in log messages
+            max_in_flight: Optional limit on the requests in flight at once
+            requests_per_minute: Optional limit on the requests started per minute
+            tokens_per_minute: Optional limit on the input and output tokens used per minute
+        """
+        self.name = name
+        self.max_in_flight = max(1, int(max_in_flight)) if max_in_flight else None
+        self.requests_per_minute = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens_per_minute = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.in_flight = 0
+        self._paused_until = 0.0
+        self._waiters: Deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+    
+    @property
+    def waiting(self) -> int:
+        """The number of callers waiting for a slot."""
+        return len(self._waiters)
+    
+    def _take_slot(self, wake: Callable[[], None]) -> Optional[_Waiter]:
+        """Take a free slot, or queue a waiter for one. Returns the waiter if queued."""
+        with self._lock:
+            if self.max_in_flight is None or (self.in_flight < self.max_in_flight and not self._waiters):
+                self.in_flight += 1
+                return None
+            waiter = _Waiter(wake)
+            self._waiters.append(waiter)
+            return waiter
+    
+    def _release_slot(self) -> None:
+        """Free a slot, handing it straight to the next waiter if there is one."""
+        with self._lock:
+            if not self._waiters:
+                self.in_flight -= 1
+                return
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+        waiter.wake()
+    
+    def _abandon_slot(self, waiter: _Waiter) -> None:
+        """Stop waiting for a slot, freeing it if it was handed over just as the wait ended."""
+        with self._lock:
+            granted = waiter.granted
+            if not granted:
+                self._waiters.remove(waiter)
+        if granted:
+            self._release_slot()
+    
+    def _reserve(self, tokens: float) -> float:
+        """Reserve a request and its tokens, returning the seconds to wait for them."""
+        wait = max(0.0, self._paused_until - time.monotonic())
+        if self.requests_per_minute is not None:
+            wait = max(wait, self.requests_per_minute.reserve(1))
+        if self.tokens_per_minute is not None:
+            wait = max(wait, self.tokens_per_minute.reserve(tokens))
+        if wait > 0:
+            logger.info(f"Rate limit for {self.name}: waiting {wait:.1f}s before sending the request")
+        return wait
+    
+    def _cancel(self, tokens: float) -> None:
+        """Give back the slot, the request and the tokens of a request that will not be sent."""
+        if self.requests_per_minute is not None:
+            self.requests_per_minute.adjust(-1)
+        self.release(tokens, 0)
+    
+    def acquire(self, tokens: float = 0, timeout: Optional[float] = None) -> None:
+        """
+        Wait until a request may be sent, blocking the calling thread.
+        
+        Args:
+            tokens: The estimated number of tokens the request will use
+            timeout: Optional number of seconds the request may wait
+        
+        Raises:
+            TimeoutError: If the request could not be sent within timeout seconds
+        """
+        started = time.monotonic()
+        event = threading.Event()
+        waiter = self._take_slot(event.set)
+        if waiter is not None and not event.wait(timeout):
+            self._abandon_slot(waiter)
+            raise TimeoutError(f"Timed out waiting for a request slot for {self.name}")
+        wait = self._reserve(tokens)
+        if timeout is not None and wait > timeout - (time.monotonic() - started):
+            self._cancel(tokens)
+            raise TimeoutError(f"Timed out waiting for the rate limit of {self.name}")
+        if wait > 0:
+            try:
+                time.sleep(wait)
+            except BaseException:
+                self._cancel(tokens)
+                raise
+    
+    async def acquire_async(self, tokens: float = 0, timeout: Optional[float] = None) -> None:
+        """
+        Wait until a request may be sent, without blocking the event loop.
+        
+        Args:
+            tokens: The estimated number of tokens the request will use
+            timeout: Optional number of seconds the request may wait
+        
+        Raises:
+            TimeoutError: If the request could not be sent within timeout seconds
+        """
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        
+        def grant() -> None:
+            if not future.done():
+                future.set_result(None)
+        
+        waiter = self._take_slot(lambda: loop.call_soon_threadsafe(grant))
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                self._abandon_slot(waiter)
+                raise TimeoutError(f"Timed out waiting for a request slot for {self.name}") from None
+            except asyncio.CancelledError:
+                self._abandon_slot(waiter)
+                raise
+        
+        wait = self._reserve(tokens)
+        if timeout is not None and wait > timeout - (time.monotonic() - started):
+            self._cancel(tokens)
+            raise TimeoutError(f"Timed out waiting for the rate limit of {self.name}")
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self._cancel(tokens)
+                raise
+    
+    def release(self, reserved_tokens: float = 0, used_tokens: float = 0) -> None:
+        """
+        Finish a request, freeing its slot and settling its tokens.
+        
+        Args:
+            reserved_tokens: The tokens reserved with acquire
+            used_tokens: The tokens the request actually used
+        """
+        if self.tokens_per_minute is not None:
+            self.tokens_per_minute.adjust(used_tokens - reserved_tokens)
+        self._release_slot()
+    
+    def back_off(self, seconds: float) -> None:
+        """
+        Stop new requests from starting for a while, e.g. after the platform returned a rate limit error.
+        
+        Args:
+            seconds: How long to hold new requests back
+        """
+        logger.warning(f"Rate limited by {self.name}; holding new requests back for {seconds:.1f}s")
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the limits and current load of the limiter."""
+        return {
+            "name": self.name,
+            "max_in_flight": self.max_in_flight,
+            "requests_per_minute": self.requests_per_minute.per_minute if self.requests_per_minute else None,
+            "tokens_per_minute": self.tokens_per_minute.per_minute if self.tokens_per_minute else None,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting
+        }
+
+
+# Process-wide limiters, by (platform, model)
+_provider_limiters: Dict[Tuple[str, str], ProviderLimiter] = {}
+_provider_limiters_lock = threading.Lock()
+
+
+def get_provider_limiter(
+    platform: str,
+    model: str,
+    max_in_flight: Optional[int] = None,
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[float] = None
+) -> ProviderLimiter:
+    """
+    Get the process-wide limiter of a platform and model, creating it on first use.
+    
+    Args:
+        platform: The platform
+        model: The model
+        max_in_flight: The limit on requests in flight, used when the limiter is created
+        requests_per_minute: The limit on requests per minute, used when the limiter is created
+        tokens_per_minute: The limit on tokens per minute, used when the limiter is created
+    
+    Returns:
+        The shared ProviderLimiter
+    """
+    key = (platform, model)
+    with _provider_limiters_lock:
+        limiter = _provider_limiters.get(key)
+        if limiter is None:
+            limiter = ProviderLimiter(f"{platform}/{model}", max_in_flight, requests_per_minute, tokens_per_minute)
+            _provider_limiters[key] = limiter
+        return limiter
+
+
+def get_provider_limiters() -> Dict[Tuple[str, str], ProviderLimiter]:
+    """Get every limiter created so far, by (platform, model)."""
+    with _provider_limiters_lock:
+        return dict(_provider_limiters)
+
+
+def reset_provider_limiters() -> None:
+    """Forget the limiters, so changed limits take effect for new requests."""
+    with _provider_limiters_lock:
+        _provider_limiters.clear()
@@ -0,0 +1,268 @@
+"""
+Response cache for the Quiz Generator package.
+
+This module contains a content-addressed cache of LLM responses with an in-memory
+LRU tier and a disk tier, so repeated requests for the same prompt can skip the
+LLM call.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from . import json_codec
+
+# Get the logger
+logger = logging.getLogger("quiz_generator")
+
+# Default cache settings. They can be overridden with the
+# QUIZ_GENERATOR_CACHE_DIR, QUIZ_GENERATOR_CACHE_TTL (seconds),
+# QUIZ_GENERATOR_CACHE_MEMORY_ENTRIES and QUIZ_GENERATOR_CACHE_MAX_BYTES
+# environment variables.
+DEFAULT_CACHE_TTL = 7 * 24 * 60 * 60
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_MAX_DISK_BYTES = 100 * 1024 * 1024
+
+# Values of QUIZ_GENERATOR_RESPONSE_CACHE that turn the cache on by default
+_ENABLED_VALUES = ("1", "true", "yes", "on")
+
+
+def get_default_cache_dir() -> str:
+    """
+    Get the directory used for the disk tier of the cache.
+    
+    Returns:
+        The path of the cache directory (next to the output directory by default)
+    """
+    cache_dir = os.environ.get("QUIZ_GENERATOR_CACHE_DIR")
+    if cache_dir:
+        return cache_dir
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "cache")
+
+
+def is_response_cache_enabled(use_cache: Optional[bool] = None) -> bool:
+    """
+    Check whether responses should be cached.
+    
+    Args:
+        use_cache: Explicit setting from the caller. If None, the
+                   QUIZ_GENERATOR_RESPONSE_CACHE environment variable decides.
+    
+    Returns:
+        True if the response cache should be used
+    """
+    if use_cache is not None:
+        return use_cache
+    return os.environ.get("QUIZ_GENERATOR_RESPONSE_CACHE", "").lower() in _ENABLED_VALUES
+
+
+def _get_number_env(name: str, default: float) -> float:
+    """Read a number from the environment, falling back to a default."""
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning(f"Ignoring invalid value for {name}: {value}")
+        return default
+
+
+class ResponseCache:
+    """
+    A two-tier cache of LLM responses.
+    
+    Entries are keyed by a hash of everything that determines a response (see
+    make_key). Recently used entries are kept in an in-memory LRU; every entry is
+    also written to a JSON file in the cache directory. Entries older than the TTL
+    are ignored and removed, and the oldest files are evicted once the disk tier
+    grows past its size limit.
+    
+    Attributes:
+        cache_dir: The directory holding the disk tier
+        ttl: How long an entry stays valid, in seconds
+        max_memory_entries: The number of entries kept in memory
+        max_disk_bytes: The maximum total size of the disk tier
+    """
+    
+    def __init__(self, cache_dir: Optional[str] = None, ttl: Optional[float] = None,
+                 max_memory_entries: Optional[int] = None, max_disk_bytes: Optional[int] = None):
+        self.cache_dir = cache_dir or get_default_cache_dir()
+        self.ttl = ttl if ttl is not None else _get_number_env("QUIZ_GENERATOR_CACHE_TTL", DEFAULT_CACHE_TTL)
+        self.max_memory_entries = int(max_memory_entries if max_memory_entries is not None else
+                                      _get_number_env("QUIZ_GENERATOR_CACHE_MEMORY_ENTRIES", DEFAULT_MEMORY_ENTRIES))
+        self.max_disk_bytes = int(max_disk_bytes if max_disk_bytes is not None else
+                                  _get_number_env("QUIZ_GENERATOR_CACHE_MAX_BYTES", DEFAULT_MAX_DISK_BYTES))
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._disk_bytes: Optional[int] = None
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(platform: str, request: Dict[str, Any], variant: Optional[str] = None) -> str:
+        """
+        Build the cache key for a request.
+        
+        Args:
+            platform: The platform the request is sent to
+            request: The request arguments (model, system prompt, prompt, temperature, max_tokens)
+            variant: Optional extra key component, used to keep otherwise identical
+                     requests apart (e.g. the question number within a quiz)
+        
+        Returns:
+            A hex digest identifying the request
+        """
+        payload = json.dumps([platform, request, variant], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _get_path(self, key: str) -> str:
+        """Get the path of the disk entry for a key."""
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+    
+    def _is_expired(self, created_at: float) -> bool:
+        """Check whether an entry created at the given time has expired."""
+        return self.ttl > 0 and time.time() - created_at > self.ttl
+    
+    def _remember(self, key: str, created_at: float, response: str) -> None:
+        """Store an entry in the memory tier, evicting the least recently used entries."""
+        with self._lock:
+            self._memory[key] = (created_at, response)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get a cached response.
+        
+        Args:
+            key: The cache key from make_key
+        
+        Returns:
+            The cached response, or None if there is no valid entry
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._is_expired(entry[0]):
+                    self._memory.move_to_end(key)
+                    return entry[1]
+                del self._memory[key]
+        
+        path = self._get_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = json_codec.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {path}: {str(e)}")
+            return None
+        
+        created_at = data.get("created_at", 0)
+        if self._is_expired(created_at):
+            self._remove_file(path)
+            return None
+        
+        self._remember(key, created_at, data["response"])
+        return data["response"]
+    
+    def set(self, key: str, response: str) -> None:
+        """
+        Store a response in both tiers.
+        
+        Args:
+            key: The cache key from make_key
+            response: The response to store
+        """
+        created_at = time.time()
+        self._remember(key, created_at, response)
+        
+        path = self._get_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so readers never see a partial entry
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(json_codec.dumps_bytes({"created_at": created_at, "response": response}))
+            os.replace(temp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            logger.warning(f"Error writing cache entry {path}: {str(e)}")
+            return
+        
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += size
+            over_limit = self._disk_bytes is None or self._disk_bytes > self.max_disk_bytes
+        if over_limit:
+            self._evict()
+    
+    def _remove_file(self, path: str) -> None:
+        """Remove a disk entry, ignoring errors."""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    
+    def _evict(self) -> None:
+        """Remove expired disk entries, then the oldest ones until the size limit is met."""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        
+        # Oldest first
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        now = time.time()
+        for mtime, size, path in entries:
+            expired = self.ttl > 0 and now - mtime > self.ttl
+            if not expired and total <= self.max_disk_bytes:
+                break
+            self._remove_file(path)
+            total -= size
+        
+        with self._lock:
+            self._disk_bytes = total
+    
+    def clear(self) -> None:
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._disk_bytes = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    self._remove_file(os.path.join(root, name))
+
+
+# Process-wide cache instance, created on first use
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    Get the process-wide response cache.
+    
+    Returns:
+        The shared ResponseCache instance
+    """
+    global _response_cache
+    
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
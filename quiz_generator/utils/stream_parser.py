@@ -0,0 +1,285 @@
+"""
+Streaming response parser for the Quiz Generator package.
+
+This module contains an incremental JSON parser for streamed LLM responses, so
+question objects can be validated as they arrive and a response that goes wrong
+can be aborted before the whole completion has been generated.
+"""
+
+import json
+import logging
+import re
+import time
+from typing import Any, Callable, List, NamedTuple, Optional
+
+from . import json_codec
+
+# Get the logger
+logger = logging.getLogger("quiz_generator")
+
+# Number of non-whitespace characters allowed before the first JSON object. A
+# response that starts with more text than this is not going to be JSON.
+MAX_PREFIX_CHARS = 1000
+
+THINK_START = "<think>"
+THINK_END = "</think>"
+
+# Pattern for the start of the object that structured output wraps a batch in,
+# up to the opening bracket of its array: {"questions": [
+QUESTIONS_WRAPPER_PATTERN = re.compile(r'\{\s*"questions"\s*:\s*\[\Z')
+
+
+class StreamAbort(Exception):
+    """Error raised when a streamed response should be stopped early."""
+
+
+class StreamEvent(NamedTuple):
+    """
+    A progress event for a streamed response.
+    
+    Attributes:
+        event: The kind of event (item, invalid_item, done, aborted)
+        label: What the response is for, e.g. "question 3"
+        elapsed: Seconds since the request was started
+        chars: Number of characters received so far
+        items: Number of valid items received so far
+        item: The item for item and invalid_item events
+        message: The reason for aborted events
+    """
+    event: str
+    label: str
+    elapsed: float
+    chars: int
+    items: int
+    item: Optional[Any] = None
+    message: Optional[str] = None
+
+
+class IncrementalJSONParser:
+    """
+    A parser that finds complete top-level JSON objects in streamed text.
+    
+    Text outside of objects (code fences, array brackets, commas, <think> blocks)
+    is skipped, so both a single object and an array of objects are parsed into
+    one item per object. The objects in the array of a {"questions": [...]}
+    wrapper, which structured output returns for a batch, are parsed as items too,
+    each one as soon as it is complete.
+    
+    Attributes:
+        malformed_items: Number of complete objects that were not valid JSON
+    """
+    
+    def __init__(self, max_prefix_chars: int = MAX_PREFIX_CHARS):
+        self.max_prefix_chars = max_prefix_chars
+        self.malformed_items = 0
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._in_think = False
+        self._tail = ""
+        self._prefix_chars = 0
+        self._seen_object = False
+    
+    def feed(self, text: str) -> List[Any]:
+        """
+        Parse the next chunk of streamed text.
+        
+        Args:
+            text: The chunk of text
+        
+        Returns:
+            The objects completed by this chunk, in order
+        
+        Raises:
+            StreamAbort: If too much text arrives before the first object
+        """
+        items = []
+        for char in text:
+            if self._depth == 0:
+                self._skip(char)
+                continue
+            
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "[" and self._depth == 1 and QUESTIONS_WRAPPER_PATTERN.match("".join(self._buffer)):
+                # Descend into the wrapper: its array is parsed like a top-level array
+                self._depth = 0
+                self._buffer = []
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    raw = "".join(self._buffer)
+                    self._buffer = []
+                    try:
+                        items.append(json_codec.loads(raw))
+                    except json.JSONDecodeError:
+                        self.malformed_items += 1
+                        logger.warning(f"Malformed JSON object in streamed response: {raw[:100]}...")
+        return items
+    
+    def _skip(self, char: str) -> None:
+        """Handle a character outside of any object."""
+        if self._in_think:
+            self._tail = (self._tail + char)[-len(THINK_END):]
+            if self._tail == THINK_END:
+                self._in_think = False
+                self._tail = ""
+            return
+        
+        if char == "{":
+            self._depth = 1
+            self._buffer = [char]
+            self._seen_object = True
+            return
+        
+        self._tail = (self._tail + char)[-len(THINK_START):]
+        if self._tail == THINK_START:
+            self._in_think = True
+            self._tail = ""
+            return
+        
+        if not self._seen_object and not char.isspace():
+            self._prefix_chars += 1
+            if self._prefix_chars > self.max_prefix_chars:
+                raise StreamAbort(f"No JSON object in the first {self.max_prefix_chars} characters of the response")
+
+
+class ResponseStream:
+    """
+    Tracks one streamed response: parses items, validates them and reports progress.
+    
+    Feed the streamed text chunk by chunk with feed(); it returns False when the
+    stream should be stopped, either because the expected number of items has
+    arrived or because the response has gone wrong.
+    
+    Attributes:
+        label: What the response is for, used in progress events
+        items: Number of valid items received
+        invalid_items: Number of invalid or malformed items received
+        aborted: The reason the stream was aborted, or None
+    """
+    
+    def __init__(
+        self,
+        label: str = "",
+        on_event: Optional[Callable[[StreamEvent], None]] = None,
+        validate_item: Optional[Callable[[Any], bool]] = None,
+        max_items: Optional[int] = None,
+        max_invalid_items: Optional[int] = None
+    ):
+        """
+        Initialize the ResponseStream.
+        
+        Args:
+            label: What the response is for, e.g. "question 3"
+            on_event: Optional callback for progress events. It may be called from a worker thread.
+            validate_item: Optional check for each parsed item
+            max_items: Stop the stream once this many valid items have arrived
+            max_invalid_items: Abort the stream once more than this many invalid items have arrived
+        """
+        self.label = label
+        self.on_event = on_event
+        self.validate_item = validate_item
+        self.max_items = max_items
+        self.max_invalid_items = max_invalid_items
+        self.items = 0
+        self.invalid_items = 0
+        self.aborted: Optional[str] = None
+        self._parser = IncrementalJSONParser()
+        self._chunks: List[str] = []
+        self._chars = 0
+        self._started = time.monotonic()
+    
+    @property
+    def text(self) -> str:
+        """The text received so far."""
+        return "".join(self._chunks)
+    
+    def _emit(self, event: str, item: Optional[Any] = None, message: Optional[str] = None) -> None:
+        """Send a progress event to the callback, if there is one."""
+        if self.on_event is None:
+            return
+        try:
+            self.on_event(StreamEvent(event, self.label, time.monotonic() - self._started, self._chars, self.items, item, message))
+        except Exception as e:
+            logger.warning(f"Error in stream progress callback: {str(e)}")
+    
+    def _is_valid(self, item: Any) -> bool:
+        """Check an item with the validator."""
+        if self.validate_item is None:
+            return True
+        try:
+            return bool(self.validate_item(item))
+        except Exception:
+            return False
+    
+    def _abort(self, message: str) -> bool:
+        """Mark the stream as aborted and tell the caller to stop."""
+        self.aborted = message
+        logger.warning(f"Aborting streamed response for {self.label or 'request'}: {message}")
+        return False
+    
+    def feed(self, chunk: str) -> bool:
+        """
+        Process the next chunk of the streamed response.
+        
+        Args:
+            chunk: The chunk of text
+        
+        Returns:
+            True to keep streaming, False to stop
+        """
+        self._chunks.append(chunk)
+        self._chars += len(chunk)
+        malformed_before = self._parser.malformed_items
+        try:
+            values = self._parser.feed(chunk)
+        except StreamAbort as e:
+            return self._abort(str(e))
+        
+        # A response may wrap the array of questions in an object
+        items = []
+        for value in values:
+            if isinstance(value, dict) and isinstance(value.get("questions"), list):
+                items.extend(value["questions"])
+            else:
+                items.append(value)
+        
+        self.invalid_items += self._parser.malformed_items - malformed_before
+        for item in items:
+            if self._is_valid(item):
+                self.items += 1
+                self._emit("item", item=item)
+            else:
+                self.invalid_items += 1
+                self._emit("invalid_item", item=item)
+        
+        if self.max_invalid_items is not None and self.invalid_items > self.max_invalid_items:
+            return self._abort(f"{self.invalid_items} invalid items")
+        if self.max_items is not None and self.items >= self.max_items:
+            return False
+        return True
+    
+    def finish(self) -> str:
+        """
+        Mark the response as complete and send the final progress event.
+        
+        Returns:
+            The text received
+        """
+        if self.aborted:
+            self._emit("aborted", message=self.aborted)
+        else:
+            self._emit("done")
+        return self.text
@@ -6,16 +6,22 @@ This is the main entry point for the Quiz Generator MCP server.
 It sets up logging, initializes the Anthropic client, and registers MCP tools.
 """
 
+import asyncio
 import os
 import logging
 import json
 import webbrowser
+from contextlib import asynccontextmanager
 from datetime import datetime
 
 import anthropic
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
 
-from quiz_generator.utils.host_agent import initialize_anthropic_client
+from quiz_generator.utils.circuit_breaker import get_circuit_breakers
+from quiz_generator.utils.host_agent import initialize_anthropic_client, is_circuit_breaker_enabled
+from quiz_generator.utils.rate_limiter import get_provider_limiters
+from quiz_generator.utils.job_queue import JobQueue
+from quiz_generator.tools.bulk_tools import ManifestError, generate_quizzes_from_manifest
 from quiz_generator.tools.mcp_tools import (
     get_host_agent_response_tool,
     test_host_agent,
@@ -43,8 +49,16 @@ os.makedirs(output_dir, exist_ok=True)
 # Initialize the Anthropic client
 anthropic_client = initialize_anthropic_client()
 
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    """Start the quiz job workers with the server, so jobs left by a restart resume right away."""
+    await quiz_jobs.start()
+    yield
+
+
 # Create an MCP server
-mcp = FastMCP("Quiz Generator")
+mcp = FastMCP("Quiz Generator", lifespan=lifespan)
 
 
 def get_host_agent_response(prompt: str, model: str = None, platform: str = None) -> str:
@@ -142,10 +156,14 @@ def test_host_agent(prompt: str = None, model: str = None, platform: str = None)
         }, indent=2)
 
 @mcp.tool()
-def generate_quiz(topic: str, subtopic: str = None, question_focus: str = "text", 
+async def generate_quiz(topic: str, subtopic: str = None, question_focus: str = "text", 
                  question_type: str = "multiple_choice", difficulty: str = "challenging",
                  num_questions: int = 5, output_format: str = "html", 
-                 model: str = None, platform: str = None) -> dict:
+                 model: str = None, platform: str = None,
+                 concurrent: bool = True, max_workers: int = None,
+                 use_cache: bool = None, use_question_bank: bool = None,
+                 batch_size: int = None, stream: bool = False, deadline: float = None,
+                 open_file: bool = True, ctx: Context = None) -> dict:
     """
     Generate a microcourse or quiz based on the provided parameters. A microcourse consists of a microlearning module and quiz questions.
     
@@ -171,33 +189,55 @@ def generate_quiz(topic: str, subtopic: str = None, question_focus: str = "text"
              - Ollama models like "ollama:llama3" (format: "ollama:model_name")
     - platform: The platform to use (anthropic, openai, groq, openrouter, ollama)
              If specified, will use the default model for that platform
+    - concurrent: Whether to send all question prompts at once instead of one after another (default: True)
+    - max_workers: Optional limit on concurrent requests (default: a per-platform limit, e.g. 1 for Ollama)
+    - use_cache: Whether to reuse cached LLM responses for identical requests (default: the
+             QUIZ_GENERATOR_RESPONSE_CACHE environment variable)
+    - use_question_bank: Whether to fill the quiz from previously generated questions first and only
+             generate the shortfall (default: the QUIZ_GENERATOR_QUESTION_BANK environment variable)
+    - batch_size: Number of questions to request per LLM call (default: one call per question)
+    - stream: Whether to stream responses, checking questions as they arrive and stopping each
+             response once it has its questions or its output goes wrong (default: False)
+    - deadline: Optional number of seconds the whole quiz may take. Every LLM call times out
+             when the deadline passes; the quiz is then made from the questions that have
+             finished, so it may have fewer questions than requested.
+    - open_file: Whether to open an HTML quiz in the default web browser once it is created (default: True)
+    
+    Progress is reported to the client as each question and the microcourse finishes, with
+    the item's status, elapsed time and tokens used. If the client cancels, the finished
+    questions are saved to a partial quiz file.
+    
+    Finished items are also written to a checkpoint file (unless QUIZ_GENERATOR_CHECKPOINTS
+    is off), so running the same request again after a crash or cancellation only generates
+    the items that had not finished.
     
     Returns:
     - file_path: Path to the generated quiz file
     - format: Format of the generated quiz file
     - num_questions: Number of questions in the quiz
+    - failed_questions: Number of questions that could not be generated and are placeholders
     - topic: Topic of the quiz
     - subtopic: Subtopic of the quiz if provided
+    - tokens_used: Number of tokens used to generate the quiz
+    - retries: Number of LLM requests that were sent again after a transient error
+      (rate limit, overload, timeout or connection reset)
+    - elapsed_seconds: Time taken to generate the quiz
+    - deadline_expired: Whether the deadline passed before every item had finished
+    - model_used: The model (or models, if requests failed over) that generated the quiz
     """
     # Import necessary modules
-    import json
     import os
     from datetime import datetime
-    from quiz_generator.generators.question_generator import AnthropicQuestionGenerator
-    from quiz_generator.utils.output_utils import create_bootable_quiz, create_html_quiz
-    from quiz_generator.prompts.prompt_templates import get_microcourse_prompt
-    
-    # Create a question generator
-    question_generator = AnthropicQuestionGenerator()
+    from quiz_generator.generators.quiz_pipeline import run_quiz_pipeline
     
-    # Generate a microcourse
-    microcourse_prompt = get_microcourse_prompt(topic, subtopic if subtopic else topic)
+    # Import the host_agent module to use the resolve_route function
+    from quiz_generator.utils.host_agent import resolve_route
     
-    # Import the host_agent module to use the select_platform_and_model function
-    from quiz_generator.utils.host_agent import select_platform_and_model
-    
-    # Select the platform and model based on specified values and available API keys
-    selected_platform, selected_model = select_platform_and_model(platform, model)
+    # Resolve the platform and model once, based on specified values and available API keys.
+    # The route is passed through the rest of the pipeline. Resolving it may probe Ollama
+    # over HTTP, so it runs off the event loop.
+    route = await asyncio.to_thread(resolve_route, platform, model)
+    selected_platform, selected_model = route
     
     # Log the selected platform and model
     logger.info(f"Using platform: {selected_platform} with model: {selected_model}")
@@ -365,12 +405,13 @@ def generate_quiz(topic: str, subtopic: str = None, question_focus: str = "text"
         with open(file_path, "w") as f:
             f.write(tutorial_content)
         
-        # Open the file in the default web browser
-        try:
-            webbrowser.open(file_path)
-            logger.info(f"Automatically opened tutorial at {file_path} in the default browser")
-        except Exception as e:
-            logger.error(f"Error opening tutorial in browser: {str(e)}")
+        # Open the file in the default web browser, unless the caller (e.g. a queued job) asked not to
+        if open_file:
+            try:
+                webbrowser.open(file_path)
+                logger.info(f"Automatically opened tutorial at {file_path} in the default browser")
+            except Exception as e:
+                logger.error(f"Error opening tutorial in browser: {str(e)}")
         
         # Return the result with information about the tutorial
         return {
@@ -382,262 +423,224 @@ def generate_quiz(topic: str, subtopic: str = None, question_focus: str = "text"
             "model_used": "none"
         }
     
-    # Generate microcourse content using the selected model
-    if selected_platform == "groq":
-        # Use GROQ for microcourse generation
-        try:
-            import groq
-            
-            # Get the GROQ API key from environment variables
-            groq_api_key = os.environ.get("GROQ_API_KEY")
-            if not groq_api_key:
-                logger.error("GROQ_API_KEY environment variable not found")
-                microcourse_content = "# Microcourse content could not be generated\n\nThe GROQ API key is not available."
-            else:
-                # Create a GROQ client
-                groq_client = groq.Client(api_key=groq_api_key)
-                
-                # Generate the response using the GROQ API
-                response = groq_client.chat.completions.create(
-                    model=selected_model,
-                    messages=[
-                        {"role": "system", "content": "You are an educational content creator. You create clear, concise, and informative content in markdown format. Format your response using markdown with proper headings, bullet points, and code blocks where appropriate."},
-                        {"role": "user", "content": microcourse_prompt}
-                    ],
-                    temperature=0.7,
-                    max_tokens=4000
-                )
-                
-                # Extract the response text
-                microcourse_content = response.choices[0].message.content
-                logger.info(f"Generated microcourse from GROQ: {microcourse_content[:100]}...")
-        except Exception as e:
-            error_message = f"Error generating microcourse from GROQ: {str(e)}"
-            logger.error(error_message)
-            microcourse_content = f"# Error generating microcourse\n\n{error_message}"
-    elif selected_platform == "openrouter":
-        # Use OpenRouter for microcourse generation
-        try:
-            import openai
-            
-            # Get the OpenRouter API key from environment variables
-            openrouter_api_key = os.environ.get("OPENROUTER_API_KEY")
-            if not openrouter_api_key:
-                logger.error("OPENROUTER_API_KEY environment variable not found")
-                microcourse_content = "# Microcourse content could not be generated\n\nThe OpenRouter API key is not available."
-            else:
-                # Create an OpenAI client with OpenRouter base URL
-                openai_client = openai.OpenAI(
-                    base_url="https://openrouter.ai/api/v1",
-                    api_key=openrouter_api_key,
-                )
-                
-                # Generate the response using the OpenRouter API
-                response = openai_client.chat.completions.create(
-                    model=selected_model,
-                    messages=[
-                        {"role": "system", "content": "You are an educational content creator. You create clear, concise, and informative content in markdown format. Format your response using markdown with proper headings, bullet points, and code blocks where appropriate."},
-                        {"role": "user", "content": microcourse_prompt}
-                    ],
-                    temperature=0.7,
-                    max_tokens=4000
-                )
-                
-                # Extract the response text
-                microcourse_content = response.choices[0].message.content
-                logger.info(f"Generated microcourse from OpenRouter: {microcourse_content[:100]}...")
-        except Exception as e:
-            error_message = f"Error generating microcourse from OpenRouter: {str(e)}"
-            logger.error(error_message)
-            microcourse_content = f"# Error generating microcourse\n\n{error_message}"
-    elif selected_platform == "ollama":
-        # Use Ollama for microcourse generation
-        try:
-            import openai
-            
-            # Import the function to get available Ollama models
-            from quiz_generator.utils.host_agent import get_available_ollama_models
-            
-            # If just "ollama" is specified, get available models and use the first one
-            if selected_model == "ollama":
-                available_models = get_available_ollama_models()
-                if not available_models:
-                    logger.error("No Ollama models available")
-                    microcourse_content = "# Microcourse content could not be generated\n\nNo Ollama models are available. Please pull a model using 'ollama pull llama3' or similar."
-                else:
-                    # Use the first available model
-                    ollama_model = available_models[0]
-                    logger.info(f"Using automatically selected Ollama model: {ollama_model}")
-                    
-                    # Create an OpenAI client with Ollama base URL
-                    ollama_client = openai.OpenAI(
-                        base_url="http://localhost:11434/v1",
-                        api_key="ollama",  # Ollama doesn't require an API key, but the client requires a non-empty string
-                    )
-                    
-                    # Generate the response using the Ollama API
-                    response = ollama_client.chat.completions.create(
-                        model=ollama_model,
-                        messages=[
-                            {"role": "system", "content": "You are an educational content creator. You create clear, concise, and informative content in markdown format. Format your response using markdown with proper headings, bullet points, and code blocks where appropriate."},
-                            {"role": "user", "content": microcourse_prompt}
-                        ],
-                        temperature=0.7,
-                        max_tokens=4000
-                    )
-                    
-                    # Extract the response text
-                    microcourse_content = response.choices[0].message.content
-                    logger.info(f"Generated microcourse from Ollama ({ollama_model}): {microcourse_content[:100]}...")
-            else:
-                # Extract the actual model name from the string (remove "ollama:" prefix)
-                if selected_model.startswith("ollama:"):
-                    ollama_model = selected_model.split(":", 1)[1]
-                else:
-                    ollama_model = selected_model
-                
-                # Create an OpenAI client with Ollama base URL
-                ollama_client = openai.OpenAI(
-                    base_url="http://localhost:11434/v1",
-                    api_key="ollama",  # Ollama doesn't require an API key, but the client requires a non-empty string
-                )
-                
-                # Generate the response using the Ollama API
-                response = ollama_client.chat.completions.create(
-                    model=ollama_model,
-                    messages=[
-                        {"role": "system", "content": "You are an educational content creator. You create clear, concise, and informative content in markdown format. Format your response using markdown with proper headings, bullet points, and code blocks where appropriate."},
-                        {"role": "user", "content": microcourse_prompt}
-                    ],
-                    temperature=0.7,
-                    max_tokens=4000
-                )
-                
-                # Extract the response text
-                microcourse_content = response.choices[0].message.content
-                logger.info(f"Generated microcourse from Ollama ({ollama_model}): {microcourse_content[:100]}...")
-            
-        except Exception as e:
-            error_message = f"Error generating microcourse from Ollama: {str(e)}"
-            logger.error(error_message)
-            microcourse_content = f"# Error generating microcourse\n\n{error_message}"
-    elif selected_platform == "anthropic":
-        # Use Anthropic for microcourse generation
-        import anthropic
-        
-        # Get the Anthropic API key from environment variables
-        api_key = os.environ.get("ANTHROPIC_API_KEY")
-        if not api_key:
-            microcourse_content = "# Microcourse content could not be generated\n\nThe Anthropic API key is not available."
-        else:
-            # Create an Anthropic client
-            client = anthropic.Anthropic(api_key=api_key)
-            
-            try:
-                # Generate the response using the Anthropic API with a different system prompt
-                response = client.messages.create(
-                    model=selected_model,
-                    max_tokens=4000,
-                    temperature=0.7,
-                    system="You are an educational content creator. You create clear, concise, and informative content in markdown format. Format your response using markdown with proper headings, bullet points, and code blocks where appropriate.",
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": microcourse_prompt
-                                }
-                            ]
-                        }
-                    ]
-                )
-                
-                # Extract the response text
-                microcourse_content = response.content[0].text
-            except Exception as e:
-                microcourse_content = f"# Error generating microcourse\n\n{str(e)}"
-    
-    # Generate questions
-    questions = []
-    for i in range(num_questions):
-        # Generate a prompt based on the question type
-        if question_type == "multiple_choice":
-            prompt = question_generator.generate_multiple_choice_question(
-                topic=topic,
-                subtopic=subtopic,
-                focus=question_focus,
-                difficulty=difficulty,
-                question_number=i+1
-            )
-        elif question_type == "true_false":
-            prompt = question_generator.generate_true_false_question(
-                topic=topic,
-                subtopic=subtopic,
-                focus=question_focus,
-                difficulty=difficulty,
-                question_number=i+1
-            )
-        else:  # cloze
-            prompt = question_generator.generate_cloze_question(
-                topic=topic,
-                subtopic=subtopic,
-                focus=question_focus,
-                difficulty=difficulty,
-                question_number=i+1
-            )
-        
-        # Import the host_agent module to use the correct function
-        from quiz_generator.utils.host_agent import get_host_agent_response as host_agent_get_response
-        
-        # Send the prompt to the host agent using the imported function
-        response = host_agent_get_response(prompt, None, selected_model, selected_platform)
-        
-        # Parse the response into a Question object
-        question = question_generator.parse_question_response(
-            response=response,
-            question_type=question_type,
-            topic=topic,
-            subtopic=subtopic,
-            focus=question_focus
-        )
-        
-        # Add the question to the list
-        questions.append(question)
-    
-    # Create the output file
-    if output_format == "bquiz":
-        file_path = create_bootable_quiz(questions, topic, subtopic, microcourse_content)
-    else:  # html
-        file_path = create_html_quiz(questions, topic, subtopic, microcourse_content)
+    # Generate the microcourse and the questions, resuming from the checkpoint of an
+    # earlier run and filling from the question bank, and write the quiz file
+    result = await run_quiz_pipeline(
+        route,
+        topic,
+        subtopic,
+        question_focus=question_focus,
+        question_type=question_type,
+        difficulty=difficulty,
+        num_questions=num_questions,
+        output_format=output_format,
+        concurrent=concurrent,
+        max_workers=max_workers,
+        use_cache=use_cache,
+        use_question_bank=use_question_bank,
+        batch_size=batch_size,
+        stream=stream,
+        deadline=deadline,
+        notify=ctx.report_progress if ctx else None,
+        # A queued job checkpoints under its own ID, so two jobs of the same request
+        # never write to one checkpoint, and a job resumed after a restart finds its own
+        checkpoint_id=getattr(ctx, "job_id", None)
+    )
     
     # Open the file if it's an HTML file
-    if output_format == "html":
+    if result["format"] == "html" and open_file:
         try:
             # Open the HTML file in the default web browser
-            webbrowser.open(file_path)
-            logger.info(f"Automatically opened {file_path} in the default browser")
+            webbrowser.open(result["file_path"])
+            logger.info(f"Automatically opened {result['file_path']} in the default browser")
         except Exception as e:
             logger.error(f"Error opening file in browser: {str(e)}")
     
-    # Return the result, including the model used
-    result = {
-        "file_path": file_path,
-        "format": output_format,
-        "num_questions": len(questions),
+    return result
+
+async def _run_quiz_job(params: dict, ctx) -> dict:
+    """Run a queued quiz job: generate the quiz without opening it, reporting progress to the job."""
+    return await generate_quiz(**params, open_file=False, ctx=ctx)
+
+
+# Queue of background quiz jobs, run by a bounded pool of workers on the server's event loop
+quiz_jobs = JobQueue(_run_quiz_job)
+
+
+@mcp.tool()
+async def submit_quiz_job(topic: str, subtopic: str = None, question_focus: str = "text",
+                          question_type: str = "multiple_choice", difficulty: str = "challenging",
+                          num_questions: int = 5, output_format: str = "html",
+                          model: str = None, platform: str = None,
+                          concurrent: bool = True, max_workers: int = None,
+                          use_cache: bool = None, use_question_bank: bool = None,
+                          batch_size: int = None, stream: bool = False, deadline: float = None) -> dict:
+    """
+    Queue a quiz to be generated in the background and return immediately with a job ID.
+    
+    Use this instead of generate_quiz to generate many quizzes at once. Jobs run a few at a
+    time (QUIZ_GENERATOR_JOB_WORKERS, default 2) and are kept in a job table, so queued jobs
+    survive a server restart. Poll get_quiz_job_status and fetch the quiz with get_quiz_job_result.
+    The generated HTML quizzes are not opened in the browser.
+    
+    Parameters:
+    - The same as generate_quiz
+    
+    Returns:
+    - job_id: The ID of the job
+    - status: The status of the job ("queued")
+    """
+    params = {
         "topic": topic,
-        "subtopic": subtopic
+        "subtopic": subtopic,
+        "question_focus": question_focus,
+        "question_type": question_type,
+        "difficulty": difficulty,
+        "num_questions": num_questions,
+        "output_format": output_format,
+        "model": model,
+        "platform": platform,
+        "concurrent": concurrent,
+        "max_workers": max_workers,
+        "use_cache": use_cache,
+        "use_question_bank": use_question_bank,
+        "batch_size": batch_size,
+        "stream": stream,
+        "deadline": deadline
     }
+    job_id = await quiz_jobs.submit(params)
+    return {"job_id": job_id, "status": "queued"}
+
+
+@mcp.tool()
+async def get_quiz_job_status(job_id: str) -> dict:
+    """
+    Get the status of a quiz job.
     
-    # Add the model used to the result
-    if selected_platform == "ollama":
-        # For automatic Ollama model selection, include the actual model used
-        result["model_used"] = f"ollama:{ollama_model}" if 'ollama_model' in locals() else "ollama:unknown"
-    else:
-        # For other models (Claude, GROQ, OpenRouter)
-        result["model_used"] = selected_model
+    Parameters:
+    - job_id: The ID returned by submit_quiz_job
     
-    return result
+    Returns:
+    - job_id: The ID of the job
+    - status: queued, running, completed, failed or cancelled
+    - progress: The number of finished items, the total and the latest progress message
+    - error: The error message of a failed job
+    - created_at, started_at, finished_at: When the job was queued, started and finished
+    """
+    status = await quiz_jobs.get_status(job_id)
+    return status or {"job_id": job_id, "error": f"No quiz job with ID {job_id}"}
+
+
+@mcp.tool()
+async def get_quiz_job_result(job_id: str) -> dict:
+    """
+    Get the result of a completed quiz job.
+    
+    Parameters:
+    - job_id: The ID returned by submit_quiz_job
+    
+    Returns:
+    - The result of generate_quiz (file_path, format, num_questions, ...) once the job has
+      completed, or the job's status if it has not
+    """
+    result = await quiz_jobs.get_result(job_id)
+    return result or {"job_id": job_id, "error": f"No quiz job with ID {job_id}"}
+
+
+@mcp.tool()
+async def cancel_quiz_job(job_id: str) -> dict:
+    """
+    Cancel a quiz job. A queued job will not run; a running job is stopped, and the questions
+    it had finished are saved to a partial quiz file.
+    
+    Parameters:
+    - job_id: The ID returned by submit_quiz_job
+    
+    Returns:
+    - The status of the job
+    """
+    status = await quiz_jobs.cancel(job_id)
+    return status or {"job_id": job_id, "error": f"No quiz job with ID {job_id}"}
+
+
+@mcp.tool()
+async def generate_quiz_bulk(manifest_path: str, max_concurrent_quizzes: int = None,
+                             max_concurrent_requests: int = None, requests_per_minute: float = None,
+                             use_cache: bool = None, state_path: str = None,
+                             ctx: Context = None) -> dict:
+    """
+    Generate a quiz for every row of a CSV or JSONL manifest, e.g. a whole course catalog.
+    
+    Each row holds the generate_quiz parameters of one quiz (topic, subtopic, question_focus,
+    question_type, difficulty, num_questions, output_format, model, platform, batch_size, stream,
+    use_question_bank, deadline); only topic is required. Rows run through the same pipeline as
+    generate_quiz. All LLM calls of the run share one concurrency and rate limit. Finished rows
+    are recorded in a state file, so running the same manifest again after a crash only
+    generates the quizzes that were not finished, including rows cut short by their deadline.
+    The quizzes are not opened in the browser.
+    
+    Parameters:
+    - manifest_path: Path of the .csv (with a header row) or .jsonl manifest
+    - max_concurrent_quizzes: Number of quizzes generated at once (default: 4)
+    - max_concurrent_requests: Number of LLM requests in flight across all quizzes (default: 8)
+    - requests_per_minute: Optional limit on the LLM requests started per minute
+    - use_cache: Whether to reuse cached LLM responses for identical requests (default: the
+             QUIZ_GENERATOR_RESPONSE_CACHE environment variable)
+    - state_path: Path of the state file used to resume the run (default: next to the manifest)
+    
+    Progress is reported to the client as each quiz finishes.
+    
+    Returns:
+    - total, completed, incomplete, skipped, failed: Number of rows, and of rows generated,
+      cut short by their deadline, already generated by an earlier run, and failed
+    - tokens_used: Number of tokens used by the quizzes generated in this run
+    - elapsed_seconds: Time taken by the run
+    - quizzes: The result of each row (file_path, status, ...), in manifest order
+    """
+    try:
+        return await generate_quizzes_from_manifest(
+            manifest_path,
+            max_concurrent_quizzes=max_concurrent_quizzes,
+            max_concurrent_requests=max_concurrent_requests,
+            requests_per_minute=requests_per_minute,
+            use_cache=use_cache,
+            state_path=state_path,
+            notify=ctx.report_progress if ctx else None
+        )
+    except (OSError, ManifestError) as e:
+        logger.error(f"Error reading manifest {manifest_path}: {str(e)}")
+        return {"manifest": manifest_path, "error": str(e)}
+
+
+@mcp.tool()
+async def get_provider_health() -> dict:
+    """
+    Show the health of every platform and model that requests were sent to.
+    
+    Each platform and model has a circuit breaker. When too many of its recent requests
+    are overloaded, time out, cannot connect or are very slow, its circuit opens: requests
+    are refused at once and routed to another platform instead of waiting for a timeout,
+    until a trial request succeeds.
+    
+    Returns:
+    - circuit_breakers_enabled: Whether requests go through the circuit breakers
+    - providers: For each platform/model, the circuit state (closed, open or half_open),
+      its recent error rate, slow call rate, health score (0 to 1) and median latency,
+      the seconds until an open circuit allows a trial request, and the requests in
+      flight and waiting for the platform's limits
+    """
+    providers = {}
+    for (platform, model), breaker in get_circuit_breakers().items():
+        providers[f"{platform}/{model}"] = breaker.to_dict()
+    for (platform, model), limiter in get_provider_limiters().items():
+        limits = limiter.to_dict()
+        providers.setdefault(f"{platform}/{model}", {"name": limits["name"]}).update(
+            in_flight=limits["in_flight"], waiting=limits["waiting"]
+        )
+    return {
+        "circuit_breakers_enabled": is_circuit_breaker_enabled(),
+        "providers": providers
+    }
 
 # Run the MCP server
 if __name__ == "__main__":
@@ -0,0 +1,89 @@
+"""
+Tests for the state transitions of quiz_generator.utils.circuit_breaker.CircuitBreaker.
+"""
+
+import time
+
+from quiz_generator.utils.circuit_breaker import (
+    CIRCUIT_CLOSED,
+    CIRCUIT_HALF_OPEN,
+    CIRCUIT_MIN_REQUESTS,
+    CIRCUIT_OPEN,
+    CircuitBreaker,
+)
+
+
+def open_breaker(open_seconds=0.05, slow_call_seconds=None):
+    breaker = CircuitBreaker("test/model", open_seconds, slow_call_seconds)
+    for _ in range(CIRCUIT_MIN_REQUESTS):
+        breaker.record_failure()
+    return breaker
+
+
+def test_circuit_stays_closed_below_the_minimum_requests():
+    breaker = CircuitBreaker("test/model")
+    for _ in range(CIRCUIT_MIN_REQUESTS - 1):
+        breaker.record_failure()
+    assert breaker.state == CIRCUIT_CLOSED
+    assert breaker.allow_request()
+
+
+def test_circuit_stays_closed_while_most_requests_succeed():
+    breaker = CircuitBreaker("test/model")
+    for _ in range(10):
+        breaker.record_success(0.1)
+    for _ in range(4):
+        breaker.record_failure()
+    assert breaker.state == CIRCUIT_CLOSED
+
+
+def test_failures_open_the_circuit():
+    breaker = open_breaker(open_seconds=30.0)
+    assert breaker.state == CIRCUIT_OPEN
+    assert not breaker.allow_request()
+    assert not breaker.is_available()
+    assert 0 < breaker.get_retry_after() <= 30.0
+
+
+def test_slow_calls_open_the_circuit():
+    breaker = CircuitBreaker("test/model", slow_call_seconds=1.0)
+    for _ in range(CIRCUIT_MIN_REQUESTS):
+        breaker.record_success(2.0)
+    assert breaker.state == CIRCUIT_OPEN
+
+
+def test_half_open_circuit_allows_one_trial_request():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.state == CIRCUIT_HALF_OPEN
+    assert breaker.is_available()
+    assert breaker.allow_request()
+    # The trial request is in flight, so no other request is allowed
+    assert not breaker.allow_request()
+    assert not breaker.is_available()
+
+
+def test_successful_trial_request_closes_the_circuit():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_success(0.1)
+    assert breaker.state == CIRCUIT_CLOSED
+    assert breaker.to_dict()["requests"] == 1
+
+
+def test_failed_trial_request_opens_the_circuit_again():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_OPEN
+    assert not breaker.allow_request()
+
+
+def test_trial_request_that_never_reports_back_is_given_up():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    time.sleep(0.06)
+    assert breaker.allow_request()
@@ -0,0 +1,81 @@
+"""
+Tests for the error classification and retry delays in quiz_generator.utils.host_agent.
+"""
+
+import types
+
+import httpx
+import pytest
+
+from quiz_generator.utils.host_agent import (
+    ERROR_AUTH,
+    ERROR_CONNECTION,
+    ERROR_OTHER,
+    ERROR_OVERLOADED,
+    ERROR_RATE_LIMIT,
+    ERROR_TIMEOUT,
+    MAX_RETRY_AFTER,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    _get_retry_delay,
+    classify_error,
+)
+
+
+class StatusError(Exception):
+    """An error carrying an HTTP status code and headers, like a client library's."""
+    
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = types.SimpleNamespace(headers=headers or {})
+
+
+# Client libraries are matched by their exception class names
+RateLimitError = type("RateLimitError", (Exception,), {})
+APITimeoutError = type("APITimeoutError", (Exception,), {})
+APIConnectionError = type("APIConnectionError", (Exception,), {})
+
+
+@pytest.mark.parametrize("error, expected", [
+    (StatusError(429), ERROR_RATE_LIMIT),
+    (RateLimitError("slow down"), ERROR_RATE_LIMIT),
+    (StatusError(401), ERROR_AUTH),
+    (StatusError(403), ERROR_AUTH),
+    (StatusError(500), ERROR_OVERLOADED),
+    (StatusError(529), ERROR_OVERLOADED),
+    (TimeoutError(), ERROR_TIMEOUT),
+    (httpx.ReadTimeout("timed out"), ERROR_TIMEOUT),
+    (APITimeoutError("timed out"), ERROR_TIMEOUT),
+    (ConnectionError(), ERROR_CONNECTION),
+    (httpx.ConnectError("refused"), ERROR_CONNECTION),
+    (APIConnectionError("refused"), ERROR_CONNECTION),
+    (StatusError(400), ERROR_OTHER),
+    (ValueError("bad"), ERROR_OTHER),
+])
+def test_classify_error(error, expected):
+    assert classify_error(error) == expected
+
+
+def test_errors_that_are_not_retryable_are_not_retried():
+    assert _get_retry_delay(StatusError(401), 0) is None
+    assert _get_retry_delay(ValueError("bad"), 0) is None
+
+
+def test_retries_stop_after_the_maximum(monkeypatch):
+    monkeypatch.setenv("QUIZ_GENERATOR_MAX_RETRIES", "2")
+    assert _get_retry_delay(StatusError(500), 1) is not None
+    assert _get_retry_delay(StatusError(500), 2) is None
+
+
+def test_retry_after_header_sets_the_delay():
+    assert _get_retry_delay(StatusError(429, {"retry-after": "2"}), 0) == 2.0
+    assert _get_retry_delay(StatusError(429, {"retry-after-ms": "250"}), 0) == 0.25
+    assert _get_retry_delay(StatusError(429, {"retry-after": "3600"}), 0) == MAX_RETRY_AFTER
+
+
+@pytest.mark.parametrize("attempt", [0, 1, 2])
+def test_backoff_is_exponential_with_equal_jitter(attempt):
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+    for _ in range(20):
+        assert delay / 2 <= _get_retry_delay(TimeoutError(), attempt) <= delay
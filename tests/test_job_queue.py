@@ -0,0 +1,97 @@
+"""
+Tests for cancelling jobs of quiz_generator.utils.job_queue.JobQueue.
+"""
+
+import asyncio
+
+from quiz_generator.utils.job_queue import (
+    JOB_CANCELLED,
+    JOB_COMPLETED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JobQueue,
+    JobStore,
+)
+
+
+class BlockingRunner:
+    """A job runner whose jobs run until they are released (or cancelled)."""
+    
+    def __init__(self):
+        self.started = []
+        self.release = asyncio.Event()
+    
+    async def __call__(self, params, context):
+        self.started.append(params["name"])
+        if params.get("block", True):
+            await self.release.wait()
+        return {"name": params["name"]}
+
+
+async def wait_for_status(queue, job_id, status):
+    for _ in range(200):
+        if (await queue.get_status(job_id))["status"] == status:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} never became {status}")
+
+
+def test_cancel_queued_job(tmp_path):
+    async def run():
+        runner = BlockingRunner()
+        queue = JobQueue(runner, JobStore(str(tmp_path / "jobs.db")), max_workers=1)
+        running = await queue.submit({"name": "running"})
+        queued = await queue.submit({"name": "queued"})
+        await wait_for_status(queue, running, JOB_RUNNING)
+        assert (await queue.get_status(queued))["status"] == JOB_QUEUED
+        
+        assert (await queue.cancel(queued))["status"] == JOB_CANCELLED
+        runner.release.set()
+        await wait_for_status(queue, running, JOB_COMPLETED)
+        # The worker skips the cancelled job and goes on to the next one
+        later = await queue.submit({"name": "later", "block": False})
+        await wait_for_status(queue, later, JOB_COMPLETED)
+        assert runner.started == ["running", "later"]
+        assert (await queue.get_status(queued))["status"] == JOB_CANCELLED
+    
+    asyncio.run(run())
+
+
+def test_cancel_running_job_keeps_the_worker(tmp_path):
+    async def run():
+        runner = BlockingRunner()
+        queue = JobQueue(runner, JobStore(str(tmp_path / "jobs.db")), max_workers=1)
+        running = await queue.submit({"name": "running"})
+        await wait_for_status(queue, running, JOB_RUNNING)
+        
+        # The status is final once cancel returns
+        assert (await queue.cancel(running))["status"] == JOB_CANCELLED
+        later = await queue.submit({"name": "later", "block": False})
+        await wait_for_status(queue, later, JOB_COMPLETED)
+        assert (await queue.get_result(later))["name"] == "later"
+        assert (await queue.get_status(running))["status"] == JOB_CANCELLED
+    
+    asyncio.run(run())
+
+
+def test_cancel_right_after_submit_never_runs_the_job(tmp_path):
+    async def run():
+        runner = BlockingRunner()
+        queue = JobQueue(runner, JobStore(str(tmp_path / "jobs.db")), max_workers=2)
+        for number in range(10):
+            job_id = await queue.submit({"name": number})
+            assert (await queue.cancel(job_id))["status"] == JOB_CANCELLED
+        later = await queue.submit({"name": "later", "block": False})
+        await wait_for_status(queue, later, JOB_COMPLETED)
+    
+    asyncio.run(run())
+
+
+def test_cancel_finished_job_keeps_its_status(tmp_path):
+    async def run():
+        queue = JobQueue(BlockingRunner(), JobStore(str(tmp_path / "jobs.db")), max_workers=1)
+        job_id = await queue.submit({"name": "done", "block": False})
+        await wait_for_status(queue, job_id, JOB_COMPLETED)
+        assert (await queue.cancel(job_id))["status"] == JOB_COMPLETED
+    
+    asyncio.run(run())
@@ -0,0 +1,83 @@
+"""
+Tests for extract_json and IncrementalJSONParser, which parse the JSON in model responses.
+"""
+
+import json
+
+import pytest
+
+from quiz_generator.utils.json_extractor import extract_json
+from quiz_generator.utils.stream_parser import IncrementalJSONParser, StreamAbort
+
+
+QUESTION = {"question": "Q?", "options": ["A. a", "B. b"], "correct_answer": "A. a", "explanation": "e"}
+
+
+@pytest.mark.parametrize("response", [
+    json.dumps(QUESTION),
+    "```json\n" + json.dumps(QUESTION) + "\n```",
+    "<think>Maybe {\"question\": \"draft\"}</think>\n" + json.dumps(QUESTION),
+    "Here is the question:\n" + json.dumps(QUESTION, indent=2) + "\nLet me know if you want more.",
+])
+def test_extract_json_finds_the_object(response):
+    assert extract_json(response) == QUESTION
+
+
+def test_extract_json_finds_an_object_nested_in_malformed_json():
+    response = '{"result": {"question": "Q?", "correct_answer": "A"} oops'
+    assert extract_json(response) == {"question": "Q?", "correct_answer": "A"}
+
+
+def test_extract_json_skips_text_that_is_not_json():
+    response = 'Use {braces} carefully. {"question": "Q?"}'
+    assert extract_json(response) == {"question": "Q?"}
+
+
+def test_extract_json_returns_an_array_only_when_allowed():
+    response = "[" + json.dumps(QUESTION) + ", " + json.dumps(QUESTION) + "]"
+    assert extract_json(response, allow_array=True) == [QUESTION, QUESTION]
+    assert extract_json(response) == QUESTION
+
+
+def test_extract_json_raises_without_json():
+    with pytest.raises(json.JSONDecodeError):
+        extract_json("I cannot answer that.")
+
+
+def feed_in_chunks(parser, text, size):
+    """Feed text to the parser in chunks, returning the items completed by each chunk."""
+    return [parser.feed(text[start:start + size]) for start in range(0, len(text), size)]
+
+
+def test_parser_yields_each_item_of_a_questions_wrapper_as_it_completes():
+    first = dict(QUESTION, question="First?")
+    second = dict(QUESTION, question="Second?")
+    text = json.dumps({"questions": [first, second]})
+    parser = IncrementalJSONParser()
+    chunks = feed_in_chunks(parser, text, 7)
+    items = [item for chunk in chunks for item in chunk]
+    assert items == [first, second]
+    # The first item arrives before the stream has finished
+    first_index = next(index for index, chunk in enumerate(chunks) if chunk)
+    assert first_index < len(chunks) - 1
+    assert parser.malformed_items == 0
+
+
+def test_parser_yields_items_of_a_fenced_array():
+    text = "```json\n[" + json.dumps(QUESTION) + ",\n" + json.dumps(QUESTION) + "]\n```"
+    parser = IncrementalJSONParser()
+    items = [item for chunk in feed_in_chunks(parser, text, 5) for item in chunk]
+    assert items == [QUESTION, QUESTION]
+
+
+def test_parser_keeps_braces_inside_strings():
+    item = {"question": "What does {x} print?", "correct_answer": "a \"}\" brace"}
+    parser = IncrementalJSONParser()
+    items = [item for chunk in feed_in_chunks(parser, json.dumps(item), 3) for item in chunk]
+    assert items == [item]
+
+
+def test_parser_aborts_when_no_object_starts():
+    parser = IncrementalJSONParser(max_prefix_chars=10)
+    with pytest.raises(StreamAbort):
+        parser.feed("x" * 20)
@@ -0,0 +1,68 @@
+"""
+Tests for validate_question_data in quiz_generator.models.question_models.
+"""
+
+import pytest
+
+from quiz_generator.models.question_models import QuestionValidationError, validate_question_data
+
+
+MULTIPLE_CHOICE = {
+    "question": "Which type is mutable?",
+    "options": ["A. Tuples", "B. Lists", "C. Strings", "D. Integers"],
+    "correct_answer": "B. Lists",
+    "explanation": "Lists can be changed in place."
+}
+
+
+def test_valid_multiple_choice_question_is_returned_as_a_copy():
+    data = validate_question_data(MULTIPLE_CHOICE, "multiple_choice")
+    assert data == MULTIPLE_CHOICE
+    assert data is not MULTIPLE_CHOICE
+
+
+@pytest.mark.parametrize("answer", ["B", "b)", "B.", "Lists"])
+def test_multiple_choice_answer_is_expanded_to_its_option(answer):
+    data = validate_question_data(dict(MULTIPLE_CHOICE, correct_answer=answer), "multiple_choice")
+    assert data["correct_answer"] == "B. Lists"
+
+
+@pytest.mark.parametrize("changes", [
+    {"correct_answer": "E"},
+    {"correct_answer": ""},
+    {"options": ["A. Only one"]},
+    {"options": ["A. Same", "A. Same"]},
+    {"options": "A. Tuples, B. Lists"},
+    {"question": ""},
+])
+def test_invalid_multiple_choice_question_is_rejected(changes):
+    with pytest.raises(QuestionValidationError):
+        validate_question_data(dict(MULTIPLE_CHOICE, **changes), "multiple_choice")
+
+
+def test_question_data_must_be_an_object():
+    with pytest.raises(QuestionValidationError):
+        validate_question_data([MULTIPLE_CHOICE], "multiple_choice")
+
+
+@pytest.mark.parametrize("answer, expected", [(True, True), ("false", False), (" True ", True)])
+def test_true_false_answer_is_a_boolean(answer, expected):
+    data = validate_question_data({"question": "Lists are mutable.", "correct_answer": answer}, "true_false")
+    assert data["correct_answer"] is expected
+
+
+def test_true_false_answer_must_be_true_or_false():
+    with pytest.raises(QuestionValidationError):
+        validate_question_data({"question": "Lists are mutable.", "correct_answer": "maybe"}, "true_false")
+
+
+def test_cloze_question_needs_a_blank():
+    data = validate_question_data({"question": "2 + 2 = ___", "correct_answer": 4}, "cloze")
+    assert data["correct_answer"] == "4"
+    with pytest.raises(QuestionValidationError):
+        validate_question_data({"question": "2 + 2 = ?", "correct_answer": "4"}, "cloze")
+
+
+def test_unknown_question_type_is_rejected():
+    with pytest.raises(ValueError):
+        validate_question_data(MULTIPLE_CHOICE, "essay")
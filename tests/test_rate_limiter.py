@@ -0,0 +1,122 @@
+"""
+Tests for the token buckets and provider limiters in quiz_generator.utils.rate_limiter.
+"""
+
+import asyncio
+
+import pytest
+
+from quiz_generator.utils.rate_limiter import ProviderLimiter, TokenBucket
+
+
+def test_token_bucket_serves_reservations_in_order():
+    bucket = TokenBucket(60)
+    waits = [bucket.reserve(30) for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    # Each later reservation waits behind the ones before it
+    assert waits[2] == pytest.approx(30.0, abs=0.1)
+    assert waits[3] == pytest.approx(60.0, abs=0.1)
+
+
+def test_token_bucket_adjust_gives_tokens_back():
+    bucket = TokenBucket(60)
+    assert bucket.reserve(90) == pytest.approx(30.0, abs=0.1)
+    bucket.adjust(-90)
+    assert bucket.reserve(0) == 0.0
+
+
+def test_provider_limiter_grants_slots_in_order():
+    async def run():
+        limiter = ProviderLimiter("test", max_in_flight=1)
+        await limiter.acquire_async()
+        order = []
+        
+        async def take(number):
+            await limiter.acquire_async()
+            order.append(number)
+        
+        tasks = []
+        for number in range(3):
+            tasks.append(asyncio.ensure_future(take(number)))
+            await asyncio.sleep(0)
+        assert limiter.waiting == 3
+        for _ in range(3):
+            limiter.release()
+            await asyncio.sleep(0.01)
+        await asyncio.gather(*tasks)
+        return order
+    
+    assert asyncio.run(run()) == [0, 1, 2]
+
+
+def test_cancelled_wait_for_slot_leaves_the_queue():
+    async def run():
+        limiter = ProviderLimiter("test", max_in_flight=1)
+        await limiter.acquire_async()
+        task = asyncio.ensure_future(limiter.acquire_async())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert (limiter.waiting, limiter.in_flight) == (0, 1)
+        limiter.release()
+        assert limiter.in_flight == 0
+    
+    asyncio.run(run())
+
+
+def test_slot_granted_as_the_wait_is_cancelled_is_freed():
+    async def run():
+        limiter = ProviderLimiter("test", max_in_flight=1)
+        await limiter.acquire_async()
+        task = asyncio.ensure_future(limiter.acquire_async())
+        await asyncio.sleep(0.01)
+        limiter.release()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert (limiter.waiting, limiter.in_flight) == (0, 0)
+    
+    asyncio.run(run())
+
+
+def test_cancelled_rate_wait_gives_back_the_reservation():
+    async def run():
+        limiter = ProviderLimiter("test", max_in_flight=2, requests_per_minute=1, tokens_per_minute=1000)
+        await limiter.acquire_async(10)
+        task = asyncio.ensure_future(limiter.acquire_async(10))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return limiter
+    
+    limiter = asyncio.run(run())
+    assert limiter.in_flight == 1
+    # Only the request that was sent is still counted against the rates
+    assert limiter.requests_per_minute.reserve(0) == pytest.approx(0.0, abs=0.1)
+    assert limiter.tokens_per_minute.reserve(0) == 0.0
+    limiter.tokens_per_minute.adjust(-10)
+    assert limiter.tokens_per_minute.reserve(1000) == pytest.approx(0.0, abs=0.1)
+
+
+def test_acquire_times_out_waiting_for_a_slot():
+    limiter = ProviderLimiter("test", max_in_flight=1)
+    limiter.acquire()
+    with pytest.raises(TimeoutError):
+        limiter.acquire(timeout=0.05)
+    assert (limiter.waiting, limiter.in_flight) == (0, 1)
+    
+    async def run():
+        with pytest.raises(TimeoutError):
+            await limiter.acquire_async(timeout=0.05)
+    
+    asyncio.run(run())
+    assert (limiter.waiting, limiter.in_flight) == (0, 1)
+
+
+def test_acquire_times_out_at_once_when_the_rate_wait_is_too_long():
+    limiter = ProviderLimiter("test", requests_per_minute=1)
+    limiter.acquire()
+    with pytest.raises(TimeoutError):
+        limiter.acquire(timeout=1.0)
+    assert limiter.in_flight == 1
+    # The request that timed out gave its reservation back
+    assert limiter.requests_per_minute.reserve(0) == pytest.approx(0.0, abs=0.1)